@@ -0,0 +1,303 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import platform
+import contextlib
+import subprocess
+from os import path
+
+# Offline benchmarks for the load, install and launch paths
+# Every scenario runs in its own process against standin.py, results are saved to bench_results/
+#
+#   python benchmark.py [--scenario=name,...] [--repeat=3] [--scale=1.0] [--compare=results.json]
+
+RESULTS_DIRECTORY = path.join(path.dirname(path.abspath(__file__)), "bench_results")
+
+class Counters:
+    # counts the filesystem calls made from python while installed
+    NAMES = ["stat", "lstat", "scandir", "listdir"]
+
+    def __init__(self) -> None:
+        self.counts = {name: 0 for name in self.NAMES}
+        self._originals = {}
+
+    def _wrap(self, name:str):
+        original = getattr(os, name)
+        counts = self.counts
+
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return original(*args, **kwargs)
+
+        self._originals[name] = original
+        setattr(os, name, wrapper)
+
+    def install(self):
+        for name in self.NAMES:
+            self._wrap(name)
+
+    def snapshot(self)->dict[str, int]:
+        return dict(self.counts)
+
+def get_peak_rss()->int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss if platform.system() == "Darwin" else rss * 1024
+
+def load_catalogs(w, catalogs:list[str]):
+    for catalog in catalogs:
+        w._get_catalog(catalog)
+
+def bench_load(workdir, standin, scale, measure, catalogs=["vanilla", "forge", "fabric", "quilt"]):
+    import wrapper
+    from standin import add_catalogs
+
+    wrapper.FORGE_VERSIONS_URL = add_catalogs(standin, int(600 * scale))
+    wrapper.INTERNET_CHECK_HOST, wrapper.INTERNET_CHECK_PORT = standin._server.server_address[:2]
+
+    w = wrapper.Wrapper("bench", "1.0", workdir)
+    with standin.redirect_requests(), measure():
+        asyncio.run(w.load())
+        load_catalogs(w, catalogs)
+
+def bench_load_vanilla(workdir, standin, scale, measure):
+    # what a vanilla only command loads
+    bench_load(workdir, standin, scale, measure, ["vanilla"])
+
+def bench_load_offline(workdir, standin, scale, measure):
+    import wrapper
+    from standin import add_catalogs
+
+    # fill the catalog files with an online load first, then fail the internet check
+    wrapper.FORGE_VERSIONS_URL = add_catalogs(standin, int(600 * scale))
+    wrapper.INTERNET_CHECK_HOST, wrapper.INTERNET_CHECK_PORT = standin._server.server_address[:2]
+    with standin.redirect_requests():
+        w = wrapper.Wrapper("bench", "1.0", workdir)
+        asyncio.run(w.load())
+        load_catalogs(w, ["vanilla", "forge", "fabric", "quilt"])
+
+    wrapper.INTERNET_CHECK_PORT = 1
+    w = wrapper.Wrapper("bench", "1.0", workdir)
+    with measure():
+        asyncio.run(w.load())
+        load_catalogs(w, ["vanilla", "forge", "fabric", "quilt"])
+
+def bench_install_mrpack(workdir, standin, scale, measure):
+    import mrpack
+    from standin import create_mrpack
+
+    pack = path.join(workdir, "pack.mrpack")
+    create_mrpack(standin, pack, "1.20.1", mod_count=int(150 * scale), override_count=int(400 * scale))
+
+    with measure():
+        mrpack.install_mrpack(pack, path.join(workdir, "game"))
+
+def bench_pack_downloads_faults(workdir, standin, scale, measure):
+    # parallel pack downloads from a host that rate limits, fails and stalls some of the requests
+    import retry
+    import mrpack
+    import provision
+    from standin import create_mrpack
+
+    pack = path.join(workdir, "pack.mrpack")
+    create_mrpack(standin, pack, "1.20.1", mod_count=int(150 * scale), override_count=0)
+
+    files = {}
+    for file in mrpack.read_index(pack)["files"]:
+        files[file["hashes"]["sha1"]] = {"url": file["downloads"][0], "sha1": file["hashes"]["sha1"], "size": file["fileSize"], "destinations": [path.join(workdir, "game", file["path"])]}
+
+    retry.set_timeouts(1, 1)
+    standin.max_concurrent = 3
+    standin.add_fault("status", "/cdn/", probability=0.05)
+    standin.add_fault("reset", "/cdn/", count=5)
+    standin.add_fault("stall", "/cdn/", count=2, delay=2)
+
+    with measure():
+        provision.download_pack_files(files)
+
+def bench_get_profiles(workdir, standin, scale, measure):
+    from profile_launcher import Launcher
+    from standin import create_profiles
+
+    launcher = Launcher(minecraft_directory=workdir)
+    create_profiles(launcher.PROFILES_DIRECTORY, "1.20.1", profile_count=int(40 * scale))
+
+    with measure():
+        launcher.get_profiles()
+
+def bench_clone_profile(workdir, standin, scale, measure):
+    # mods are shared, the configs and the world are copied unless the filesystem supports reflinks
+    import clone
+    from standin import create_profiles
+
+    profiles_directory = path.join(workdir, "profiles")
+    create_profiles(profiles_directory, "1.20.1", profile_count=1, mod_count=int(150 * scale), save_files=int(300 * scale))
+
+    with measure():
+        clone.clone_profile(path.join(profiles_directory, "profile0"), path.join(profiles_directory, "clone"), "clone")
+
+def bench_launch_command(workdir, standin, scale, measure):
+    import wrapper
+    from standin import create_version
+
+    create_version(workdir, "1.20.1", library_count=int(80 * scale))
+    game_directory = path.join(workdir, "game")
+    os.makedirs(game_directory)
+
+    w = wrapper.Wrapper("bench", "1.0", workdir)
+    with measure():
+        w.get_launch_command("1.20.1", "bench", gameDir=game_directory)
+
+def bench_check_updates(workdir, standin, scale, measure):
+    import updates
+    from standin import add_modrinth_api, create_mod_versions
+
+    profile_path = path.join(workdir, "profile")
+    versions = create_mod_versions(standin, path.join(profile_path, "game", "mods"), mod_count=int(150 * scale))
+    updates.set_modrinth_api(add_modrinth_api(standin, versions))
+
+    with standin.redirect_requests(), measure():
+        plan = updates.get_update_plan(profile_path, "1.20.1", "fabric")
+        updates.apply_update_plan(profile_path, plan)
+
+SCENARIOS = {
+    "load": bench_load,
+    "load_vanilla": bench_load_vanilla,
+    "load_offline": bench_load_offline,
+    "install_mrpack": bench_install_mrpack,
+    "pack_downloads_faults": bench_pack_downloads_faults,
+    "get_profiles": bench_get_profiles,
+    "clone_profile": bench_clone_profile,
+    "launch_command": bench_launch_command,
+    "check_updates": bench_check_updates,
+}
+
+def run_child(name:str, scale:float)->dict:
+    # runs one scenario in this process and returns its measurements
+    from standin import StandInServer
+
+    counters = Counters()
+    counters.install()
+    result = {}
+
+    with tempfile.TemporaryDirectory() as workdir, StandInServer() as standin:
+        @contextlib.contextmanager
+        def measure():
+            before = counters.snapshot()
+            bytes_before = standin.bytes_sent
+            start = time.perf_counter()
+            yield
+            result["wall_time"] = time.perf_counter() - start
+            result["bytes_transferred"] = standin.bytes_sent - bytes_before
+            after = counters.snapshot()
+            for counter in Counters.NAMES:
+                result[f"{counter}_calls"] = after[counter] - before[counter]
+
+        SCENARIOS[name](workdir, standin, scale, measure)
+
+    result["peak_rss"] = get_peak_rss()
+    return result
+
+def run_scenario(name:str, scale:float, repeat:int)->dict:
+    runs = []
+    for i in range(repeat):
+        process = subprocess.run([sys.executable, path.abspath(__file__), f"--child={name}", f"--scale={scale}"], capture_output=True, text=True)
+        if process.returncode != 0:
+            return {"error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit code {process.returncode}"}
+
+        runs.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    # the median run by wall time, the worst peak memory
+    runs.sort(key=lambda r: r["wall_time"])
+    result = dict(runs[len(runs) // 2])
+    result["wall_time_min"] = runs[0]["wall_time"]
+    result["wall_time_max"] = runs[-1]["wall_time"]
+    result["peak_rss"] = max(r["peak_rss"] for r in runs)
+    return result
+
+def get_commit()->str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=path.dirname(path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+def latest_results()->str|None:
+    if not path.isdir(RESULTS_DIRECTORY):
+        return None
+
+    files = sorted(f for f in os.listdir(RESULTS_DIRECTORY) if f.endswith(".json"))
+    return path.join(RESULTS_DIRECTORY, files[-1]) if files else None
+
+def print_results(results:dict, previous:dict|None):
+    print(f"{'scenario':<16}{'wall':>10}{'stat':>8}{'scandir':>9}{'rss MiB':>9}{'bytes':>12}  change")
+    for name, result in results["scenarios"].items():
+        if "error" in result:
+            print(f"{name:<16}error: {result['error']}")
+            continue
+
+        change = ""
+        old = (previous or {}).get("scenarios", {}).get(name)
+        if old and "wall_time" in old and old["wall_time"] > 0:
+            change = f"{(result['wall_time'] / old['wall_time'] - 1) * 100:+.1f}%"
+
+        stats = result["stat_calls"] + result["lstat_calls"]
+        scans = result["scandir_calls"] + result["listdir_calls"]
+        print(f"{name:<16}{result['wall_time'] * 1000:>8.1f}ms{stats:>8}{scans:>9}{result['peak_rss'] / 1024 / 1024:>9.1f}{result['bytes_transferred']:>12}  {change}")
+
+def main():
+    flags = {}
+    for arg in sys.argv[1:]:
+        name, _, value = arg.removeprefix("--").partition("=")
+        flags[name] = value
+
+    scale = float(flags.get("scale") or 1.0)
+
+    if flags.get("child"):
+        sys.path.insert(0, path.dirname(path.abspath(__file__)))
+        print(json.dumps(run_child(flags["child"], scale)))
+        return
+
+    names = flags["scenario"].split(",") if flags.get("scenario") else list(SCENARIOS)
+    repeat = int(flags.get("repeat") or 3)
+
+    results = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "repeat": repeat,
+        "scenarios": {}
+    }
+
+    for name in names:
+        if name not in SCENARIOS:
+            print(f"Unknown scenario '{name}', available: {', '.join(SCENARIOS)}")
+            return
+        results["scenarios"][name] = run_scenario(name, scale, repeat)
+
+    previous_file = flags.get("compare") or latest_results()
+    previous = None
+    if previous_file and path.exists(previous_file):
+        with open(previous_file, "r") as f:
+            previous = json.load(f)
+
+    print_results(results, previous)
+
+    os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+    results_file = path.join(RESULTS_DIRECTORY, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(results_file, "w") as f:
+        f.write(json.dumps(results, indent=4))
+
+    print(f"\nSaved to {results_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from os import path
+import os
+import shutil
+import threading
+import time
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import hashes
+
+# Directories served as they are, their layout matches the maven/resources urls
+SERVED_DIRECTORIES = ["libraries", "assets", "versions"]
+
+# Directories whose files are served by their sha1 (mod jars, version jars and jsons, asset indexes)
+HASHED_DIRECTORIES = ["versions", path.join("assets", "indexes")]
+HASHED_PROFILE_DIRECTORIES = ["mods", "resourcepacks", "shaderpacks"]
+
+REINDEX_INTERVAL = 30
+
+class ContentStore:
+    MINECRAFT_DIRECTORY:str
+
+    def __init__(self, minecraft_directory:str) -> None:
+        self.MINECRAFT_DIRECTORY = path.abspath(minecraft_directory)
+        self.hash_index = hashes.get_index(self.MINECRAFT_DIRECTORY)
+
+        self._lock = threading.Lock()
+        self._hashes:dict[str, str] = {}
+        self._indexed_at = 0
+
+    def _hashed_directories(self)->list[str]:
+        directories = [path.join(self.MINECRAFT_DIRECTORY, d) for d in HASHED_DIRECTORIES]
+
+        profiles_directory = path.join(self.MINECRAFT_DIRECTORY, "profiles")
+        if path.isdir(profiles_directory):
+            for profile in os.scandir(profiles_directory):
+                for d in HASHED_PROFILE_DIRECTORIES:
+                    directories.append(path.join(profile.path, "game", d))
+
+        return directories
+
+    def build_index(self):
+        with self._lock:
+            self._build_index()
+
+    def _build_index(self):
+        # the hash index keeps the hashes of files that didn't change since the last run
+        found = {}
+
+        for directory in self._hashed_directories():
+            for root, dirs, filenames in os.walk(directory):
+                for filename in filenames:
+                    file = path.join(root, filename)
+                    try:
+                        found[self.hash_index.sha1(file)] = file
+                    except OSError:
+                        continue
+
+        self._hashes = found
+        self._indexed_at = time.monotonic()
+        self.hash_index.save()
+
+    def _is_valid(self, sha1:str, file:str)->bool:
+        # a file changed since it was indexed is hashed again, so it's never served under its old hash
+        try:
+            current = self.hash_index.sha1(file)
+        except OSError:
+            return False
+
+        if current != sha1:
+            with self._lock:
+                if self._hashes.get(sha1) == file:
+                    del self._hashes[sha1]
+                self._hashes[current] = file
+
+        return current == sha1
+
+    def find_hash(self, sha1:str)->str|None:
+        file = self._hashes.get(sha1)
+        if file and self._is_valid(sha1, file):
+            return file
+
+        # the file could have been added after the index was built
+        if time.monotonic() - self._indexed_at < REINDEX_INTERVAL:
+            return None
+
+        self.build_index()
+        file = self._hashes.get(sha1)
+        if file and self._is_valid(sha1, file):
+            return file
+
+        return None
+
+    def find_path(self, url_path:str)->str|None:
+        parts = urllib.parse.unquote(url_path).strip("/").split("/")
+
+        if len(parts) == 2 and parts[0] == "sha1":
+            return self.find_hash(parts[1].lower())
+
+        if len(parts) < 2 or parts[0] not in SERVED_DIRECTORIES or ".." in parts:
+            return None
+
+        file = path.abspath(path.join(self.MINECRAFT_DIRECTORY, *parts))
+        if not file.startswith(path.join(self.MINECRAFT_DIRECTORY, parts[0]) + os.sep):
+            return None
+
+        if not path.isfile(file):
+            return None
+
+        return file
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PyMineLauncherCache/1.0"
+    store:ContentStore
+
+    def _send_file(self, body:bool):
+        file = self.store.find_path(urllib.parse.urlsplit(self.path).path)
+
+        if not file:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(path.getsize(file)))
+        self.end_headers()
+
+        if body:
+            with open(file, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+
+    def do_GET(self):
+        self._send_file(True)
+
+    def do_HEAD(self):
+        self._send_file(False)
+
+    def log_message(self, format, *args):
+        pass
+
+def create_cache_server(minecraft_directory:str, host:str="0.0.0.0", port:int=8765)->ThreadingHTTPServer:
+    store = ContentStore(minecraft_directory)
+    store.build_index()
+
+    handler = type("Handler", (CacheRequestHandler,), {"store": store})
+    return ThreadingHTTPServer((host, port), handler)
+
+def serve_cache(minecraft_directory:str, host:str="0.0.0.0", port:int=8765):
+    server = create_cache_server(minecraft_directory, host, port)
+
+    print(f"Serving {path.abspath(minecraft_directory)} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,152 @@
+from os import path
+import os
+import re
+import json
+import shutil
+import hashlib
+import subprocess
+
+import version_info
+
+# AppCDS archives per profile and version: the first launch dumps the loaded classes
+# with -XX:ArchiveClassesAtExit, later launches map them with -XX:SharedArchiveFile
+
+# dynamic archives need java 13+
+MIN_JAVA_VERSION = 13
+MAX_FAILURES = 2
+MAX_LAUNCHES = 20
+PROBE_TIMEOUT = 10
+
+CDS_OFF = "off"
+CDS_DUMP = "dump"
+CDS_USE = "use"
+
+def get_java_major(minecraft_directory:str, version:str)->int:
+    for data in version_info.get_version_chain(minecraft_directory, version):
+        if "javaVersion" in data:
+            return int(data["javaVersion"].get("majorVersion", 8))
+
+    return 8
+
+def probe_java_major(java:str)->int|None:
+    # the major version of the java executable, None if it can't be run
+    try:
+        process = subprocess.run([java, "-version"], capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', process.stderr + process.stdout)
+    if not match:
+        return None
+
+    # java 8 and older report 1.8.0
+    major = int(match.group(1))
+    if major == 1 and match.group(2):
+        major = int(match.group(2))
+
+    return major
+
+def get_cds_directory(minecraft_directory:str, version:str, game_directory:str)->str:
+    profile_key = hashlib.sha1(path.abspath(game_directory).encode()).hexdigest()[:12]
+    return path.join(minecraft_directory, "cds", f"{version}-{profile_key}")
+
+def get_classpath(command:list[str])->str:
+    for i, argument in enumerate(command[:-1]):
+        if argument in ["-cp", "-classpath", "--class-path"]:
+            return command[i + 1]
+
+    return ""
+
+def get_cds_key(command:list[str], game_directory:str)->str:
+    # changes whenever java, the classpath or the mods change
+    key = hashlib.sha1()
+    key.update(command[0].encode())
+    # an updated java in the same place can't use the old archive
+    java = shutil.which(command[0])
+    if java:
+        key.update(str(os.stat(java).st_mtime_ns).encode())
+    key.update(get_classpath(command).encode())
+
+    mods_directory = path.join(game_directory, "mods")
+    if path.isdir(mods_directory):
+        for entry in sorted(os.scandir(mods_directory), key=lambda e: e.name):
+            if entry.is_file():
+                stat = entry.stat()
+                key.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    return key.hexdigest()
+
+def read_state(cds_directory:str)->dict:
+    state_file = path.join(cds_directory, "cds.json")
+    if not path.exists(state_file):
+        return {"key": None, "failures": 0, "launches": []}
+
+    with open(state_file, "r") as f:
+        return json.load(f)
+
+def write_state(cds_directory:str, state:dict):
+    os.makedirs(cds_directory, exist_ok=True)
+    with open(path.join(cds_directory, "cds.json"), "w") as f:
+        f.write(json.dumps(state, indent=4))
+
+def get_cds_arguments(minecraft_directory:str, version:str, game_directory:str, command:list[str])->tuple[str, list[str]]:
+    # returns the cds mode and the jvm arguments to add
+    if get_java_major(minecraft_directory, version) < MIN_JAVA_VERSION:
+        return (CDS_OFF, [])
+
+    cds_directory = get_cds_directory(minecraft_directory, version, game_directory)
+    state = read_state(cds_directory)
+    key = get_cds_key(command, game_directory)
+    archive = path.join(cds_directory, f"{key}.jsa")
+
+    if state["key"] != key:
+        # the classpath or the mods changed, the old archive can't be used anymore
+        if path.isdir(cds_directory):
+            for entry in os.scandir(cds_directory):
+                if entry.name.endswith(".jsa"):
+                    os.remove(entry.path)
+        state["key"] = key
+        state["failures"] = 0
+        state.pop("java_major", None)
+        write_state(cds_directory, state)
+
+    # the java that runs the game can be older than the version asks for, it doesn't start with flags it doesn't know
+    if "java_major" not in state:
+        state["java_major"] = probe_java_major(command[0])
+        write_state(cds_directory, state)
+    if state["java_major"] == None or state["java_major"] < MIN_JAVA_VERSION:
+        return (CDS_OFF, [])
+
+    if path.exists(archive):
+        return (CDS_USE, [f"-XX:SharedArchiveFile={archive}", "-Xshare:auto"])
+
+    if state["failures"] >= MAX_FAILURES:
+        return (CDS_OFF, [])
+
+    os.makedirs(cds_directory, exist_ok=True)
+    return (CDS_DUMP, [f"-XX:ArchiveClassesAtExit={archive}"])
+
+def record_launch(minecraft_directory:str, version:str, game_directory:str, mode:str, startup:float|None):
+    cds_directory = get_cds_directory(minecraft_directory, version, game_directory)
+    state = read_state(cds_directory)
+
+    # the archive is written when the game exits, if it isn't there the dump failed
+    if mode == CDS_DUMP and state["key"] and not path.exists(path.join(cds_directory, f"{state['key']}.jsa")):
+        state["failures"] += 1
+
+    state["launches"].append({"cds": mode, "startup": startup})
+    state["launches"] = state["launches"][-MAX_LAUNCHES:]
+
+    write_state(cds_directory, state)
+
+def get_startup_times(minecraft_directory:str, version:str, game_directory:str)->dict[str, float]:
+    # average launch to main menu time per cds mode
+    launches = read_state(get_cds_directory(minecraft_directory, version, game_directory))["launches"]
+
+    times = {}
+    for mode in [CDS_OFF, CDS_DUMP, CDS_USE]:
+        startups = [l["startup"] for l in launches if l["cds"] == mode and l["startup"] != None]
+        if startups:
+            times[mode] = sum(startups) / len(startups)
+
+    return times
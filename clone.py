@@ -0,0 +1,85 @@
+from os import path
+import os
+import json
+import shutil
+
+# Content that the game only reads, it is hardlinked when reflinks aren't supported
+IMMUTABLE_DIRECTORIES = ["mods", "resourcepacks", "shaderpacks"]
+IMMUTABLE_EXTENSIONS = (".jar", ".zip")
+
+FICLONE = 0x40049409
+
+def reflink(source:str, destination:str)->bool:
+    # copy on write clone of a file, only supported by some filesystems (btrfs, xfs...)
+    if os.name != "posix":
+        return False
+
+    import fcntl
+
+    try:
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        if path.exists(destination):
+            os.remove(destination)
+        return False
+
+def hardlink(source:str, destination:str)->bool:
+    try:
+        os.link(source, destination)
+        return True
+    except OSError:
+        return False
+
+def is_immutable(relative:str)->bool:
+    parts = relative.split(os.sep)
+    return len(parts) > 1 and parts[0] in IMMUTABLE_DIRECTORIES and relative.endswith(IMMUTABLE_EXTENSIONS)
+
+def clone_tree(source:str, destination:str):
+    # reflinks every file when the filesystem supports it, otherwise only immutable files are hardlinked
+    # mutable files (saves, configs...) are copied: the game writes them in place, through a hardlink it would change the other profile too
+    # without reflinks a clone therefore costs as much as copying the saves, see the clone_profile benchmark
+    use_reflinks = True
+
+    for root, dirs, files in os.walk(source):
+        relative_root = path.relpath(root, source)
+        destination_root = path.normpath(path.join(destination, relative_root))
+        os.makedirs(destination_root, exist_ok=True)
+
+        for file in files:
+            source_file = path.join(root, file)
+            destination_file = path.join(destination_root, file)
+            relative = path.normpath(path.join(relative_root, file))
+
+            if use_reflinks:
+                if reflink(source_file, destination_file):
+                    shutil.copystat(source_file, destination_file)
+                    continue
+                # the filesystem doesn't support reflinks, don't try for every file
+                use_reflinks = False
+
+            if is_immutable(relative) and hardlink(source_file, destination_file):
+                continue
+
+            shutil.copy2(source_file, destination_file)
+
+def clone_profile(source_path:str, destination_path:str, profile_name:str):
+    os.makedirs(destination_path)
+
+    clone_tree(path.join(source_path, "game"), path.join(destination_path, "game"))
+
+    with open(path.join(source_path, "profile.json"), "r") as f:
+        profile_data = json.load(f)
+
+    profile_data["profile_name"] = profile_name
+
+    with open(path.join(destination_path, "profile.json"), "w") as f:
+        f.write(json.dumps(profile_data))
+
+def replace_file(source:str, destination:str):
+    # copies over destination without writing into it, a file hardlinked to another profile stays untouched
+    os.makedirs(path.dirname(destination), exist_ok=True)
+    temp_destination = destination + ".clone"
+    shutil.copy(source, temp_destination)
+    os.replace(temp_destination, destination)
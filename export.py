@@ -0,0 +1,120 @@
+from os import path
+import os
+import json
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import clone
+import updates
+import tracing
+from hashes import hash_file
+
+# Exports a profile as an mrpack (https://support.modrinth.com/en/articles/8802351-modrinth-modpack-format-mrpack)
+# Jars modrinth knows are referenced by url, everything else is streamed into overrides/
+
+# generated by the game and not part of the pack
+EXCLUDED = ["logs", "crash-reports", "screenshots", "saves", ".fabric", ".mixin.out", "usercache.json", "usernamecache.json"]
+# already compressed, deflating them again only costs time
+STORED_EXTENSIONS = (".jar", ".zip", ".png", ".ogg")
+
+# the pack version of a profile that wasn't installed from a pack
+DEFAULT_VERSION_ID = "1.0.0"
+
+MAX_WORKERS = 8
+CHUNK_SIZE = 1024 * 1024
+
+LOADER_DEPENDENCIES = {
+    "fabric": "fabric-loader",
+    "quilt": "quilt-loader",
+    "forge": "forge",
+}
+
+def get_export_files(game_directory:str)->list[str]:
+    # relative paths with / separators
+    files = []
+    for root, dirs, names in os.walk(game_directory):
+        relative_root = path.relpath(root, game_directory)
+        if relative_root == ".":
+            dirs[:] = [d for d in dirs if d not in EXCLUDED]
+            names = [n for n in names if n not in EXCLUDED]
+            relative_root = ""
+
+        for name in names:
+            files.append(path.join(relative_root, name).replace(os.sep, "/"))
+
+    return sorted(files)
+
+def get_download_urls(hashes:dict[str, dict])->dict[str, str]:
+    # {relative path: download url} of the files modrinth has, looked up in a single request
+    versions = updates.get_current_versions(sorted({h["sha1"] for h in hashes.values()}))
+    if not versions:
+        return {}
+
+    urls = {}
+    for relative, file_hashes in hashes.items():
+        version = versions.get(file_hashes["sha1"])
+        if not version:
+            continue
+
+        for file in version.get("files", []):
+            if file.get("hashes", {}).get("sha1") == file_hashes["sha1"]:
+                urls[relative] = file["url"]
+
+    return urls
+
+def write_override(pack:zipfile.ZipFile, file:str, name:str):
+    info = zipfile.ZipInfo.from_file(file, name)
+    info.compress_type = zipfile.ZIP_STORED if name.endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+    # streamed in chunks so large files never have to fit in memory
+    with open(file, "rb") as source, pack.open(info, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as destination:
+        shutil.copyfileobj(source, destination, CHUNK_SIZE)
+
+@tracing.traced("export.mrpack")
+def export_mrpack(game_directory:str, output:str, name:str, minecraft_version:str, mod_loader:str|None=None, mod_loader_version:str|None=None, lookup:bool=True, version_id:str=DEFAULT_VERSION_ID)->dict:
+    files = get_export_files(game_directory)
+    # only mods, resource packs and shader packs can be downloads
+    candidates = [f for f in files if clone.is_immutable(f.replace("/", os.sep))]
+
+    with tracing.span("export.hash", files=len(candidates)):
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            hashes = dict(zip(candidates, executor.map(lambda f: hash_file(path.join(game_directory, f), ["sha1", "sha512"]), candidates)))
+
+    urls = get_download_urls(hashes) if lookup and hashes else {}
+
+    dependencies = {"minecraft": minecraft_version}
+    if mod_loader in LOADER_DEPENDENCIES and mod_loader_version:
+        dependencies[LOADER_DEPENDENCIES[mod_loader]] = mod_loader_version
+
+    index = {
+        "formatVersion": 1,
+        "game": "minecraft",
+        "versionId": version_id,
+        "name": name,
+        "files": [],
+        "dependencies": dependencies
+    }
+
+    for relative in sorted(urls):
+        index["files"].append({
+            "path": relative,
+            "hashes": hashes[relative],
+            "env": {"client": "required", "server": "required" if relative.startswith("mods/") else "unsupported"},
+            "downloads": [urls[relative]],
+            "fileSize": os.stat(path.join(game_directory, relative)).st_size
+        })
+
+    overrides = [f for f in files if f not in urls]
+
+    # written next to the output and renamed, a failed export never leaves a broken pack behind
+    temp_output = output + ".part"
+    with tracing.span("export.zip", files=len(overrides)):
+        with zipfile.ZipFile(temp_output, "w", zipfile.ZIP_DEFLATED) as pack:
+            pack.writestr("modrinth.index.json", json.dumps(index, indent=4))
+            for relative in overrides:
+                write_override(pack, path.join(game_directory, relative), f"overrides/{relative}")
+
+    os.replace(temp_output, output)
+
+    return {"referenced": len(urls), "overrides": len(overrides)}
@@ -0,0 +1,180 @@
+from os import path
+import os
+import json
+import shutil
+import hashlib
+import zipfile
+import contextlib
+
+import minecraft_launcher_lib
+
+import version_info
+from hashes import sha1_file
+
+# Cache of finished forge installs, so a known forge build is restored instead of running its processors again
+#
+#   installers/forge-<version>-installer.jar
+#   objects/<sha1[:2]>/<sha1>                   content of every file an install produced
+#   builds/<minecraft>-<forge>.json             {"id", "files": {relative path: {"sha1", "size"}}}
+#
+# Paths are relative to the minecraft directory, so the cache can be copied to another machine
+# or shared with PML_FORGE_CACHE
+
+FORGE_CACHE = os.environ.get("PML_FORGE_CACHE", "")
+
+CHUNK_SIZE = 1024 * 1024
+
+def get_cache_directory(minecraft_directory:str)->str:
+    return FORGE_CACHE or path.join(minecraft_directory, "forge_cache")
+
+def get_installer_name(minecraft_version:str, forge_version:str)->str:
+    return f"forge-{minecraft_version}-{forge_version}-installer.jar"
+
+def get_object_path(cache_directory:str, sha1:str)->str:
+    return path.join(cache_directory, "objects", sha1[:2], sha1)
+
+def get_build_file(cache_directory:str, minecraft_version:str, forge_version:str)->str:
+    return path.join(cache_directory, "builds", f"{minecraft_version}-{forge_version}.json")
+
+def copy_file(source:str, destination:str)->str:
+    # copies through a temporary file and returns the sha1 of what was copied
+    os.makedirs(path.dirname(destination), exist_ok=True)
+    temp_destination = f"{destination}.tmp-{os.getpid()}"
+
+    sha1 = hashlib.sha1()
+    with open(source, "rb") as src, open(temp_destination, "wb") as dst:
+        for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+            sha1.update(chunk)
+            dst.write(chunk)
+
+    os.replace(temp_destination, destination)
+    return sha1.hexdigest()
+
+@contextlib.contextmanager
+def cached_installer(cache_directory:str):
+    # minecraft_launcher_lib downloads the installer into a temporary directory, keep a copy of it
+    original_download_file = minecraft_launcher_lib.forge.download_file
+
+    def download_file(url:str, file:str, *args, **kwargs)->bool:
+        if not url.endswith("-installer.jar"):
+            return original_download_file(url, file, *args, **kwargs)
+
+        cached = path.join(cache_directory, "installers", url.rsplit("/", 1)[-1])
+        if not path.exists(cached):
+            if not original_download_file(url, file, *args, **kwargs):
+                return False
+            copy_file(file, cached)
+            return True
+
+        # like the original, the directory of file may not exist yet
+        os.makedirs(path.dirname(file), exist_ok=True)
+        shutil.copy(cached, file)
+        return True
+
+    minecraft_launcher_lib.forge.download_file = download_file
+    try:
+        yield
+    finally:
+        minecraft_launcher_lib.forge.download_file = original_download_file
+
+def read_install_profile(installer:str)->dict:
+    with zipfile.ZipFile(installer, "r") as zf:
+        return json.loads(zf.read("install_profile.json"))
+
+def get_build_files(minecraft_directory:str, installer:str, minecraft_version:str, forge_version:str)->tuple[str, list[str]]|None:
+    # (version id, files) of everything the install wrote that can't be downloaded, None if something is missing
+    install_profile = read_install_profile(installer)
+    version_id = install_profile.get("version") or install_profile.get("install", {}).get("version")
+
+    files = []
+    missing = []
+
+    # the version json and the forge jars extracted from the installer or written by the processors
+    for directory in [path.join("versions", version_id), path.join("libraries", "net", "minecraftforge", "forge", f"{minecraft_version}-{forge_version}")]:
+        for root, dirs, names in os.walk(path.join(minecraft_directory, directory)):
+            # natives are platform specific and extracted again at launch
+            dirs[:] = [d for d in dirs if d != "natives"]
+            for name in names:
+                files.append(path.relpath(path.join(root, name), minecraft_directory))
+
+    with zipfile.ZipFile(installer, "r") as zf:
+        for name in zf.namelist():
+            if name.startswith("maven/") and not name.endswith("/"):
+                files.append(path.join("libraries", *name.removeprefix("maven/").split("/")))
+
+    # processor inputs and outputs, the deobfuscated and patched client jars
+    for value in install_profile.get("data", {}).values():
+        client = value.get("client", "")
+        if client.startswith("[") and client.endswith("]"):
+            files.append(path.join("libraries", *version_info.get_maven_path(client[1:-1]).split("/")))
+
+    files = sorted({f.replace(os.sep, "/") for f in files})
+    for file in files:
+        if not path.isfile(path.join(minecraft_directory, file)):
+            missing.append(file)
+
+    if missing or not path.join("versions", version_id, f"{version_id}.json").replace(os.sep, "/") in files:
+        print(f"Not caching forge {minecraft_version}-{forge_version}, the install is missing {', '.join(missing) or 'its version json'}.")
+        return None
+
+    return (version_id, files)
+
+def store_build(minecraft_directory:str, minecraft_version:str, forge_version:str)->bool:
+    cache_directory = get_cache_directory(minecraft_directory)
+    installer = path.join(cache_directory, "installers", get_installer_name(minecraft_version, forge_version))
+    if not path.exists(installer):
+        return False
+
+    build = get_build_files(minecraft_directory, installer, minecraft_version, forge_version)
+    if build == None:
+        return False
+
+    version_id, files = build
+    manifest = {"id": version_id, "files": {}}
+
+    for file in files:
+        source = path.join(minecraft_directory, *file.split("/"))
+        sha1 = sha1_file(source)
+
+        # objects are shared between builds, mcp data is the same for every forge build of a minecraft version
+        object_path = get_object_path(cache_directory, sha1)
+        if not path.exists(object_path):
+            copy_file(source, object_path)
+
+        manifest["files"][file] = {"sha1": sha1, "size": os.stat(source).st_size}
+
+    build_file = get_build_file(cache_directory, minecraft_version, forge_version)
+    os.makedirs(path.dirname(build_file), exist_ok=True)
+    with open(build_file + ".tmp", "w") as f:
+        f.write(json.dumps(manifest, indent=4))
+    os.replace(build_file + ".tmp", build_file)
+
+    return True
+
+def restore_build(minecraft_directory:str, minecraft_version:str, forge_version:str)->str|None:
+    # copies a cached build into the minecraft directory and returns its version id
+    cache_directory = get_cache_directory(minecraft_directory)
+    build_file = get_build_file(cache_directory, minecraft_version, forge_version)
+    if not path.exists(build_file):
+        return None
+
+    with open(build_file, "r") as f:
+        manifest = json.load(f)
+
+    for file, entry in manifest["files"].items():
+        if not path.exists(get_object_path(cache_directory, entry["sha1"])):
+            print(f"The forge cache is missing {file}, installing normally.")
+            return None
+
+    # the version json goes last, until then the version doesn't count as installed
+    version_json = f"versions/{manifest['id']}/{manifest['id']}.json"
+    for file in sorted(manifest["files"], key=lambda f: f == version_json):
+        entry = manifest["files"][file]
+        destination = path.join(minecraft_directory, *file.split("/"))
+
+        if copy_file(get_object_path(cache_directory, entry["sha1"]), destination) != entry["sha1"]:
+            print(f"The forge cache entry of {file} is corrupted, installing normally.")
+            os.remove(destination)
+            return None
+
+    return manifest["id"]
@@ -0,0 +1,89 @@
+from os import path
+import os
+import json
+import hashlib
+import threading
+
+# File hashes shared by every module
+# A HashIndex remembers the sha1 of files by their size and mtime, so unchanged files are never read twice,
+# the index of a minecraft directory is stored in hash_index.json as {path: [size, mtime_ns, sha1]}
+
+INDEX_FILE = "hash_index.json"
+CHUNK_SIZE = 1024 * 1024
+
+def hash_file(file:str, algorithms:list[str]=["sha1"])->dict[str, str]:
+    # {algorithm: hex digest}, the file is read once for all of them
+    digests = [hashlib.new(algorithm) for algorithm in algorithms]
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            for digest in digests:
+                digest.update(chunk)
+
+    return {algorithm: digest.hexdigest() for algorithm, digest in zip(algorithms, digests)}
+
+def sha1_file(file:str)->str:
+    return hash_file(file)["sha1"]
+
+class HashIndex:
+    index_file:str|None
+
+    def __init__(self, index_file:str|None=None) -> None:
+        # without an index file the hashes are only remembered in memory
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._entries:dict[str, list] = self._load()
+        self._changed = False
+
+    def _load(self)->dict[str, list]:
+        if self.index_file == None or not path.exists(self.index_file):
+            return {}
+
+        try:
+            with open(self.index_file, "r") as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def sha1(self, file:str)->str:
+        # raises OSError when the file doesn't exist
+        file = path.abspath(file)
+        stat = os.stat(file)
+
+        with self._lock:
+            entry = self._entries.get(file)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+
+        sha1 = sha1_file(file)
+        with self._lock:
+            self._entries[file] = [stat.st_size, stat.st_mtime_ns, sha1]
+            self._changed = True
+
+        return sha1
+
+    def save(self):
+        if self.index_file == None or not self._changed:
+            return
+
+        with self._lock:
+            # files that were deleted since don't need to be remembered
+            entries = {file: entry for file, entry in self._entries.items() if path.exists(file)}
+            self._changed = False
+
+        with open(self.index_file + ".tmp", "w") as f:
+            f.write(json.dumps(entries))
+        os.replace(self.index_file + ".tmp", self.index_file)
+
+_indexes:dict[str, HashIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_index(minecraft_directory:str)->HashIndex:
+    # one index per minecraft directory, shared by everything running in the process
+    index_file = path.join(path.abspath(minecraft_directory), INDEX_FILE)
+
+    with _indexes_lock:
+        index = _indexes.get(index_file)
+        if index == None:
+            index = _indexes[index_file] = HashIndex(index_file)
+
+        return index
@@ -0,0 +1,219 @@
+from os import path
+import os
+import re
+import json
+
+# Per profile jvm settings, stored in profile.json as
+# "jvm": {"heap_min": 1024, "heap_max": "auto", "gc": "g1", "preset": "large_modpack", "extra": []}
+
+DEFAULT_HEAP = 4096
+MIN_HEAP = 1024
+MAX_AUTO_HEAP = 16384
+
+# auto heap: a base for the game plus some memory per mod
+AUTO_BASE_HEAP = 2048
+AUTO_HEAP_PER_MOD = 24
+# memory left for the os and other programs
+RESERVED_MEMORY = 2048
+
+GC_FLAGS = {
+    "default": [],
+    "g1": ["-XX:+UseG1GC"],
+    "zgc": ["-XX:+UseZGC"],
+    "shenandoah": ["-XX:+UseShenandoahGC"],
+    "parallel": ["-XX:+UseParallelGC"],
+}
+
+PRESETS = {
+    "default": [],
+    "modpack": [
+        "-XX:+UseG1GC",
+        "-XX:+ParallelRefProcEnabled",
+        "-XX:MaxGCPauseMillis=200",
+        "-XX:+DisableExplicitGC",
+    ],
+    # based on the g1 flags commonly used for large modpacks (aikar's flags)
+    "large_modpack": [
+        "-XX:+UseG1GC",
+        "-XX:+ParallelRefProcEnabled",
+        "-XX:MaxGCPauseMillis=200",
+        "-XX:+UnlockExperimentalVMOptions",
+        "-XX:+DisableExplicitGC",
+        "-XX:+AlwaysPreTouch",
+        "-XX:G1NewSizePercent=30",
+        "-XX:G1MaxNewSizePercent=40",
+        "-XX:G1HeapRegionSize=8M",
+        "-XX:G1ReservePercent=20",
+        "-XX:G1HeapWastePercent=5",
+        "-XX:G1MixedGCCountTarget=4",
+        "-XX:InitiatingHeapOccupancyPercent=15",
+        "-XX:G1MixedGCLiveThresholdPercent=90",
+        "-XX:G1RSetUpdatingPauseTimePercent=5",
+        "-XX:SurvivorRatio=32",
+        "-XX:+PerfDisableSharedMem",
+        "-XX:MaxTenuringThreshold=1",
+    ],
+}
+
+SETTINGS = ["heap_min", "heap_max", "gc", "preset", "extra"]
+
+def get_total_memory()->int:
+    # host memory in MiB
+    if os.name == "nt":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("sullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+        return status.ullTotalPhys // (1024 * 1024)
+
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+
+def pid_alive(pid:int)->bool:
+    if os.name == "nt":
+        import ctypes
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+
+        handle = ctypes.windll.kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+
+        exit_code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return exit_code.value == STILL_ACTIVE
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+def get_running_directory(minecraft_directory:str)->str:
+    return path.join(minecraft_directory, "running")
+
+def register_instance(minecraft_directory:str, pid:int, heap:int, version:str):
+    running_directory = get_running_directory(minecraft_directory)
+    os.makedirs(running_directory, exist_ok=True)
+
+    with open(path.join(running_directory, f"{pid}.json"), "w") as f:
+        f.write(json.dumps({"pid": pid, "heap": heap, "version": version}))
+
+def unregister_instance(minecraft_directory:str, pid:int):
+    instance_file = path.join(get_running_directory(minecraft_directory), f"{pid}.json")
+    if path.exists(instance_file):
+        os.remove(instance_file)
+
+def get_running_instances(minecraft_directory:str)->list[dict]:
+    running_directory = get_running_directory(minecraft_directory)
+    if not path.isdir(running_directory):
+        return []
+
+    instances = []
+    for entry in os.scandir(running_directory):
+        try:
+            with open(entry.path, "r") as f:
+                instance = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        # instances that crashed or were killed never unregistered
+        if not pid_alive(instance["pid"]):
+            os.remove(entry.path)
+            continue
+
+        instances.append(instance)
+
+    return instances
+
+def count_mods(game_directory:str)->int:
+    mods_directory = path.join(game_directory, "mods")
+    if not path.isdir(mods_directory):
+        return 0
+
+    return sum(1 for entry in os.scandir(mods_directory) if entry.name.endswith(".jar"))
+
+def get_auto_heap(minecraft_directory:str, game_directory:str)->int:
+    wanted = min(AUTO_BASE_HEAP + count_mods(game_directory) * AUTO_HEAP_PER_MOD, MAX_AUTO_HEAP)
+
+    used = sum(instance["heap"] for instance in get_running_instances(minecraft_directory))
+    available = get_total_memory() - RESERVED_MEMORY - used
+
+    return max(MIN_HEAP, min(wanted, available))
+
+def get_jvm_arguments(minecraft_directory:str, game_directory:str, settings:dict|None, memory_alloc:int|None=None)->list[str]:
+    settings = settings or {}
+
+    heap_max = memory_alloc or settings.get("heap_max") or DEFAULT_HEAP
+    if heap_max == "auto":
+        heap_max = get_auto_heap(minecraft_directory, game_directory)
+
+    arguments = [f"-Xmx{int(heap_max)}m"]
+
+    heap_min = settings.get("heap_min")
+    if heap_min:
+        arguments.append(f"-Xms{min(int(heap_min), int(heap_max))}m")
+
+    preset = PRESETS.get(settings.get("preset") or "default", [])
+    gc = settings.get("gc") or "default"
+
+    # an explicitly chosen collector replaces the one of the preset
+    if gc not in ["default", "g1"]:
+        preset = [flag for flag in preset if "G1" not in flag and not re.fullmatch(r"-XX:\+Use\w+GC", flag)]
+
+    for flag in preset + GC_FLAGS.get(gc, []):
+        if flag not in arguments:
+            arguments.append(flag)
+
+    arguments.extend(settings.get("extra", []))
+
+    return arguments
+
+def get_heap(arguments:list[str])->int:
+    # the -Xmx of a command in MiB
+    for argument in arguments:
+        match = re.fullmatch(r"-Xmx(\d+)([kmgKMG]?)", argument)
+        if match:
+            value = int(match.group(1))
+            unit = match.group(2).lower()
+            return {"k": value // 1024, "m": value, "g": value * 1024}.get(unit, value // (1024 * 1024))
+
+    return 0
+
+def parse_setting(key:str, value:str)->tuple[bool, object]:
+    # validates a setting from the command line, returns (valid, value)
+    if key in ["heap_min", "heap_max"]:
+        if key == "heap_max" and value == "auto":
+            return (True, value)
+        if value.isdigit() and int(value) >= 256:
+            return (True, int(value))
+        return (False, None)
+
+    if key == "gc":
+        return (value in GC_FLAGS, value)
+
+    if key == "preset":
+        return (value in PRESETS, value)
+
+    if key == "extra":
+        return (True, value.split())
+
+    return (False, None)
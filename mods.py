@@ -0,0 +1,159 @@
+from os import path
+import os
+import json
+import tomllib
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import hashes
+
+# Index of the mods of a profile, stored in mods_index.json next to profile.json
+# Only the zip central directory and the loader metadata entry of each jar are read,
+# jars are only read again when their size or mtime changes
+
+INDEX_FILE = "mods_index.json"
+MOD_EXTENSIONS = (".jar", ".jar.disabled")
+MAX_WORKERS = 8
+
+def parse_fabric(data:bytes)->dict:
+    # some mods have raw newlines in their descriptions
+    metadata = json.loads(data, strict=False)
+    return {
+        "loader": "fabric",
+        "id": metadata.get("id"),
+        "name": metadata.get("name", metadata.get("id")),
+        "version": metadata.get("version"),
+        "depends": sorted(metadata.get("depends", {}))
+    }
+
+def parse_quilt(data:bytes)->dict:
+    loader = json.loads(data, strict=False).get("quilt_loader", {})
+    depends = []
+    for dependency in loader.get("depends", []):
+        depends.append(dependency if isinstance(dependency, str) else dependency.get("id"))
+
+    return {
+        "loader": "quilt",
+        "id": loader.get("id"),
+        "name": loader.get("metadata", {}).get("name", loader.get("id")),
+        "version": loader.get("version"),
+        "depends": sorted(d for d in depends if d)
+    }
+
+def parse_manifest_version(jar:zipfile.ZipFile)->str|None:
+    try:
+        manifest = jar.read("META-INF/MANIFEST.MF").decode(errors="replace")
+    except KeyError:
+        return None
+
+    for line in manifest.splitlines():
+        if line.startswith("Implementation-Version:"):
+            return line.partition(":")[2].strip()
+
+    return None
+
+def parse_forge(data:bytes, jar:zipfile.ZipFile, loader:str)->dict:
+    metadata = tomllib.loads(data.decode(errors="replace"))
+    mod = (metadata.get("mods") or [{}])[0]
+
+    version = mod.get("version")
+    # forge fills this in from the jar manifest at runtime
+    if version == "${file.jarVersion}":
+        version = parse_manifest_version(jar)
+
+    depends = [d.get("modId") for d in metadata.get("dependencies", {}).get(mod.get("modId"), []) if isinstance(d, dict)]
+
+    return {
+        "loader": loader,
+        "id": mod.get("modId"),
+        "name": mod.get("displayName", mod.get("modId")),
+        "version": version,
+        "depends": sorted(d for d in depends if d)
+    }
+
+def read_mod(file:str)->dict:
+    try:
+        with zipfile.ZipFile(file, "r") as jar:
+            names = set(jar.namelist())
+
+            if "quilt.mod.json" in names:
+                return parse_quilt(jar.read("quilt.mod.json"))
+            if "fabric.mod.json" in names:
+                return parse_fabric(jar.read("fabric.mod.json"))
+            if "META-INF/neoforge.mods.toml" in names:
+                return parse_forge(jar.read("META-INF/neoforge.mods.toml"), jar, "neoforge")
+            if "META-INF/mods.toml" in names:
+                return parse_forge(jar.read("META-INF/mods.toml"), jar, "forge")
+    except (zipfile.BadZipFile, OSError, ValueError, tomllib.TOMLDecodeError) as e:
+        return {"loader": None, "id": None, "name": None, "version": None, "depends": [], "error": str(e)}
+
+    return {"loader": None, "id": None, "name": None, "version": None, "depends": []}
+
+def read_index(profile_path:str)->dict:
+    index_file = path.join(profile_path, INDEX_FILE)
+    if not path.exists(index_file):
+        return {}
+
+    try:
+        with open(index_file, "r") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def write_index(profile_path:str, index:dict):
+    with open(path.join(profile_path, INDEX_FILE), "w") as f:
+        f.write(json.dumps(index))
+
+def update_index(profile_path:str)->dict[str, dict]:
+    # returns {file name: mod}, reading only the jars that were added or changed
+    mods_directory = path.join(profile_path, "game", "mods")
+    old_index = read_index(profile_path)
+
+    index = {}
+    changed = []
+    if path.isdir(mods_directory):
+        for entry in os.scandir(mods_directory):
+            if not entry.is_file() or not entry.name.endswith(MOD_EXTENSIONS):
+                continue
+
+            stat = entry.stat()
+            mod = old_index.get(entry.name)
+            if mod and mod["size"] == stat.st_size and mod["mtime"] == stat.st_mtime_ns:
+                index[entry.name] = mod
+                continue
+
+            index[entry.name] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+            changed.append(entry)
+
+    def read(entry:os.DirEntry):
+        index[entry.name].update(read_mod(entry.path))
+        index[entry.name]["enabled"] = entry.name.endswith(".jar")
+
+    if changed:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            list(executor.map(read, changed))
+
+    # removed jars change the index too
+    if changed or len(index) != len(old_index):
+        write_index(profile_path, index)
+
+    return index
+
+def get_hash_index(profile_path:str)->hashes.HashIndex:
+    # profiles are in <minecraft directory>/profiles/<name> and share the hash index of the minecraft directory
+    return hashes.get_index(path.dirname(path.dirname(path.abspath(profile_path))))
+
+def add_hashes(profile_path:str, index:dict[str, dict])->dict[str, dict]:
+    # adds the sha1 of every mod, only jars that changed since they were last hashed are read
+    mods_directory = path.join(profile_path, "game", "mods")
+    hash_index = get_hash_index(profile_path)
+
+    def hash_mod(name:str):
+        index[name]["sha1"] = hash_index.sha1(path.join(mods_directory, name))
+
+    if index:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            list(executor.map(hash_mod, index))
+        hash_index.save()
+
+    return index
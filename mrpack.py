@@ -2,11 +2,14 @@ import json
 from os import path
 import os
 import zipfile
-import tempfile
-import hashlib
 import shutil
 import urllib.request
 import minecraft_launcher_lib
+import networkutils
+import tracing
+import retry
+
+from scheduler import get_scheduler, PRIORITY_CRITICAL, PRIORITY_BACKGROUND
 
 LAUNCHER_NAME = "PyLauncher"
 
@@ -35,15 +38,48 @@ def unzip(archive:str, output:str):
     with zipfile.ZipFile(archive, "r") as zip_ref:
         zip_ref.extractall(output)
 
-def download_file(url:str, install_location:str, overwrite=False):
+def download_file(url:str, install_location:str, overwrite=False, priority:int=PRIORITY_CRITICAL, sha1:str|None=None):
     os.makedirs(path.dirname(install_location), exist_ok=True)
     if not overwrite and path.exists(install_location):
         return
     
-    request = urllib.request.Request(url, None, MODERINTH_REQUEST_HEADER)
-
-    with urllib.request.urlopen(request) as response, open(install_location, "wb") as out_file:
-        shutil.copyfileobj(response, out_file)
+    scheduler = get_scheduler()
+    temp_location = install_location + ".part"
+
+    def attempt():
+        with tracing.span("mrpack.download") as span, scheduler.job(url, priority):
+            # try the LAN cache first
+            cache_url = networkutils.get_cache_url(url, sha1)
+            if cache_url:
+                try:
+                    with urllib.request.urlopen(cache_url, timeout=retry.CACHE_TIMEOUT[0]) as response, open(temp_location, "wb") as out_file:
+                        span.add("bytes", scheduler.copy_stream(response, out_file, url, priority))
+                    tracing.count("cache.hit")
+                    return
+                except OSError:
+                    tracing.count("cache.miss")
+
+            request = urllib.request.Request(url, None, MODERINTH_REQUEST_HEADER)
+
+            with urllib.request.urlopen(request, timeout=retry.READ_TIMEOUT) as response, open(temp_location, "wb") as out_file:
+                span.add("bytes", scheduler.copy_stream(response, out_file, url, priority))
+
+    try:
+        retry.call(attempt, url)
+        networkutils.verify_file(url, temp_location, sha1)
+    except BaseException:
+        if path.exists(temp_location):
+            os.remove(temp_location)
+        raise
+
+    os.replace(temp_location, install_location)
+
+def get_file_priority(file:dict)->int:
+    # optional mods aren't needed to start the game so they can be downloaded in the background
+    if file.get("env", {}).get("client", "required") == "optional":
+        return PRIORITY_BACKGROUND
+
+    return PRIORITY_CRITICAL
 
 def update_status(callback:minecraft_launcher_lib.types.CallbackDict|None, status:str):
     if not callback:
@@ -63,62 +99,38 @@ def update_max(callback:minecraft_launcher_lib.types.CallbackDict|None, max:int)
 
     callback["setMax"](max)
 
-def install_mrpack(mrpack:str, install_location:str, callback:minecraft_launcher_lib.types.CallbackDict|None=None)->tuple[str, tuple[str, str]]:
-    if not path.exists(mrpack):
-        return
-    
-    TEMP_PATH = path.join(tempfile.gettempdir(), f"{LAUNCHER_NAME}")
-    pack_folder = path.join(TEMP_PATH, str(int(hashlib.sha1(path.basename(mrpack).encode("utf-8")).hexdigest(), 16) % (10 ** 8)))
-
-    # unzip mrpack
-    update_status(callback, "Unzipping mrpack")
-    unzip(mrpack, pack_folder)
-
-    # read the index.json
-    pack_info = json_read(path.join(pack_folder, "modrinth.index.json"))
-
-    # copy overrides
-    update_status(callback, "Copying overrides")
-    overrides_path = path.join(pack_folder, "overrides")
-
-    overrides = []
-
-    if path.exists(overrides_path):
-        for root, dirs, files in os.walk(overrides_path):
-            for file in files:
-                overrides.append(os.path.join(root,file))
-    
-    update_max(callback, len(overrides))
-    update_status(callback, "Copying overrides")
-
-    for i, value in enumerate(overrides):
-        update_progress(callback, i)
-        update_status(callback, f"Copying {path.basename(value)}")
-        local_path = path.relpath(value, overrides_path)
-
-        destination_path = path.join(install_location, local_path)
-        os.makedirs(path.dirname(destination_path), exist_ok=True)
-        shutil.copy(value, destination_path)
-    
-    # download pack files
-    file_count = len(pack_info["files"])
-    update_status(callback, "Downloading pack dependencies")
-    update_max(callback, file_count)
-    
-    for i, file in enumerate(pack_info["files"]):
-        file_path = file["path"]
-        downloads = file["downloads"]
-        filesize = file["fileSize"]
-
-        update_progress(callback, i)
-        update_status(callback, f"Downloading {path.basename(file_path)}")
-        
-        download_file(downloads[0], path.join(install_location, file_path))
-
-    shutil.rmtree(pack_folder)
-    
-    # download version
-
+def read_index(mrpack:str)->dict:
+    # modrinth.index.json without unzipping the pack
+    with zipfile.ZipFile(mrpack, "r") as pack:
+        return json.loads(pack.read("modrinth.index.json"))
+
+def extract_overrides(mrpack:str, install_location:str, callback:minecraft_launcher_lib.types.CallbackDict|None=None)->int:
+    # streams overrides/ and client-overrides/ of the pack into install_location
+    count = 0
+    with zipfile.ZipFile(mrpack, "r") as pack:
+        overrides = [info for prefix in ["overrides/", "client-overrides/"] for info in pack.infolist() if not info.is_dir() and info.filename.startswith(prefix)]
+        update_max(callback, len(overrides))
+
+        for info in overrides:
+            local_path = info.filename.split("/", 1)[1]
+            destination_path = path.realpath(path.join(install_location, local_path))
+            if not destination_path.startswith(path.realpath(install_location) + os.sep):
+                continue
+
+            update_progress(callback, count)
+            update_status(callback, f"Copying {path.basename(local_path)}")
+
+            # written next to the file and swapped in, the old file can be hardlinked to another profile
+            os.makedirs(path.dirname(destination_path), exist_ok=True)
+            temp_path = destination_path + ".part"
+            with pack.open(info) as source, open(temp_path, "wb") as destination:
+                shutil.copyfileobj(source, destination, 1024 * 1024)
+            os.replace(temp_path, destination_path)
+            count += 1
+
+    return count
+
+def get_pack_version(pack_info:dict)->tuple[str, tuple[str, str]]:
     dependencies:dict[str, str] = dict(pack_info["dependencies"])
     minercaft_version = dependencies["minecraft"]
     mod_loader = None
@@ -142,3 +154,33 @@ def install_mrpack(mrpack:str, install_location:str, callback:minecraft_launcher
 
     return (minercaft_version, (mod_loader, mod_loader_version))
 
+@tracing.traced("mrpack.install")
+def install_mrpack(mrpack:str, install_location:str, callback:minecraft_launcher_lib.types.CallbackDict|None=None)->tuple[str, tuple[str, str]]:
+    if not path.exists(mrpack):
+        return
+    
+    # read the index.json
+    pack_info = read_index(mrpack)
+
+    # copy overrides straight from the pack
+    update_status(callback, "Copying overrides")
+    with tracing.span("mrpack.overrides") as span:
+        span.set("files", extract_overrides(mrpack, install_location, callback))
+
+    # download pack files
+    file_count = len(pack_info["files"])
+    update_status(callback, "Downloading pack dependencies")
+    update_max(callback, file_count)
+    
+    with tracing.span("mrpack.downloads", files=file_count):
+        for i, file in enumerate(pack_info["files"]):
+            file_path = file["path"]
+            downloads = file["downloads"]
+            filesize = file["fileSize"]
+
+            update_progress(callback, i)
+            update_status(callback, f"Downloading {path.basename(file_path)}")
+        
+            download_file(downloads[0], path.join(install_location, file_path), priority=get_file_priority(file), sha1=file.get("hashes", {}).get("sha1"))
+
+    return get_pack_version(pack_info)
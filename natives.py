@@ -0,0 +1,191 @@
+from os import path
+import os
+import json
+import stat
+import shutil
+import hashlib
+import platform
+import tempfile
+import zipfile
+
+import version_info
+from hashes import sha1_file
+
+# Natives are extracted once per set of native jars and architecture into
+# natives/<key>, the key is a hash of the jars, so every version and every
+# running instance using the same natives share one read-only directory
+
+NATIVE_EXTENSIONS = (".so", ".dll", ".dylib", ".jnilib")
+MANIFEST_FILE = ".manifest.json"
+
+# 1.19+ point these at ${natives_directory} too, the jvm extracts into them at runtime
+EXTRACT_PROPERTIES = ["-Djna.tmpdir=", "-Dorg.lwjgl.system.SharedLibraryExtractPath=", "-Dio.netty.native.workdir="]
+
+def get_machine()->str:
+    machine = platform.machine().lower()
+    if machine in ["arm64", "aarch64"]:
+        return "arm64"
+    if version_info.get_arch() == "32":
+        return "x86"
+
+    return "x64"
+
+def get_machine_suffix(file:dict)->tuple[str, str|None]:
+    # natives-windows-arm64, natives-windows-x86 and natives-windows are separate jars
+    name = path.basename(file["path"]).removesuffix(".jar")
+    for machine in ["arm64", "x86"]:
+        if name.endswith(f"-{machine}"):
+            return (name.removesuffix(f"-{machine}"), machine)
+
+    return (name, None)
+
+def filter_machine(files:list[dict])->list[dict]:
+    # the jars of this machine, an unsuffixed jar is only left out when the library has one for this machine
+    machine = get_machine()
+    own = {get_machine_suffix(f)[0] for f in files if get_machine_suffix(f)[1] == machine}
+
+    result = []
+    for file in files:
+        name, suffix = get_machine_suffix(file)
+        if suffix == machine or (suffix == None and (machine == "x64" or name not in own)):
+            result.append(file)
+
+    return result
+
+def get_native_files(minecraft_directory:str, version:str)->list[dict]:
+    chain = version_info.get_version_chain(minecraft_directory, version)
+    files = [f for f in version_info.get_library_files(minecraft_directory, chain) if f.get("natives")]
+
+    return filter_machine(files)
+
+def get_natives_key(files:list[dict])->str:
+    key = hashlib.sha1(f"{version_info.get_os_name()}-{get_machine()}".encode())
+    for file in sorted(files, key=lambda f: f["path"]):
+        # the sha1 from the version json, the file itself only when it isn't known
+        key.update((file.get("sha1") or sha1_file(file["path"])).encode())
+
+    return key.hexdigest()
+
+def extract_natives(files:list[dict], output:str)->dict[str, dict]:
+    manifest = {}
+
+    for file in files:
+        exclude = file.get("exclude", [])
+        with zipfile.ZipFile(file["path"], "r") as jar:
+            for info in jar.infolist():
+                if info.is_dir() or any(info.filename.startswith(e) for e in exclude):
+                    continue
+
+                name = info.filename
+                # natives inside library jars are nested by platform and next to classes, the jvm needs them flat
+                if file.get("flatten"):
+                    if not name.endswith(NATIVE_EXTENSIONS):
+                        continue
+                    name = path.basename(name)
+
+                destination = path.join(output, *name.split("/"))
+                os.makedirs(path.dirname(destination), exist_ok=True)
+
+                sha1 = hashlib.sha1()
+                with jar.open(info) as source, open(destination, "wb") as out_file:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                        sha1.update(chunk)
+                        out_file.write(chunk)
+
+                manifest[name] = {"size": info.file_size, "sha1": sha1.hexdigest()}
+
+    return manifest
+
+def verify_natives(directory:str, deep:bool=False)->bool:
+    manifest_file = path.join(directory, MANIFEST_FILE)
+    if not path.exists(manifest_file):
+        return False
+
+    with open(manifest_file, "r") as f:
+        manifest = json.load(f)
+
+    for name, entry in manifest.items():
+        file = path.join(directory, *name.split("/"))
+        try:
+            if os.stat(file).st_size != entry["size"]:
+                return False
+        except OSError:
+            return False
+
+        if deep and sha1_file(file) != entry["sha1"]:
+            return False
+
+    return True
+
+def make_read_only(directory:str):
+    # files first, a read-only directory can't be walked into on every platform
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            os.chmod(path.join(root, file), stat.S_IREAD)
+
+    for root, dirs, files in os.walk(directory, topdown=False):
+        os.chmod(root, stat.S_IREAD | stat.S_IEXEC)
+
+def remove_directory(directory:str):
+    # the directories have to be writable again before anything inside can be deleted
+    for root, dirs, files in os.walk(directory):
+        os.chmod(root, stat.S_IREAD | stat.S_IWRITE | stat.S_IEXEC)
+
+    def on_error(function, file, exc_info):
+        # read-only files can't be deleted on windows
+        os.chmod(file, stat.S_IWRITE)
+        function(file)
+
+    shutil.rmtree(directory, onerror=on_error)
+
+def create_extract_directory()->str:
+    # a private directory per launch for what the jvm extracts, the shared natives directory stays read-only
+    return tempfile.mkdtemp(prefix="pml-natives-")
+
+def set_extract_directory(command:list[str], directory:str)->list[str]:
+    for i, argument in enumerate(command):
+        for prefix in EXTRACT_PROPERTIES:
+            if argument.startswith(prefix):
+                command[i] = prefix + directory
+
+    return command
+
+def get_natives_directory(minecraft_directory:str, version:str)->str|None:
+    # returns the shared natives directory of the version, extracting it if needed
+    files = get_native_files(minecraft_directory, version)
+    # without every native jar the natives extracted by the install are used
+    if not files or not all(path.exists(f["path"]) for f in files):
+        return None
+
+    natives_root = path.join(minecraft_directory, "natives")
+    directory = path.join(natives_root, get_natives_key(files))
+
+    if verify_natives(directory):
+        return directory
+
+    # a broken directory from an interrupted extraction, verify it properly before replacing it
+    if path.isdir(directory):
+        if verify_natives(directory, deep=True):
+            return directory
+        remove_directory(directory)
+
+    # extract next to it and rename, so concurrent launches never see a half extracted directory
+    temp_directory = f"{directory}.tmp-{os.getpid()}"
+    if path.isdir(temp_directory):
+        remove_directory(temp_directory)
+    os.makedirs(temp_directory)
+
+    manifest = extract_natives(files, temp_directory)
+    with open(path.join(temp_directory, MANIFEST_FILE), "w") as f:
+        f.write(json.dumps(manifest))
+    make_read_only(temp_directory)
+
+    try:
+        os.rename(temp_directory, directory)
+    except OSError:
+        # another launch extracted the same natives first
+        remove_directory(temp_directory)
+        if not verify_natives(directory):
+            return None
+
+    return directory
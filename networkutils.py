@@ -1,5 +1,7 @@
 import requests
 import os
+import re
+import aiohttp
 from aiohttp import ClientSession
 import asyncio
 import aiofiles
@@ -7,55 +9,234 @@ import aiofiles.os
 
 import typing
 
+import hashes
+import tracing
+import retry
+from scheduler import get_scheduler, PRIORITY_NORMAL, CHUNK_SIZE
+
 class AsyncFile(typing.TypedDict):
     url:str
     path:str
 
-def get_file_contents(url:str, headers:dict={})->str:
-    
-    res = requests.get(url, headers=headers)
-    
-    if not res.content:
-        print(f"Couldn't access {url}")
-    
-    return res.content.decode()
-
-async def get_file_contents_async(url:str, headers:dict={})->str:
-    res = None
-    async with ClientSession() as session:
-        async with session.get(url) as response:
-            res = await response.read()
-    
+class EmptyResponse(Exception):
+    def __init__(self, url:str) -> None:
+        super().__init__(f"Empty response from {url}")
+
+class HashMismatch(Exception):
+    def __init__(self, url:str, expected:str, actual:str) -> None:
+        super().__init__(f"Hash mismatch for {url}, expected {expected} but got {actual}")
+
+# LAN cache (see cache_server.py), tried first before the upstream urls
+CACHE_URL = os.environ.get("PML_CACHE_URL", "")
+
+# maven repositories are mirrored into the libraries directory
+LIBRARY_URLS = [
+    "https://libraries.minecraft.net/",
+    "https://maven.minecraftforge.net/",
+    "https://maven.fabricmc.net/",
+    "https://maven.quiltmc.org/repository/release/",
+]
+ASSETS_URL = "https://resources.download.minecraft.net/"
+HASHED_URL = re.compile(r"^https://(?:piston-meta|piston-data|launchermeta|launcher)\.mojang\.com/v1/(?:objects|packages)/([0-9a-f]{40})/")
+
+def set_cache_url(url:str|None):
+    global CACHE_URL
+    CACHE_URL = url.rstrip("/") if url else ""
+
+def get_cache_url(url:str, sha1:str|None=None)->str|None:
+    if not CACHE_URL:
+        return None
+
+    match = HASHED_URL.match(url)
+    if match:
+        return f"{CACHE_URL}/sha1/{match.group(1)}"
+
+    if url.startswith(ASSETS_URL):
+        return f"{CACHE_URL}/assets/objects/{url.removeprefix(ASSETS_URL)}"
+
+    for library_url in LIBRARY_URLS:
+        if url.startswith(library_url):
+            return f"{CACHE_URL}/libraries/{url.removeprefix(library_url)}"
+
+    if sha1:
+        return f"{CACHE_URL}/sha1/{sha1}"
+
+    return None
+
+def _get(url:str, headers:dict={}, sha1:str|None=None)->requests.Response:
+    # tries the LAN cache first and falls back to the upstream url
+    cache_url = get_cache_url(url, sha1)
+    if cache_url:
+        try:
+            res = requests.get(cache_url, stream=True, timeout=retry.CACHE_TIMEOUT)
+            if res.status_code == 200:
+                tracing.count("cache.hit")
+                return res
+            res.close()
+        except requests.exceptions.RequestException:
+            pass
+        tracing.count("cache.miss")
+
+    res = requests.get(url, headers=headers, stream=True, timeout=retry.TIMEOUT)
+    try:
+        check_response(url, res)
+    except BaseException:
+        res.close()
+        raise
+
+    return res
+
+def check_response(url:str, res:requests.Response):
+    # retryable statuses raise RetryableStatus, any other error raises HTTPError so it's never taken as content
+    retry.check_status(url, res.status_code, res.headers)
+    if not 200 <= res.status_code < 300:
+        raise requests.exceptions.HTTPError(f"HTTP {res.status_code} from {url}", response=res)
+
+def verify_file(url:str, file:str, sha1:str|None=None):
+    # a download that is empty or doesn't match its sha1 is never installed
+    if os.path.getsize(file) == 0:
+        raise EmptyResponse(url)
+
+    if sha1:
+        actual = hashes.sha1_file(file)
+        if actual != sha1.lower():
+            raise HashMismatch(url, sha1, actual)
+
+def get_file_bytes(url:str, headers:dict={}, priority:int=PRIORITY_NORMAL)->bytes:
+    scheduler = get_scheduler()
+
+    # every attempt takes its own slot, so a failed one frees the host while waiting to retry
+    def attempt()->bytes:
+        with tracing.span("http.get") as span, scheduler.job(url, priority):
+            res = _get(url, headers)
+            data = bytearray()
+            for chunk in res.iter_content(CHUNK_SIZE):
+                data.extend(chunk)
+                scheduler.throttle(url, len(chunk), priority)
+            span.add("bytes", len(data))
+
+        return bytes(data)
+
+    data = retry.call(attempt, url)
+    if not data:
+        raise EmptyResponse(url)
+
+    return data
+
+def post_json(url:str, data:dict|list, headers:dict={}, priority:int=PRIORITY_NORMAL)->dict|list|None:
+    def attempt()->requests.Response:
+        with tracing.span("http.post"), get_scheduler().job(url, priority):
+            res = requests.post(url, json=data, headers=headers, timeout=retry.TIMEOUT)
+            retry.check_status(url, res.status_code, res.headers)
+            return res
+
+    try:
+        res = retry.call(attempt, url)
+    except (requests.exceptions.RequestException, retry.RetryableStatus) as e:
+        print(f"Couldn't access {url}: {e}")
+        return None
+
+    if res.status_code != 200:
+        print(f"Couldn't access {url}: HTTP {res.status_code}")
+        return None
+
+    return res.json()
+
+def get_file_contents(url:str, headers:dict={}, priority:int=PRIORITY_NORMAL)->str:
+    return get_file_bytes(url, headers, priority).decode()
+
+async def get_file_bytes_async(url:str, headers:dict={}, priority:int=PRIORITY_NORMAL)->bytes:
+    scheduler = get_scheduler()
+    timeout = aiohttp.ClientTimeout(sock_connect=retry.CONNECT_TIMEOUT, sock_read=retry.READ_TIMEOUT)
+    res = bytearray()
+
+    async def read(response):
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            res.extend(chunk)
+            await scheduler.throttle_async(url, len(chunk), priority)
+
+    async def attempt():
+        res.clear()
+        with tracing.span("http.get") as span:
+            async with scheduler.job_async(url, priority), ClientSession(timeout=timeout) as session:
+                cache_url = get_cache_url(url)
+                if cache_url:
+                    try:
+                        async with session.get(cache_url, timeout=aiohttp.ClientTimeout(sock_connect=retry.CACHE_TIMEOUT[0], sock_read=retry.READ_TIMEOUT)) as response:
+                            if response.status == 200:
+                                await read(response)
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        res.clear()
+                    tracing.count("cache.hit" if res else "cache.miss")
+
+                if not res:
+                    async with session.get(url, headers=headers) as response:
+                        retry.check_status(url, response.status, response.headers)
+                        response.raise_for_status()
+                        await read(response)
+
+            span.add("bytes", len(res))
+
+    await retry.call_async(attempt, url)
     if not res:
-        print(f"Couldn't access {url}")
-    
-    return res.decode()
+        raise EmptyResponse(url)
+
+    return bytes(res)
+
+async def get_file_contents_async(url:str, headers:dict={}, priority:int=PRIORITY_NORMAL)->str:
+    return (await get_file_bytes_async(url, headers, priority)).decode()
 
-def download_file(url:str, path:str, headers:dict={}, overwrite:bool=False):
+def download_file(url:str, path:str, headers:dict={}, overwrite:bool=False, priority:int=PRIORITY_NORMAL, sha1:str|None=None):
     if not overwrite and os.path.exists(path):
         return
-    
+
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    data = get_file_contents(url, headers)
+    scheduler = get_scheduler()
+    # written next to the file and renamed, an interrupted download never looks finished
+    temp_path = path + ".part"
+
+    def attempt():
+        with tracing.span("http.download") as span, scheduler.job(url, priority):
+            res = _get(url, headers, sha1)
+            with open(temp_path, "wb") as file:
+                for chunk in res.iter_content(CHUNK_SIZE):
+                    file.write(chunk)
+                    span.add("bytes", len(chunk))
+                    scheduler.throttle(url, len(chunk), priority)
 
-    with open(path, "wb") as file:
-        file.write(data.encode())
+    try:
+        retry.call(attempt, url)
+        verify_file(url, temp_path, sha1)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
-async def download_file_async(url:str, path:str, headers:dict={}, overwrite:bool=False):
+    os.replace(temp_path, path)
+
+async def download_file_async(url:str, path:str, headers:dict={}, overwrite:bool=False, priority:int=PRIORITY_NORMAL):
     if not overwrite and os.path.exists(path):
         return
-    
+
     await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
 
-    data = await get_file_contents_async(url, headers)
-    
-    async with aiofiles.open(path, "wb") as out_file:
-        await out_file.write(data.encode())
+    data = await get_file_bytes_async(url, headers, priority)
+
+    async with aiofiles.open(path + ".part", "wb") as out_file:
+        await out_file.write(data)
+    await aiofiles.os.replace(path + ".part", path)
 
-async def download_files_async(files:list[AsyncFile], headers:dict={}, overwrite:bool=False):
+async def download_files_async(files:list[AsyncFile], headers:dict={}, overwrite:bool=False, priority:int=PRIORITY_NORMAL)->list[AsyncFile]:
+    # returns the files that couldn't be downloaded, one failure doesn't cancel the others
     tasks = []
     for file in files:
-        t = asyncio.create_task(download_file_async(file["url"], file["path"], headers, overwrite))
+        t = asyncio.create_task(download_file_async(file["url"], file["path"], headers, overwrite, priority))
         tasks.append(t)
-    
-    await asyncio.gather(*tasks)
\ No newline at end of file
+
+    failed = []
+    for file, result in zip(files, await asyncio.gather(*tasks, return_exceptions=True)):
+        if isinstance(result, Exception):
+            print(f"Couldn't download {file['url']}: {result}")
+            failed.append(file)
+
+    return failed
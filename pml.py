@@ -2,6 +2,12 @@ from profile_launcher import Launcher
 import sys
 from setuptools._distutils.util import strtobool
 import asyncio
+from scheduler import get_scheduler, parse_rate
+from storage import format_size
+import networkutils
+import cache_server
+import tracing
+import updates
 
 LAUNCHER_NAME = "PyMineLauncher"
 LAUNCHER_VERSION = "1.0"
@@ -27,11 +33,35 @@ def print_help(create=None):
         print(f"    create [version] [name] [overwrite = false] - creates a new profile")
         print(f"    mrpack [mrpack] [name] [overwrite = false] - creates a new mrpack profile")
         print(f"    curseforge [zip] [name] [overwrite = false] - creates a new curseforge profile")
-        print(f"    launch [name] [username] - launcher the profile with offline username")
+        print(f"    apply [manifest] - creates or updates all profiles listed in a json manifest")
+        print(f"    launch [name] [username] [memory] - launcher the profile with offline username")
+        print(f"    jvm [name] - prints the jvm arguments of the profile")
+        print(f"    jvm [name] [setting] [value] - sets heap_min, heap_max (MiB or auto), gc, preset or extra")
         print(f"")
         print(f"    profiles - lists all profiles")
         print(f"    profile [name] - prints profile info")
         print(f"    delete [name] - deletes the profile")
+        print(f"    clone [name] [new name] - copies the profile, mods and resource packs are shared instead of duplicated")
+        print(f"    mods [name] - lists the mods of the profile")
+        print(f"    snapshot [name] - saves the game directory of the profile, only changed files are stored")
+        print(f"    snapshots [name] - lists the snapshots of the profile")
+        print(f"    restore [name] [snapshot = latest] - restores the game directory of the profile from a snapshot")
+        print(f"    delete-snapshot [name] [snapshot] - deletes the snapshot and the data no other snapshot uses")
+        print(f"    export [name] [mrpack] [version = pack version or 1.0.0] - exports the profile as an mrpack")
+        print(f"    updates [name] - checks the mods of the profile for updates, use --apply to install them")
+        print(f"")
+        print(f"    gc - deletes versions, libraries and assets no profile uses, use --dry-run to only list them")
+        print(f"    prefetch - installs missing versions, libraries and assets of all profiles")
+        print(f"    serve-cache [port = 8765] - shares the libraries, assets, versions and mods over http")
+        print(f"")
+        print(f"Options")
+        print(f"")
+        print(f"    --limit=[rate] - limits the total download rate, e. 2M for 2 MiB/s")
+        print(f"    --host-limit=[rate] - limits the download rate per host")
+        print(f"    --prefetch - prefetches the other profiles in the background while a game runs")
+        print(f"    --trace[=file] - prints where the time went, or writes it as a chrome trace if file ends with .json")
+        print(f"    --cache=[url] - downloads from a serve-cache server first, e. http://192.168.1.2:8765")
+        print(f"    --modrinth-api=[url] - the modrinth compatible api used for updates")
         print(f"\nType 'help create' for information regarding version names.")
         print(f"The profile names aren't case sensitive!")
     else:
@@ -44,13 +74,27 @@ def print_help(create=None):
         print(f"    Fabric version - e. fabric*1.20.2")
         print(f"    Quilt version - e. quilt*1.20.2")
 
+def parse_flags(args:list[str])->tuple[list[str], dict[str, str]]:
+    # splits --name=value options from the positional arguments
+    positional = []
+    flags = {}
+
+    for arg in args:
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            flags[name] = value
+        else:
+            positional.append(arg)
+
+    return positional, flags
+
 def print_arguments_error(mode, num = False):
     print(f"{'Too many' if num else 'Not enough'} arguments provided for {mode}.")
     print(f"Type 'help' for more information.")
 
 async def main():
 
-    args = sys.argv[1:]
+    args, flags = parse_flags(sys.argv[1:])
     try:
         mode = args[0]
     except:
@@ -75,7 +119,97 @@ async def main():
             print_help()
         sys.exit()
 
+    for flag in ["limit", "host-limit"]:
+        try:
+            valid = parse_rate(flags.get(flag, 0)) >= 0
+        except ValueError:
+            valid = False
+
+        if not valid:
+            print(f"Invalid rate '{flags[flag]}' for --{flag}, expected e. 512K, 2M or a number of bytes per second.")
+            print(f"Type 'help' for more information.")
+            sys.exit()
+
+    get_scheduler().set_rate_limit(flags.get("limit", 0), flags.get("host-limit", 0))
+
+    if flags.get("cache"):
+        networkutils.set_cache_url(flags["cache"])
+
+    if flags.get("modrinth-api"):
+        updates.set_modrinth_api(flags["modrinth-api"])
+
     launcher = Launcher(launcher_name=LAUNCHER_NAME, launcher_version=LAUNCHER_VERSION)
+    launcher.prefetch_on_launch = "prefetch" in flags
+
+    if mode == "serve-cache":
+        port = 8765
+        if arg1:
+            try:
+                port = int(arg1)
+            except ValueError:
+                print(f"Invalid port '{arg1}'.")
+                sys.exit()
+
+        cache_server.serve_cache(launcher.MINECRAFT_DIRECTORY, port=port)
+        sys.exit()
+
+    if mode == "mods":
+        if not arg1:
+            print_arguments_error(mode)
+            sys.exit()
+
+        profile_mods = launcher.get_mods(arg1)
+        for file, mod in sorted(profile_mods.items(), key=lambda m: (m[1].get("name") or m[0]).lower()):
+            name = mod.get("name") or file
+            state = "" if mod.get("enabled", True) else " (disabled)"
+            print(f"{name:<40} {mod.get('version') or '?':<24} {mod.get('loader') or '?':<10} {file}{state}")
+
+        print(f"{len(profile_mods)} mods.")
+        sys.exit()
+
+    if mode in ["snapshot", "snapshots", "restore", "delete-snapshot"]:
+        if not arg1 or (mode == "delete-snapshot" and not arg2):
+            print_arguments_error(mode)
+            sys.exit()
+
+        if mode == "snapshot":
+            launcher.snapshot_profile(arg1)
+        elif mode == "snapshots":
+            for snapshot_id in launcher.get_snapshots(arg1):
+                print(snapshot_id)
+        elif mode == "delete-snapshot":
+            launcher.delete_snapshot(arg1, arg2)
+        else:
+            launcher.restore_profile(arg1, arg2)
+        sys.exit()
+
+    if mode == "export":
+        if not arg1 or not arg2:
+            print_arguments_error(mode)
+            sys.exit()
+
+        launcher.export_profile(arg1, arg2, arg3)
+        sys.exit()
+
+    if mode == "updates":
+        if not arg1:
+            print_arguments_error(mode)
+            sys.exit()
+
+        plan = launcher.get_update_plan(arg1)
+        if plan == None:
+            sys.exit()
+
+        for update in plan["updates"]:
+            print(f"{update['name']:<40} {update['version'] or '?'} -> {update['new_version']}  ({update['filename']})")
+
+        print(f"{len(plan['updates'])} updates, {len(plan['up_to_date'])} up to date, {len(plan['unknown'])} not on modrinth.")
+
+        if plan["updates"] and "apply" in flags:
+            launcher.update_mods(arg1, plan)
+            print("Mods updated.")
+        sys.exit()
+
     await launcher.load()
 
     if mode == "create":
@@ -138,6 +272,19 @@ async def main():
 
         launcher.create_curseforge_profile(curseforge, profile_name, overwrite=overwrite)
 
+    elif mode == "apply":
+        if not arg1:
+            print_arguments_error(mode)
+            sys.exit()
+
+        result = launcher.apply_manifest(arg1)
+        if result == None:
+            sys.exit()
+
+        for state in ["created", "skipped", "failed"]:
+            if result[state]:
+                print(f"{state.capitalize()}: {', '.join(result[state])}")
+
     elif mode == "versions":
         versions = launcher.get_versions()
         for version in versions:
@@ -180,7 +327,10 @@ async def main():
 
         if profile_info:
             print(profile_info)
-    
+
+            for cds_mode, startup in launcher.get_startup_times(profile_name).items():
+                print(f"Startup with CDS {cds_mode}: {startup:.1f}s")
+
     elif mode == "profiles":
         for profile in launcher.get_profiles():
             print(profile)
@@ -194,6 +344,54 @@ async def main():
 
         launcher.delete_profile(profile_name)
 
+    elif mode == "jvm":
+        if not arg1:
+            print_arguments_error(mode)
+            sys.exit()
+
+        if arg2:
+            if not arg3:
+                print_arguments_error(mode)
+                sys.exit()
+
+            if not launcher.set_jvm_setting(arg1, arg2, arg3):
+                sys.exit()
+
+        print(" ".join(launcher.get_jvm_arguments(arg1)))
+
+    elif mode == "clone":
+        if not arg1 or not arg2:
+            print_arguments_error(mode)
+            sys.exit()
+
+        launcher.clone_profile(arg1, arg2)
+
+    elif mode == "gc":
+        dry_run = "dry-run" in flags
+        items = launcher.collect_garbage(dry_run=dry_run)
+        if items == None:
+            sys.exit()
+
+        totals = {}
+        for item in items:
+            count, size = totals.get(item["kind"], (0, 0))
+            totals[item["kind"]] = (count + 1, size + item["size"])
+
+            # there can be thousands of assets, only their total is printed
+            if item["kind"] != "asset":
+                print(f"{format_size(item['size']):>12}  {item['kind']:<12} {item['path']}")
+
+        print("")
+        for kind, (count, size) in totals.items():
+            print(f"{format_size(size):>12}  {count} {kind} files")
+
+        total = sum(item["size"] for item in items)
+        print(f"{'Reclaimable' if dry_run else 'Reclaimed'} {format_size(total)}.")
+
+    elif mode == "prefetch":
+        launcher.prefetch()
+        print("Prefetch finished.")
+
     elif mode == "launch":
         # check if both profile name and username are set
         if not arg1 or not arg2:
@@ -202,11 +400,33 @@ async def main():
         
         profile_name = arg1
         username = arg2
+        memory_alloc = None
 
-        launcher.launch_profile(profile_name, username)
+        if arg3:
+            try:
+                memory_alloc = int(arg3)
+            except ValueError:
+                print(f"Invalid memory '{arg3}', it has to be in MiB.")
+                sys.exit()
+
+        launcher.launch_profile(profile_name, username, memory_alloc)
     else:
         print("Unknown command.\nType 'help' for more information.")
 
 
+def run():
+    args, flags = parse_flags(sys.argv[1:])
+
+    if "trace" not in flags:
+        asyncio.run(main())
+        return
+
+    tracing.enable()
+    try:
+        with tracing.span("pml"):
+            asyncio.run(main())
+    finally:
+        tracing.dump(flags["trace"] or None)
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run()
\ No newline at end of file
@@ -0,0 +1,149 @@
+from os import path
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import hashes
+import networkutils
+import version_info
+from scheduler import get_scheduler, PRIORITY_BACKGROUND
+from wrapper import SILENT_CALLBACK
+
+MAX_HASH_WORKERS = 8
+
+def parse_version_id(version_id:str)->tuple[str, str|None, str|None]:
+    # installed version id -> (minecraft version, mod loader, mod loader version)
+    for loader in ["fabric", "quilt"]:
+        prefix = f"{loader}-loader-"
+        if version_id.startswith(prefix):
+            loader_version, _, minecraft_version = version_id.removeprefix(prefix).partition("-")
+            return (minecraft_version, loader, loader_version)
+
+    if "-forge-" in version_id:
+        minecraft_version, _, forge_version = version_id.partition("-forge-")
+        return (minecraft_version, "forge", forge_version)
+
+    return (version_id, None, None)
+
+def is_outdated(file:dict, hash_index:hashes.HashIndex|None=None)->bool:
+    # missing, the wrong size or the wrong sha1, hash_index caches the sha1 of unchanged files between runs
+    try:
+        stat = os.stat(file["path"])
+    except OSError:
+        return True
+
+    if file.get("size") != None and stat.st_size != file["size"]:
+        return True
+
+    if not file.get("sha1"):
+        return False
+
+    try:
+        sha1 = hash_index.sha1(file["path"]) if hash_index != None else hashes.sha1_file(file["path"])
+    except OSError:
+        return True
+
+    return sha1 != file["sha1"].lower()
+
+def find_missing_files(minecraft_directory:str, version_id:str, priority:int=PRIORITY_BACKGROUND, hash_index:hashes.HashIndex|None=None)->list[dict]:
+    # libraries, natives, the client jar and assets of an installed version that are missing or don't match their sha1
+    chain = version_info.get_version_chain(minecraft_directory, version_id)
+
+    files = version_info.get_library_files(minecraft_directory, chain)
+
+    client = version_info.get_client_file(minecraft_directory, chain)
+    if client:
+        files.append(client)
+
+    asset_index = version_info.get_asset_index(minecraft_directory, chain)
+    if asset_index:
+        # the asset index is needed to know which assets are missing
+        try:
+            if is_outdated(asset_index, hash_index):
+                networkutils.download_file(asset_index["url"], asset_index["path"], overwrite=True, priority=priority, sha1=asset_index["sha1"])
+            files.extend(version_info.get_asset_files(minecraft_directory, asset_index))
+        except Exception as e:
+            print(f"Couldn't prefetch the asset index of {version_id}: {e}")
+
+    with ThreadPoolExecutor(max_workers=MAX_HASH_WORKERS) as executor:
+        outdated = list(executor.map(lambda f: is_outdated(f, hash_index), files))
+
+    return [file for file, is_old in zip(files, outdated) if is_old]
+
+def get_prefetch_plan(launcher)->dict[str, list]:
+    versions = []
+    files = {}
+
+    for profile in launcher.get_profiles():
+        profile_data = launcher.get_profile(profile)
+        if not profile_data or not profile_data.get("profile_version"):
+            continue
+
+        version_id = profile_data["profile_version"]
+        if version_id in versions:
+            continue
+
+        versions.append(version_id)
+
+    missing_versions = [v for v in versions if not launcher._wrapper.is_installed(v)]
+    hash_index = hashes.get_index(launcher.MINECRAFT_DIRECTORY)
+
+    for version_id in versions:
+        if version_id in missing_versions:
+            continue
+
+        for file in find_missing_files(launcher.MINECRAFT_DIRECTORY, version_id, hash_index=hash_index):
+            files[file["path"]] = file
+
+    hash_index.save()
+
+    return {"versions": missing_versions, "files": list(files.values())}
+
+def prefetch(launcher, priority:int=PRIORITY_BACKGROUND, quiet:bool=False)->list[dict]:
+    # returns the files that couldn't be prefetched, quiet only prints the summary of failures
+    log = (lambda message: None) if quiet else print
+    plan = get_prefetch_plan(launcher)
+
+    for version_id in plan["versions"]:
+        log(f"Prefetching version {version_id}")
+        launcher.install_version(version_id, priority=priority, callback=SILENT_CALLBACK if quiet else None)
+
+    if not plan["files"]:
+        return []
+
+    log(f"Prefetching {len(plan['files'])} files")
+
+    def download(file:dict)->bool:
+        # download_file checks the sha1 before the file replaces the old one, a corrupt fetch is never installed
+        try:
+            networkutils.download_file(file["url"], file["path"], overwrite=True, priority=priority, sha1=file.get("sha1"))
+        except Exception as e:
+            log(f"Couldn't prefetch {file['url']}: {e}")
+            return False
+
+        if file.get("size") != None and os.path.getsize(file["path"]) != file["size"]:
+            log(f"Couldn't prefetch {file['url']}: expected {file['size']} bytes")
+            return False
+
+        return True
+
+    with ThreadPoolExecutor(max_workers=get_scheduler().max_concurrent) as executor:
+        results = list(executor.map(download, plan["files"]))
+
+    failed = [file for file, downloaded in zip(plan["files"], results) if not downloaded]
+    if failed:
+        print(f"{len(failed)} of {len(plan['files'])} files couldn't be prefetched, they are tried again next time.")
+
+    return failed
+
+def start_prefetch(launcher, priority:int=PRIORITY_BACKGROUND)->threading.Thread:
+    def run():
+        # nobody waits on the result, a failure must not end in a traceback over the game output
+        try:
+            prefetch(launcher, priority, quiet=True)
+        except Exception as e:
+            print(f"Background prefetch failed: {e}")
+
+    thread = threading.Thread(target=run, daemon=True, name="prefetch")
+    thread.start()
+    return thread
@@ -6,6 +6,19 @@ import shutil
 import asyncio
 
 from wrapper import Wrapper
+from mrpack import read_index
+from scheduler import PRIORITY_CRITICAL, PRIORITY_BACKGROUND
+import prefetch
+import storage
+import clone
+import cds
+import jvm
+import mods
+import updates
+import export
+import provision
+import snapshot
+import tracing
 
 def delete_last_line():
     # Deletes the last line in the STDOUT
@@ -33,6 +46,10 @@ class Launcher:
     MINECRAFT_DIRECTORY:str
     PROFILES_DIRECTORY:str
 
+    # fills in what the other profiles are missing while a game is running, off by default
+    # as it competes with the game start for disk and network
+    prefetch_on_launch:bool
+
     _wrapper: Wrapper
 
     def __init__(self, minecraft_directory:str=path.join(path.curdir, ".minecraft"), launcher_name:str="PYLauncher", launcher_version:str="1.0") -> None:
@@ -40,11 +57,13 @@ class Launcher:
         self.LAUNCHER_VERSION = launcher_version
         
         self.MINECRAFT_DIRECTORY = minecraft_directory
+        self.PROFILES_DIRECTORY = path.join(self.MINECRAFT_DIRECTORY, "profiles")
+        self.prefetch_on_launch = False
     
+    @tracing.traced("launcher.load")
     async def load(self):
         os.makedirs(self.MINECRAFT_DIRECTORY, exist_ok=True)
 
-        self.PROFILES_DIRECTORY = path.join(self.MINECRAFT_DIRECTORY, "profiles")
         os.makedirs(self.PROFILES_DIRECTORY, exist_ok=True)
 
         self._wrapper = Wrapper(self.LAUNCHER_NAME, self.LAUNCHER_VERSION, self.MINECRAFT_DIRECTORY)
@@ -66,7 +85,7 @@ class Launcher:
         return self._wrapper.FABRIC_VERSIONS
 
     def get_quilt_supported_versions(self)->list[str]:
-        return self._wrapper.FABRIC_VERSIONS
+        return self._wrapper.QUILT_VERSIONS
     
     # Main methods
     def download_version(self, version_id:str)->str:
@@ -88,6 +107,29 @@ class Launcher:
         else:
             return self._wrapper.download_version(version_id)
 
+    def install_version(self, version_id:str, priority:int=PRIORITY_CRITICAL, callback:dict|None=None)->str:
+        # installs a version by its installed id e. fabric-loader-0.15.0-1.20.2
+        minecraft_version, mod_loader, mod_loader_version = prefetch.parse_version_id(version_id)
+
+        if mod_loader == "forge":
+            return self._wrapper.download_forge_version(minecraft_version, mod_loader_version, priority=priority, callback=callback)
+        elif mod_loader == "fabric":
+            return self._wrapper.download_fabric_version(minecraft_version, mod_loader_version, priority=priority, callback=callback)
+        elif mod_loader == "quilt":
+            return self._wrapper.download_quilt_version(minecraft_version, mod_loader_version, priority=priority, callback=callback)
+
+        return self._wrapper.download_version(minecraft_version, priority=priority, callback=callback)
+
+    @tracing.traced("launcher.prefetch")
+    def prefetch(self, background:bool=False):
+        # installs the missing versions, libraries and assets of all profiles at low priority
+        # in the background nothing is printed but a summary of failures, the game log is on the same terminal
+        if background:
+            return prefetch.start_prefetch(self, PRIORITY_BACKGROUND)
+
+        prefetch.prefetch(self, PRIORITY_BACKGROUND)
+
+    @tracing.traced("launcher.create_profile")
     def create_profile(self, version_id:str, profile_name:str, install_versions=True, overwrite=False):
         profile_path = path.join(self.PROFILES_DIRECTORY, profile_name)
         if path.exists(profile_path) and not overwrite:
@@ -115,7 +157,8 @@ class Launcher:
         
         print("Profile created successfully.")
 
-    def launch_profile(self, profile:str, username:str, memory_alloc:str=4096):
+    @tracing.traced("launcher.launch_profile")
+    def launch_profile(self, profile:str, username:str, memory_alloc:int|None=None):
         profile_path = path.join(self.PROFILES_DIRECTORY, profile)
         profile_json = path.join(profile_path, "profile.json")
 
@@ -134,12 +177,127 @@ class Launcher:
         profile_version = profile_data["profile_version"]
 
         if not self._wrapper.is_installed(profile_version):
-            print(f"Version {profile_version} isn't installed.")
-            return
+            print(f"Version {profile_version} isn't installed, installing it.")
+            if self.install_version(profile_version) == None or not self._wrapper.is_installed(profile_version):
+                print(f"Version {profile_version} couldn't be installed.")
+                return
 
         print(f"Launching profile '{profile_name} ({profile_version})'")
 
-        self._wrapper.launch_version(profile_version, username, memory_alloc=memory_alloc, gameDir=game_directory)
+        # memory_alloc overrides the heap size from the profile settings
+        jvm_arguments = jvm.get_jvm_arguments(self.MINECRAFT_DIRECTORY, game_directory, profile_data.get("jvm"), memory_alloc)
+
+        # the launched version is complete, the rest downloads at background priority while the game runs
+        if self.prefetch_on_launch:
+            self.prefetch(background=True)
+
+        self._wrapper.launch_version(profile_version, username, gameDir=game_directory, use_cds=profile_data.get("cds", True), jvm_arguments=jvm_arguments)
+
+    def set_jvm_setting(self, profile:str, key:str, value:str)->bool:
+        profile_data = self.get_profile(profile)
+        if not profile_data:
+            return False
+
+        if key not in jvm.SETTINGS:
+            print(f"Unknown jvm setting '{key}', available: {', '.join(jvm.SETTINGS)}")
+            return False
+
+        valid, parsed = jvm.parse_setting(key, value)
+        if not valid:
+            print(f"Invalid value '{value}' for {key}.")
+            return False
+
+        settings = profile_data.get("jvm", {})
+        settings[key] = parsed
+        profile_data["jvm"] = settings
+
+        with open(path.join(self.PROFILES_DIRECTORY, profile, "profile.json"), "w") as f:
+            f.write(json.dumps(profile_data))
+
+        return True
+
+    def get_jvm_arguments(self, profile:str)->list[str]:
+        profile_data = self.get_profile(profile)
+        if not profile_data:
+            return []
+
+        game_directory = path.join(self.PROFILES_DIRECTORY, profile, "game")
+        return jvm.get_jvm_arguments(self.MINECRAFT_DIRECTORY, game_directory, profile_data.get("jvm"))
+
+    def get_startup_times(self, profile:str)->dict[str, float]:
+        # average launch to main menu time with and without the class data sharing archive
+        profile_data = self.get_profile(profile)
+        if not profile_data:
+            return {}
+
+        game_directory = path.join(self.PROFILES_DIRECTORY, profile, "game")
+        return cds.get_startup_times(self.MINECRAFT_DIRECTORY, profile_data["profile_version"], game_directory)
+
+    @tracing.traced("launcher.get_mods")
+    def get_mods(self, profile:str)->dict[str, dict]:
+        # {file name: {"loader", "id", "name", "version", "depends", "enabled"}} of the profile mods
+        if not self.get_profile(profile):
+            return {}
+
+        return mods.update_index(path.join(self.PROFILES_DIRECTORY, profile))
+
+    def get_update_plan(self, profile:str)->dict[str, list]|None:
+        profile_data = self.get_profile(profile)
+        if not profile_data:
+            return None
+
+        minecraft_version, mod_loader, mod_loader_version = prefetch.parse_version_id(profile_data["profile_version"])
+        return updates.get_update_plan(path.join(self.PROFILES_DIRECTORY, profile), minecraft_version, mod_loader)
+
+    def update_mods(self, profile:str, plan:dict[str, list]):
+        updates.apply_update_plan(path.join(self.PROFILES_DIRECTORY, profile), plan)
+
+    @tracing.traced("launcher.export_profile")
+    def export_profile(self, profile:str, output:str, version_id:str|None=None):
+        profile_data = self.get_profile(profile)
+        if not profile_data:
+            return
+
+        # the version of the pack the profile was installed from unless another one is given
+        version_id = version_id or profile_data.get("pack_version") or export.DEFAULT_VERSION_ID
+
+        minecraft_version, mod_loader, mod_loader_version = prefetch.parse_version_id(profile_data["profile_version"])
+        game_directory = path.join(self.PROFILES_DIRECTORY, profile, "game")
+
+        result = export.export_mrpack(game_directory, output, profile_data["profile_name"], minecraft_version, mod_loader, mod_loader_version, version_id=version_id)
+
+        print(f"Profile '{profile}' exported to '{output}' as version {version_id}, {result['referenced']} files referenced and {result['overrides']} overrides.")
+
+    @tracing.traced("launcher.snapshot_profile")
+    def snapshot_profile(self, profile:str)->str|None:
+        if not self.get_profile(profile):
+            return None
+
+        game_directory = path.join(self.PROFILES_DIRECTORY, profile, "game")
+        snapshot_id, result = snapshot.create_snapshot(path.join(self.MINECRAFT_DIRECTORY, "snapshots"), profile, game_directory)
+
+        print(f"Snapshot '{snapshot_id}' of profile '{profile}' created, {result['stored']} of {result['files']} files changed.")
+        return snapshot_id
+
+    def get_snapshots(self, profile:str)->list[str]:
+        return snapshot.get_snapshots(path.join(self.MINECRAFT_DIRECTORY, "snapshots"), profile)
+
+    @tracing.traced("launcher.restore_profile")
+    def restore_profile(self, profile:str, snapshot_id:str|None=None):
+        if not self.get_profile(profile):
+            return
+
+        game_directory = path.join(self.PROFILES_DIRECTORY, profile, "game")
+        result = snapshot.restore_snapshot(path.join(self.MINECRAFT_DIRECTORY, "snapshots"), profile, game_directory, snapshot_id)
+
+        if result:
+            print(f"Profile '{profile}' restored, {result['restored']} files restored and {result['removed']} removed.")
+
+    def delete_snapshot(self, profile:str, snapshot_id:str):
+        result = snapshot.delete_snapshot(path.join(self.MINECRAFT_DIRECTORY, "snapshots"), profile, snapshot_id)
+
+        if result:
+            print(f"Snapshot '{snapshot_id}' of profile '{profile}' deleted, {result['pruned']} unused chunks removed.")
 
     def delete_profile(self, profile:str):
         profile_path = path.join(self.PROFILES_DIRECTORY, profile)
@@ -153,6 +311,23 @@ class Launcher:
 
         print(f"Profile '{profile}' deleted successfully.")
 
+    @tracing.traced("launcher.clone_profile")
+    def clone_profile(self, profile:str, new_profile:str):
+        profile_path = path.join(self.PROFILES_DIRECTORY, profile)
+        new_profile_path = path.join(self.PROFILES_DIRECTORY, new_profile)
+
+        if not os.path.exists(path.join(profile_path, "profile.json")):
+            print("Cannot clone profile as it doesn't exist.")
+            return
+
+        if path.exists(new_profile_path):
+            print("Profile already exists.")
+            return
+
+        clone.clone_profile(profile_path, new_profile_path, new_profile)
+
+        print(f"Profile '{profile}' cloned to '{new_profile}'.")
+
     def get_profile(self, profile:str)->dict[str,str]:
         profile_path = path.join(self.PROFILES_DIRECTORY, profile)
         profile_json = path.join(profile_path, "profile.json")
@@ -167,6 +342,7 @@ class Launcher:
 
         return profile_data
 
+    @tracing.traced("launcher.get_profiles")
     def get_profiles(self)->list[str]:
         profiles = []
         for subdir, dirs, files in os.walk(self.PROFILES_DIRECTORY):
@@ -176,6 +352,22 @@ class Launcher:
         
         return profiles
     
+    @tracing.traced("launcher.gc")
+    def collect_garbage(self, dry_run:bool=False)->list[dict]|None:
+        # deletes versions, libraries, runtimes and assets no profile uses
+        version_ids = []
+        for profile in self.get_profiles():
+            profile_data = self.get_profile(profile)
+            if profile_data and profile_data.get("profile_version"):
+                version_ids.append(profile_data["profile_version"])
+
+        return storage.collect_garbage(self.MINECRAFT_DIRECTORY, version_ids, dry_run)
+
+    def apply_manifest(self, manifest:str)->dict[str, list[str]]|None:
+        # creates or updates every profile of the manifest, see provision.py
+        return provision.apply_manifest(self, manifest)
+
+    @tracing.traced("launcher.create_mrpack_profile")
     def create_mrpack_profile(self, mrpack:str, profile_name:str, overwrite:bool=False):
         profile_path = path.join(self.PROFILES_DIRECTORY, profile_name)
         if path.exists(profile_path) and not overwrite:
@@ -194,6 +386,8 @@ class Launcher:
             "profile_name": profile_name,
             "profile_version": version_name
         }
+        if version_name:
+            profile_data["pack_version"] = read_index(mrpack).get("versionId")
         with open(path.join(profile_path, "profile.json"), "w") as f:
             f.write(json.dumps(profile_data))
         
@@ -0,0 +1,225 @@
+from os import path
+import os
+import json
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import clone
+import hashes
+import mrpack
+import tracing
+from scheduler import get_scheduler, PRIORITY_CRITICAL
+
+# Creates or updates many profiles from one manifest:
+#
+#   {"profiles": [
+#       {"name": "survival", "version": "fabric*1.20.2"},
+#       {"name": "pack", "mrpack": "packs/pack.mrpack"}
+#   ]}
+#
+# Every version is installed once and every pack file is downloaded once, even when several profiles use it.
+# A profile whose source didn't change since the last apply is skipped.
+
+def read_manifest(manifest_file:str)->list[dict]|None:
+    if not path.exists(manifest_file):
+        print(f"Couldn't find manifest '{manifest_file}'.")
+        return None
+
+    with open(manifest_file, "r") as f:
+        try:
+            manifest = json.load(f)
+        except ValueError as e:
+            print(f"Invalid manifest '{manifest_file}': {e}")
+            return None
+
+    manifest_directory = path.dirname(path.abspath(manifest_file))
+    profiles = []
+    names = set()
+
+    for entry in manifest.get("profiles", []):
+        name = entry.get("name")
+        if not name or name in names or ("version" in entry) == ("mrpack" in entry):
+            print(f"Invalid manifest entry {json.dumps(entry)}, it needs a unique name and either a version or an mrpack.")
+            return None
+
+        names.add(name)
+        entry = dict(entry)
+        if "mrpack" in entry:
+            entry["mrpack"] = path.join(manifest_directory, entry["mrpack"])
+            if not path.exists(entry["mrpack"]):
+                print(f"Couldn't find mrpack '{entry['mrpack']}' of profile '{name}'.")
+                return None
+
+        profiles.append(entry)
+
+    return profiles
+
+def get_source(entry:dict, hash_index:hashes.HashIndex|None=None)->dict:
+    # what the profile was created from, stored in profile.json to detect changes
+    if "mrpack" in entry:
+        return {"mrpack": hash_index.sha1(entry["mrpack"]) if hash_index != None else hashes.sha1_file(entry["mrpack"])}
+
+    return {"version": entry["version"]}
+
+def get_version_id(minecraft_version:str, mod_loader:str|None, mod_loader_version:str|None)->str:
+    # the installed version id, as read by prefetch.parse_version_id
+    if mod_loader == "forge":
+        return f"{minecraft_version}-forge-{mod_loader_version}"
+    if mod_loader in ["fabric", "quilt"]:
+        return f"{mod_loader}-loader-{mod_loader_version}-{minecraft_version}"
+
+    return minecraft_version
+
+def read_profile(profile_path:str)->dict:
+    profile_json = path.join(profile_path, "profile.json")
+    if not path.exists(profile_json):
+        return {}
+
+    with open(profile_json, "r") as f:
+        return json.load(f)
+
+def link_file(source:str, destination:str):
+    os.makedirs(path.dirname(destination), exist_ok=True)
+    if path.exists(destination):
+        os.remove(destination)
+
+    # pack files are only replaced, never written to, so profiles can share them
+    if not clone.hardlink(source, destination):
+        shutil.copy2(source, destination)
+
+def is_current(file:str, size:int|None, sha1:str|None, hash_index:hashes.HashIndex|None=None)->bool:
+    try:
+        if size == None or os.stat(file).st_size != size:
+            return False
+        if not sha1:
+            return True
+        return (hash_index.sha1(file) if hash_index != None else hashes.sha1_file(file)) == sha1
+    except OSError:
+        return False
+
+def download_pack_files(files:dict[str, dict], hash_index:hashes.HashIndex|None=None)->list[dict]:
+    # downloads every file once and links it to the other profiles using it, returns the files that failed
+    def download(file:dict)->bool:
+        destinations = file["destinations"]
+        first = next((d for d in destinations if is_current(d, file["size"], file["sha1"], hash_index)), None)
+
+        if first == None:
+            first = destinations[0]
+            try:
+                mrpack.download_file(file["url"], first, overwrite=True, priority=PRIORITY_CRITICAL, sha1=file["sha1"])
+            except Exception as e:
+                print(f"Couldn't download {file['url']}: {e}")
+                return False
+
+        for destination in destinations:
+            if destination != first and not is_current(destination, file["size"], file["sha1"], hash_index):
+                link_file(first, destination)
+
+        return True
+
+    with ThreadPoolExecutor(max_workers=get_scheduler().max_concurrent) as executor:
+        results = list(executor.map(download, files.values()))
+
+    return [file for file, downloaded in zip(files.values(), results) if not downloaded]
+
+@tracing.traced("provision.apply")
+def apply_manifest(launcher, manifest_file:str)->dict[str, list[str]]|None:
+    # returns the {"created", "skipped", "failed"} profile names
+    entries = read_manifest(manifest_file)
+    if entries == None:
+        return None
+
+    result = {"created": [], "skipped": [], "failed": []}
+    hash_index = hashes.get_index(launcher.MINECRAFT_DIRECTORY)
+    pending = []
+    versions = {}
+    files = {}
+
+    with tracing.span("provision.plan"):
+        for entry in entries:
+            profile_path = path.join(launcher.PROFILES_DIRECTORY, entry["name"])
+            profile_data = read_profile(profile_path)
+            source = get_source(entry, hash_index)
+
+            if profile_data.get("source") == source and launcher._wrapper.is_installed(profile_data.get("profile_version")):
+                result["skipped"].append(entry["name"])
+                continue
+
+            game_directory = path.join(profile_path, "game")
+            entry = dict(entry, source=source, path=profile_path, data=profile_data)
+
+            if "mrpack" in entry:
+                pack_info = mrpack.read_index(entry["mrpack"])
+                pack_version = mrpack.get_pack_version(pack_info)
+                if pack_version == None:
+                    result["failed"].append(entry["name"])
+                    continue
+
+                minecraft_version, (mod_loader, mod_loader_version) = pack_version
+                entry["version"] = get_version_id(minecraft_version, mod_loader, mod_loader_version)
+                entry["install_id"] = True
+                entry["pack_version"] = pack_info.get("versionId")
+
+                for file in pack_info["files"]:
+                    sha1 = file.get("hashes", {}).get("sha1")
+                    download = files.setdefault(sha1 or file["downloads"][0], {"url": file["downloads"][0], "sha1": sha1, "size": file.get("fileSize"), "destinations": [], "profiles": set()})
+                    download["destinations"].append(path.join(game_directory, *file["path"].split("/")))
+                    download["profiles"].add(entry["name"])
+
+            versions[entry["version"]] = entry.get("install_id", False)
+            pending.append(entry)
+
+    # versions are installed one after another, a version install isn't safe against another one writing
+    # the same libraries, but pack files download in parallel meanwhile
+    installed = {}
+
+    def install_versions():
+        for version, is_id in versions.items():
+            with tracing.span("provision.version", version=version):
+                try:
+                    installed[version] = launcher.install_version(version) if is_id else launcher.download_version(version)
+                except Exception as e:
+                    print(f"Couldn't install {version}: {e}")
+
+    installer = threading.Thread(target=install_versions, name="provision")
+    installer.start()
+
+    # a profile missing one of its files isn't created, the next apply tries it again
+    incomplete = set()
+    try:
+        with tracing.span("provision.files", files=len(files)):
+            for entry in pending:
+                game_directory = path.join(entry["path"], "game")
+                # a changed pack replaces the mods of the old one
+                if "mrpack" in entry and entry["data"] and path.isdir(path.join(game_directory, "mods")):
+                    shutil.rmtree(path.join(game_directory, "mods"))
+                os.makedirs(game_directory, exist_ok=True)
+
+                if "mrpack" in entry:
+                    mrpack.extract_overrides(entry["mrpack"], game_directory)
+
+            for file in download_pack_files(files, hash_index):
+                incomplete |= file["profiles"]
+    finally:
+        installer.join()
+        hash_index.save()
+
+    for entry in pending:
+        version_name = installed.get(entry["version"])
+        if version_name == None or entry["name"] in incomplete:
+            result["failed"].append(entry["name"])
+            continue
+
+        # settings like jvm stay, only what the manifest describes is replaced
+        profile_data = dict(entry["data"])
+        profile_data.update({"profile_name": entry["name"], "profile_version": version_name, "source": entry["source"]})
+        if "pack_version" in entry:
+            profile_data["pack_version"] = entry["pack_version"]
+
+        with open(path.join(entry["path"], "profile.json"), "w") as f:
+            f.write(json.dumps(profile_data))
+
+        result["created"].append(entry["name"])
+
+    return result
@@ -0,0 +1,132 @@
+import time
+import random
+import socket
+import asyncio
+import http.client
+import urllib.error
+
+import aiohttp
+import requests
+
+import tracing
+
+# Timeouts and retries shared by every network path
+# Failed attempts are retried with full jitter exponential backoff, a Retry-After header is honoured
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+# for requests, (connect, read)
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+# the LAN cache is close, fail over to upstream quickly
+CACHE_TIMEOUT = (2, READ_TIMEOUT)
+
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.5
+MAX_DELAY = 30
+
+# answers that mean try again later, 429 and the server errors also mean the host is overloaded
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+def is_overload_status(status:int)->bool:
+    return status == 429 or status >= 500
+
+def set_timeouts(connect:float, read:float):
+    global CONNECT_TIMEOUT, READ_TIMEOUT, TIMEOUT, CACHE_TIMEOUT
+    CONNECT_TIMEOUT = connect
+    READ_TIMEOUT = read
+    TIMEOUT = (connect, read)
+    CACHE_TIMEOUT = (min(CACHE_TIMEOUT[0], connect), read)
+
+class RetryableStatus(Exception):
+    status:int
+    retry_after:float|None
+
+    def __init__(self, url:str, status:int, retry_after:float|None=None) -> None:
+        super().__init__(f"HTTP {status} from {url}")
+        self.status = status
+        self.retry_after = retry_after
+
+def parse_retry_after(value:str|None)->float|None:
+    # only the seconds form, dates are rare enough to fall back to the backoff
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+def check_status(url:str, status:int, headers)->None:
+    if status in RETRY_STATUS:
+        raise RetryableStatus(url, status, parse_retry_after(headers.get("Retry-After")))
+
+def is_retryable(error:BaseException)->bool:
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUS
+
+    return isinstance(error, (
+        RetryableStatus,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+        urllib.error.URLError,
+        http.client.IncompleteRead,
+        http.client.RemoteDisconnected,
+        ConnectionError,
+        socket.timeout,
+        TimeoutError,
+        asyncio.TimeoutError,
+        aiohttp.ClientConnectionError,
+        aiohttp.ClientPayloadError,
+    ))
+
+def is_overload(error:BaseException)->bool:
+    # errors that mean the host can't keep up with the current concurrency
+    if isinstance(error, RetryableStatus):
+        return is_overload_status(error.status)
+    if isinstance(error, urllib.error.HTTPError):
+        return is_overload_status(error.code)
+
+    return isinstance(error, (requests.exceptions.Timeout, socket.timeout, TimeoutError, asyncio.TimeoutError))
+
+def get_retry_after(error:BaseException)->float|None:
+    if isinstance(error, RetryableStatus):
+        return error.retry_after
+    if isinstance(error, urllib.error.HTTPError):
+        return parse_retry_after(error.headers.get("Retry-After"))
+
+    return None
+
+def get_delay(attempt:int, retry_after:float|None=None)->float:
+    # full jitter, spreads out clients that failed at the same time
+    if retry_after != None:
+        return min(retry_after, MAX_DELAY)
+
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+def call(function, url:str, attempts:int=MAX_ATTEMPTS):
+    # runs function until it doesn't raise a retryable error
+    for attempt in range(attempts):
+        try:
+            return function()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+
+            tracing.count("http.retries")
+            delay = get_delay(attempt, get_retry_after(e))
+            print(f"Retrying {url} in {delay:.1f}s ({e})")
+            time.sleep(delay)
+
+async def call_async(function, url:str, attempts:int=MAX_ATTEMPTS):
+    for attempt in range(attempts):
+        try:
+            return await function()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+
+            tracing.count("http.retries")
+            delay = get_delay(attempt, get_retry_after(e))
+            print(f"Retrying {url} in {delay:.1f}s ({e})")
+            await asyncio.sleep(delay)
@@ -0,0 +1,469 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import concurrent.futures
+import time
+import typing
+import urllib.parse
+
+import requests
+
+import tracing
+import retry
+
+# Priority classes, lower is more urgent
+PRIORITY_CRITICAL = 0 # what the user is waiting on (installs with their libraries and assets, pack files)
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2 # prefetches, optional mods of a pack
+
+CHUNK_SIZE = 64 * 1024
+
+# concurrent downloads per host, grown while throughput improves and halved when the host is overloaded
+HOST_INITIAL_CONCURRENCY = 4
+HOST_MAX_CONCURRENCY = 16
+# one overload response usually comes with several more from the same burst, only back off once for them
+OVERLOAD_COOLDOWN = 1.0
+
+# (priority, rewrite) of the routed block the current thread or task is in
+_route:contextvars.ContextVar[tuple[int, typing.Callable|None]|None] = contextvars.ContextVar("route", default=None)
+
+def parse_rate(rate:str|int|float|None)->float:
+    # "512K", "2M", "1.5G" or a plain number of bytes per second, 0 means unlimited
+    if not rate:
+        return 0
+
+    if isinstance(rate, (int, float)):
+        return float(rate)
+
+    rate = str(rate).strip().upper().removesuffix("B").removesuffix("/S")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+    if rate and rate[-1] in units:
+        return float(rate[:-1]) * units[rate[-1]]
+
+    return float(rate)
+
+def get_host(url:str)->str:
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+class TokenBucket:
+    rate:float
+    capacity:float
+
+    def __init__(self, rate:float, capacity:float|None=None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity else max(rate, CHUNK_SIZE)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount:int)->float:
+        # takes amount tokens (going into debt if needed) and returns how long to wait
+        if self.rate <= 0:
+            return 0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+
+            if self._tokens >= 0:
+                return 0
+
+            return -self._tokens / self.rate
+
+class HostLimiter:
+    limit:int
+    active:int
+    # background transfers waiting for more urgent work, they don't count against the limit
+    yielding:int
+
+    def __init__(self, limit:int=HOST_INITIAL_CONCURRENCY, maximum:int=HOST_MAX_CONCURRENCY) -> None:
+        self.limit = limit
+        self.maximum = maximum
+        self.active = 0
+        self.yielding = 0
+
+        self._window_bytes = 0
+        self._window_done = 0
+        self._window_start = time.monotonic()
+        self._throughput = 0.0
+        self._last_decrease = 0.0
+        self._saturated = False
+
+    def is_full(self)->bool:
+        return self.active - self.yielding >= self.limit
+
+    def acquire(self):
+        self.active += 1
+        # the limit only grows while it is what holds transfers back
+        if self.active >= self.limit:
+            self._saturated = True
+
+    def add_bytes(self, nbytes:int):
+        self._window_bytes += nbytes
+
+    def success(self):
+        # every limit finished transfers the throughput of the window is compared with the one before
+        self._window_done += 1
+        if self._window_done < self.limit:
+            return
+
+        now = time.monotonic()
+        throughput = self._window_bytes / max(now - self._window_start, 1e-6)
+
+        if throughput > self._throughput * 1.05 and self._saturated:
+            self.limit = min(self.maximum, self.limit + 1)
+        elif throughput < self._throughput * 0.8:
+            self.limit = max(1, self.limit - 1)
+
+        self._throughput = throughput
+        self._window_bytes = 0
+        self._window_done = 0
+        self._window_start = now
+        self._saturated = False
+
+    def overload(self):
+        now = time.monotonic()
+        if now - self._last_decrease < OVERLOAD_COOLDOWN:
+            return
+
+        self.limit = max(1, self.limit // 2)
+        self._last_decrease = now
+        self._throughput = 0.0
+        self._window_bytes = 0
+        self._window_done = 0
+        self._window_start = now
+        self._saturated = False
+        tracing.count("http.backoff")
+
+class DownloadScheduler:
+    rate_limit:float
+    host_rate_limit:float
+    max_concurrent:int
+
+    def __init__(self, rate_limit:float=0, host_rate_limit:float=0, max_concurrent:int=8) -> None:
+        self._condition = threading.Condition()
+        self._active = {PRIORITY_CRITICAL: 0, PRIORITY_NORMAL: 0, PRIORITY_BACKGROUND: 0}
+        # background jobs paused in throttle, their slots are lent to the work they wait for
+        self._yielding = 0
+        self._paused = False
+        self._host_buckets:dict[str, TokenBucket] = {}
+        self._hosts:dict[str, HostLimiter] = {}
+
+        self._routed = 0
+        self._original_send = None
+        self._original_submit = None
+
+        self.max_concurrent = max_concurrent
+        self.set_rate_limit(rate_limit, host_rate_limit)
+
+    def set_rate_limit(self, rate_limit:float=0, host_rate_limit:float=0):
+        self.rate_limit = parse_rate(rate_limit)
+        self.host_rate_limit = parse_rate(host_rate_limit)
+
+        self._bucket = TokenBucket(self.rate_limit)
+        self._host_buckets = {}
+
+    def pause_background(self):
+        with self._condition:
+            self._paused = True
+
+    def resume_background(self):
+        with self._condition:
+            self._paused = False
+            self._condition.notify_all()
+
+    def is_paused(self)->bool:
+        return self._paused
+
+    def _yield_background(self)->bool:
+        # background work yields to anything the user is waiting on
+        return self._paused or self._active[PRIORITY_CRITICAL] > 0 or self._active[PRIORITY_NORMAL] > 0
+
+    def _must_wait(self, priority:int)->bool:
+        if priority >= PRIORITY_BACKGROUND and self._yield_background():
+            return True
+
+        return sum(self._active.values()) - self._yielding >= self.max_concurrent and priority != PRIORITY_CRITICAL
+
+    def get_host_limit(self, url:str)->int:
+        with self._condition:
+            return self._get_limiter(get_host(url)).limit
+
+    def _get_limiter(self, host:str)->HostLimiter:
+        limiter = self._hosts.get(host)
+        if limiter == None:
+            limiter = self._hosts[host] = HostLimiter()
+        return limiter
+
+    def _enter(self, priority:int, host:str|None=None):
+        with self._condition:
+            limiter = self._get_limiter(host) if host else None
+            while self._must_wait(priority) or (limiter and limiter.is_full()):
+                self._condition.wait(0.5)
+            self._active[priority] += 1
+            if limiter:
+                limiter.acquire()
+
+    def _leave(self, priority:int, host:str|None=None, error:BaseException|None=None):
+        with self._condition:
+            self._active[priority] -= 1
+            if host:
+                self._release_host(host, error)
+            self._condition.notify_all()
+
+    def _release_host(self, host:str, error:BaseException|None=None):
+        limiter = self._get_limiter(host)
+        limiter.active -= 1
+        if error == None:
+            limiter.success()
+        elif retry.is_overload(error):
+            limiter.overload()
+
+    def _enter_host(self, host:str):
+        # only the slot of the host, for requests made inside a block that already holds a download slot
+        with self._condition:
+            limiter = self._get_limiter(host)
+            while limiter.is_full():
+                self._condition.wait(0.5)
+            limiter.acquire()
+
+    def _leave_host(self, host:str, error:BaseException|None=None):
+        with self._condition:
+            self._release_host(host, error)
+            self._condition.notify_all()
+
+    def _wait_time(self, url:str, nbytes:int)->float:
+        wait = self._bucket.reserve(nbytes)
+
+        if self.host_rate_limit > 0:
+            host = get_host(url)
+            bucket = self._host_buckets.get(host)
+            if bucket == None:
+                bucket = self._host_buckets.setdefault(host, TokenBucket(self.host_rate_limit))
+            wait = max(wait, bucket.reserve(nbytes))
+
+        return wait
+
+    @contextlib.contextmanager
+    def job(self, url:str, priority:int=PRIORITY_NORMAL):
+        # holds a download slot and a slot of the host for the duration of one transfer
+        host = get_host(url)
+        self._enter(priority, host)
+        try:
+            yield
+        except BaseException as e:
+            self._leave(priority, host, e)
+            raise
+        else:
+            self._leave(priority, host)
+
+    @contextlib.asynccontextmanager
+    async def job_async(self, url:str, priority:int=PRIORITY_NORMAL):
+        host = get_host(url)
+        await asyncio.to_thread(self._enter, priority, host)
+        try:
+            yield
+        except BaseException as e:
+            self._leave(priority, host, e)
+            raise
+        else:
+            self._leave(priority, host)
+
+    def _add_host_bytes(self, url:str, nbytes:int):
+        host = get_host(url)
+        with self._condition:
+            if host in self._hosts:
+                self._hosts[host].add_bytes(nbytes)
+
+    def _set_yielding(self, url:str, change:int):
+        with self._condition:
+            self._yielding += change
+            limiter = self._hosts.get(get_host(url))
+            if limiter:
+                limiter.yielding += change
+            self._condition.notify_all()
+
+    def throttle(self, url:str, nbytes:int, priority:int=PRIORITY_NORMAL):
+        # called after every chunk, blocks until the chunk fits into the rate limits
+        if priority >= PRIORITY_BACKGROUND and self._yield_background():
+            self._set_yielding(url, 1)
+            try:
+                with self._condition:
+                    while self._yield_background():
+                        self._condition.wait(0.5)
+            finally:
+                self._set_yielding(url, -1)
+
+        tracing.count("download.bytes", nbytes)
+        self._add_host_bytes(url, nbytes)
+        wait = self._wait_time(url, nbytes)
+        if wait > 0:
+            tracing.count("download.throttled_ms", int(wait * 1000))
+            time.sleep(wait)
+
+    async def throttle_async(self, url:str, nbytes:int, priority:int=PRIORITY_NORMAL):
+        if priority >= PRIORITY_BACKGROUND and self._yield_background():
+            self._set_yielding(url, 1)
+            try:
+                while self._yield_background():
+                    await asyncio.sleep(0.5)
+            finally:
+                self._set_yielding(url, -1)
+
+        tracing.count("download.bytes", nbytes)
+        self._add_host_bytes(url, nbytes)
+        wait = self._wait_time(url, nbytes)
+        if wait > 0:
+            tracing.count("download.throttled_ms", int(wait * 1000))
+            await asyncio.sleep(wait)
+
+    def copy_stream(self, source, destination, url:str, priority:int=PRIORITY_NORMAL)->int:
+        copied = 0
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            destination.write(chunk)
+            copied += len(chunk)
+            self.throttle(url, len(chunk), priority)
+
+        return copied
+
+    def wrap_response(self, response:requests.Response, url:str, priority:int=PRIORITY_NORMAL, release=None)->requests.Response:
+        # throttle the raw body reads of a streamed requests response
+        # release is called once when the body is finished, failed or the connection is given back
+        raw = response.raw
+        read = raw.read
+        release_conn = raw.release_conn
+        scheduler = self
+        released = threading.Event()
+
+        def finish(error:BaseException|None=None):
+            if release and not released.is_set():
+                released.set()
+                release(error)
+
+        def throttled_read(*args, **kwargs):
+            try:
+                data = read(*args, **kwargs)
+            except BaseException as e:
+                finish(e)
+                raise
+            if data:
+                scheduler.throttle(url, len(data), priority)
+            else:
+                finish()
+            return data
+
+        def finishing_release_conn():
+            finish()
+            release_conn()
+
+        raw.read = throttled_read
+        raw.release_conn = finishing_release_conn
+        return response
+
+    @contextlib.contextmanager
+    def routed(self, priority:int=PRIORITY_CRITICAL, rewrite=None):
+        # routes downloads done by third party code using requests (minecraft_launcher_lib) through the scheduler
+        # rewrite can map an url to a mirror which is tried first
+        # only requests made from inside the block are routed, other threads keep their own priority
+        self._enter(priority)
+        token = _route.set((priority, rewrite))
+
+        with self._condition:
+            self._routed += 1
+
+            if self._original_send == None:
+                self._original_send = requests.adapters.HTTPAdapter.send
+                self._original_submit = concurrent.futures.ThreadPoolExecutor.submit
+                original_send = self._original_send
+                original_submit = self._original_submit
+                scheduler = self
+
+                def send(adapter, request, **kwargs):
+                    route = _route.get()
+                    if route == None:
+                        return original_send(adapter, request, **kwargs)
+
+                    priority, rewrite = route
+                    tracing.count("http.requests")
+                    # requests waits forever by default, a stalled server would hang the install
+                    if kwargs.get("timeout") == None:
+                        kwargs["timeout"] = retry.TIMEOUT
+
+                    mirror_url = rewrite(request.url) if rewrite else None
+                    if mirror_url:
+                        mirror_request = request.copy()
+                        mirror_request.url = mirror_url
+                        try:
+                            response = original_send(adapter, mirror_request, **dict(kwargs, timeout=retry.CACHE_TIMEOUT))
+                            if response.status_code == 200:
+                                tracing.count("cache.hit")
+                                return scheduler.wrap_response(response, request.url, priority)
+                            response.close()
+                        except requests.exceptions.RequestException:
+                            pass
+                        tracing.count("cache.miss")
+
+                    # every attempt takes a slot of the host, the block only holds the download slot
+                    # the slot is kept until the body is read, so the host limit covers the whole transfer
+                    host = get_host(request.url)
+
+                    def attempt():
+                        scheduler._enter_host(host)
+                        try:
+                            response = original_send(adapter, request, **kwargs)
+                            try:
+                                retry.check_status(request.url, response.status_code, response.headers)
+                            except retry.RetryableStatus:
+                                response.close()
+                                raise
+                        except BaseException as e:
+                            scheduler._leave_host(host, e)
+                            raise
+                        return response
+
+                    response = retry.call(attempt, request.url)
+                    if response.status_code != 200:
+                        # error bodies are often never read by the caller
+                        scheduler._leave_host(host)
+                        return scheduler.wrap_response(response, request.url, priority)
+
+                    return scheduler.wrap_response(response, request.url, priority, lambda error: scheduler._leave_host(host, error))
+
+                def submit(executor, fn, /, *args, **kwargs):
+                    # minecraft_launcher_lib downloads in a thread pool, its workers belong to the block that submitted them
+                    if _route.get() == None:
+                        return original_submit(executor, fn, *args, **kwargs)
+                    return original_submit(executor, contextvars.copy_context().run, fn, *args, **kwargs)
+
+                requests.adapters.HTTPAdapter.send = send
+                concurrent.futures.ThreadPoolExecutor.submit = submit
+        try:
+            yield
+        finally:
+            _route.reset(token)
+            with self._condition:
+                self._routed -= 1
+                if self._routed == 0 and self._original_send != None:
+                    requests.adapters.HTTPAdapter.send = self._original_send
+                    concurrent.futures.ThreadPoolExecutor.submit = self._original_submit
+                    self._original_send = None
+                    self._original_submit = None
+
+            self._leave(priority)
+
+_scheduler:DownloadScheduler|None = None
+
+def get_scheduler()->DownloadScheduler:
+    global _scheduler
+
+    if _scheduler == None:
+        _scheduler = DownloadScheduler()
+
+    return _scheduler
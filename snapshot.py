@@ -0,0 +1,240 @@
+from os import path
+import os
+import json
+import time
+import zlib
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Snapshots of profile game directories
+#
+#   snapshots/chunks/<sha1[:2]>/<sha1>          1 MiB chunks (zlib compressed if it helps), shared by every snapshot and profile
+#   snapshots/profiles/<profile>/<id>.json      {"created", "files": {relative path: {"size", "mtime", "chunks"}}}
+#
+# Files whose size and mtime match the previous snapshot reuse its chunks without being read,
+# changed files only store the chunks that aren't known yet (a region file usually changes in a few places)
+# Deleting a snapshot prunes the chunks no other snapshot of any profile uses
+
+CHUNK_SIZE = 1024 * 1024
+COMPRESSION_LEVEL = 1
+# region files are mostly compressed already, a chunk is only compressed when a sample of it shrinks
+SAMPLE_SIZE = 64 * 1024
+MIN_COMPRESSION = 0.9
+
+# the first byte of a stored chunk
+COMPRESSED = b"z"
+RAW = b"r"
+
+MAX_WORKERS = 8
+
+# rewritten on every launch and not worth keeping
+EXCLUDED = ["logs", "crash-reports"]
+
+# chunks this recent can belong to a snapshot that is still being created, pruning leaves them alone
+PRUNE_MIN_AGE = 60 * 60
+
+def get_chunk_path(snapshots_directory:str, sha1:str)->str:
+    return path.join(snapshots_directory, "chunks", sha1[:2], sha1)
+
+def get_profile_directory(snapshots_directory:str, profile:str)->str:
+    return path.join(snapshots_directory, "profiles", profile)
+
+def get_snapshots(snapshots_directory:str, profile:str)->list[str]:
+    # snapshot ids, oldest first
+    profile_directory = get_profile_directory(snapshots_directory, profile)
+    if not path.isdir(profile_directory):
+        return []
+
+    return sorted(f.removesuffix(".json") for f in os.listdir(profile_directory) if f.endswith(".json"))
+
+def read_snapshot(snapshots_directory:str, profile:str, snapshot_id:str)->dict|None:
+    snapshot_file = path.join(get_profile_directory(snapshots_directory, profile), f"{snapshot_id}.json")
+    if not path.exists(snapshot_file):
+        return None
+
+    with open(snapshot_file, "r") as f:
+        return json.load(f)
+
+def scan_files(game_directory:str)->dict[str, os.stat_result]:
+    # {relative path: stat} from the directory listings, no file is opened
+    files = {}
+
+    def scan(directory:str, relative:str):
+        for entry in os.scandir(directory):
+            if relative == "" and entry.name in EXCLUDED:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                scan(entry.path, f"{relative}{entry.name}/")
+            elif entry.is_file(follow_symlinks=False):
+                files[f"{relative}{entry.name}"] = entry.stat(follow_symlinks=False)
+
+    if path.isdir(game_directory):
+        scan(game_directory, "")
+
+    return files
+
+def encode_chunk(data:bytes)->bytes:
+    sample = data[:SAMPLE_SIZE]
+    if len(zlib.compress(sample, COMPRESSION_LEVEL)) > len(sample) * MIN_COMPRESSION:
+        return RAW + data
+
+    return COMPRESSED + zlib.compress(data, COMPRESSION_LEVEL)
+
+def decode_chunk(data:bytes)->bytes:
+    if data[:1] == COMPRESSED:
+        return zlib.decompress(data[1:])
+
+    return data[1:]
+
+def store_file(snapshots_directory:str, file:str)->list[str]:
+    # splits a file into chunks and stores the new ones, returns their hashes
+    chunks = []
+    with open(file, "rb") as f:
+        for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha1 = hashlib.sha1(data).hexdigest()
+            chunks.append(sha1)
+
+            chunk_path = get_chunk_path(snapshots_directory, sha1)
+            if path.exists(chunk_path):
+                continue
+
+            os.makedirs(path.dirname(chunk_path), exist_ok=True)
+            temp_path = f"{chunk_path}.tmp-{os.getpid()}-{id(data)}"
+            with open(temp_path, "wb") as chunk_file:
+                chunk_file.write(encode_chunk(data))
+            os.replace(temp_path, chunk_path)
+
+    return chunks
+
+def create_snapshot(snapshots_directory:str, profile:str, game_directory:str)->tuple[str, dict]:
+    # returns the snapshot id and {"files", "stored"}
+    snapshots = get_snapshots(snapshots_directory, profile)
+    previous = read_snapshot(snapshots_directory, profile, snapshots[-1])["files"] if snapshots else {}
+
+    files = {}
+    changed = []
+    for relative, stat in scan_files(game_directory).items():
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        old = previous.get(relative)
+        if old and old["size"] == entry["size"] and old["mtime"] == entry["mtime"]:
+            entry["chunks"] = old["chunks"]
+        else:
+            changed.append(relative)
+        files[relative] = entry
+
+    def store(relative:str):
+        files[relative]["chunks"] = store_file(snapshots_directory, path.join(game_directory, *relative.split("/")))
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(store, changed))
+
+    snapshot_id = time.strftime("%Y%m%d-%H%M%S")
+    if snapshot_id in snapshots:
+        count = 2
+        while f"{snapshot_id}-{count}" in snapshots:
+            count += 1
+        snapshot_id = f"{snapshot_id}-{count}"
+
+    # written last, a snapshot only exists once all of its chunks do
+    profile_directory = get_profile_directory(snapshots_directory, profile)
+    os.makedirs(profile_directory, exist_ok=True)
+    snapshot_file = path.join(profile_directory, f"{snapshot_id}.json")
+    with open(snapshot_file + ".tmp", "w") as f:
+        f.write(json.dumps({"created": time.time(), "files": files}))
+    os.replace(snapshot_file + ".tmp", snapshot_file)
+
+    return (snapshot_id, {"files": len(files), "stored": len(changed)})
+
+def restore_file(snapshots_directory:str, file:str, entry:dict):
+    os.makedirs(path.dirname(file), exist_ok=True)
+    temp_file = f"{file}.restore"
+
+    with open(temp_file, "wb") as f:
+        for sha1 in entry["chunks"]:
+            with open(get_chunk_path(snapshots_directory, sha1), "rb") as chunk_file:
+                f.write(decode_chunk(chunk_file.read()))
+
+    os.replace(temp_file, file)
+    # the next snapshot sees the file as unchanged
+    os.utime(file, ns=(entry["mtime"], entry["mtime"]))
+
+def restore_snapshot(snapshots_directory:str, profile:str, game_directory:str, snapshot_id:str|None=None)->dict|None:
+    # makes the game directory match the snapshot, returns {"restored", "removed"}
+    if snapshot_id == None:
+        snapshots = get_snapshots(snapshots_directory, profile)
+        if not snapshots:
+            print(f"Profile '{profile}' has no snapshots.")
+            return None
+        snapshot_id = snapshots[-1]
+
+    snapshot = read_snapshot(snapshots_directory, profile, snapshot_id)
+    if snapshot == None:
+        print(f"Snapshot '{snapshot_id}' of profile '{profile}' doesn't exist.")
+        return None
+
+    current = scan_files(game_directory)
+    changed = []
+    for relative, entry in snapshot["files"].items():
+        stat = current.get(relative)
+        if not stat or stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime"]:
+            changed.append(relative)
+
+    for relative in changed:
+        for sha1 in snapshot["files"][relative]["chunks"]:
+            if not path.exists(get_chunk_path(snapshots_directory, sha1)):
+                print(f"Snapshot '{snapshot_id}' is missing data of {relative}, nothing was restored.")
+                return None
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        list(executor.map(lambda r: restore_file(snapshots_directory, path.join(game_directory, *r.split("/")), snapshot["files"][r]), changed))
+
+    removed = [r for r in current if r not in snapshot["files"]]
+    for relative in removed:
+        os.remove(path.join(game_directory, *relative.split("/")))
+
+    return {"restored": len(changed), "removed": len(removed)}
+
+def get_used_chunks(snapshots_directory:str)->set[str]:
+    used = set()
+    profiles_directory = path.join(snapshots_directory, "profiles")
+    if not path.isdir(profiles_directory):
+        return used
+
+    for profile in os.listdir(profiles_directory):
+        for snapshot_id in get_snapshots(snapshots_directory, profile):
+            snapshot = read_snapshot(snapshots_directory, profile, snapshot_id)
+            for entry in snapshot["files"].values():
+                used.update(entry["chunks"])
+
+    return used
+
+def prune_chunks(snapshots_directory:str)->int:
+    # deletes the chunks no snapshot uses, returns how many
+    chunks_directory = path.join(snapshots_directory, "chunks")
+    if not path.isdir(chunks_directory):
+        return 0
+
+    used = get_used_chunks(snapshots_directory)
+    oldest = time.time() - PRUNE_MIN_AGE
+    removed = 0
+
+    for prefix in os.listdir(chunks_directory):
+        for entry in os.scandir(path.join(chunks_directory, prefix)):
+            # unfinished writes of a crashed snapshot are pruned too
+            if entry.name in used or entry.stat().st_mtime > oldest:
+                continue
+
+            os.remove(entry.path)
+            removed += 1
+
+    return removed
+
+def delete_snapshot(snapshots_directory:str, profile:str, snapshot_id:str)->dict|None:
+    # returns {"pruned"}, the number of chunks only this snapshot used
+    snapshot_file = path.join(get_profile_directory(snapshots_directory, profile), f"{snapshot_id}.json")
+    if not path.exists(snapshot_file):
+        print(f"Snapshot '{snapshot_id}' of profile '{profile}' doesn't exist.")
+        return None
+
+    os.remove(snapshot_file)
+    return {"pruned": prune_chunks(snapshots_directory)}
@@ -0,0 +1,369 @@
+from os import path
+import os
+import json
+import time
+import random
+import socket
+import struct
+import hashlib
+import zipfile
+import threading
+import contextlib
+import typing
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+# Local stand-in for the upstream servers (mojang, forge, fabric, quilt, modrinth)
+# used by benchmark.py so nothing touches the external network
+#
+# Faults can be injected to exercise timeouts and retries:
+#   status  answers with an error status (503 by default)
+#   hang    accepts the request and never answers until delay passed
+#   stall   sends half of the body and stops for delay
+#   reset   drops the connection without an answer
+# max_concurrent answers 429 to requests over the limit, like a rate limited CDN
+
+FAULT_KINDS = ["status", "hang", "stall", "reset"]
+
+class StandInServer:
+    routes:dict[str, bytes|typing.Callable]
+    bytes_sent:int
+    requests_served:int
+    route_requests:dict[str, int]
+    faults_injected:int
+    max_concurrent:int
+    peak_concurrent:int
+
+    def __init__(self, host:str="127.0.0.1", port:int=0, seed:int=0) -> None:
+        self.routes = {}
+        self.bytes_sent = 0
+        self.requests_served = 0
+        self.route_requests = {}
+        self.faults_injected = 0
+        self.max_concurrent = 0
+        self.peak_concurrent = 0
+        self._faults:list[dict] = []
+        self._active = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin.handle(self)
+
+            def do_POST(self):
+                standin.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self)->str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add(self, route:str, data:bytes|str|dict|list|typing.Callable)->str:
+        # serves data at route and returns its url, a callable gets the request body and returns the data
+        route = "/" + route.lstrip("/")
+        self.routes[route] = data if callable(data) else encode(data)
+        return self.url + route
+
+    def add_fault(self, kind:str, route:str="/", count:int|None=None, probability:float=1.0, status:int=503, delay:float=5.0, retry_after:float|None=None):
+        # injects kind into requests whose path starts with route, count times or forever
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"Unknown fault '{kind}', expected one of {', '.join(FAULT_KINDS)}")
+
+        self._faults.append({"kind": kind, "route": "/" + route.lstrip("/"), "count": count, "probability": probability, "status": status, "delay": delay, "retry_after": retry_after})
+
+    def clear_faults(self):
+        self._faults.clear()
+
+    def _get_fault(self, route:str)->dict|None:
+        with self._lock:
+            for fault in self._faults:
+                if not route.startswith(fault["route"]) or fault["count"] == 0:
+                    continue
+                if self._random.random() >= fault["probability"]:
+                    continue
+
+                if fault["count"] != None:
+                    fault["count"] -= 1
+                self.faults_injected += 1
+                return fault
+
+        return None
+
+    def _inject(self, request:BaseHTTPRequestHandler, fault:dict, data:bytes):
+        request.close_connection = True
+
+        if fault["kind"] == "status":
+            request.send_response(fault["status"])
+            if fault["retry_after"] != None:
+                request.send_header("Retry-After", str(fault["retry_after"]))
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+        elif fault["kind"] == "hang":
+            time.sleep(fault["delay"])
+        elif fault["kind"] == "stall":
+            request.send_response(200)
+            request.send_header("Content-Length", str(len(data)))
+            request.end_headers()
+            request.wfile.write(data[:len(data) // 2])
+            request.wfile.flush()
+            time.sleep(fault["delay"])
+        elif fault["kind"] == "reset":
+            # linger 0 makes close send a RST instead of a FIN
+            request.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+
+    def handle(self, request:BaseHTTPRequestHandler):
+        route = urllib.parse.urlsplit(request.path).path
+        data = self.routes.get(route)
+
+        with self._lock:
+            self.route_requests[route] = self.route_requests.get(route, 0) + 1
+
+        if data == None:
+            request.send_error(404)
+            return
+
+        if callable(data):
+            body = request.rfile.read(int(request.headers.get("Content-Length", 0)))
+            data = encode(data(body))
+
+        with self._lock:
+            self._active += 1
+            self.peak_concurrent = max(self.peak_concurrent, self._active)
+            overloaded = self.max_concurrent and self._active > self.max_concurrent
+            if overloaded:
+                self.faults_injected += 1
+
+        try:
+            if overloaded:
+                request.close_connection = True
+                request.send_response(429)
+                request.send_header("Retry-After", "1")
+                request.send_header("Content-Length", "0")
+                request.end_headers()
+                return
+
+            fault = self._get_fault(route)
+            if fault:
+                self._inject(request, fault, data)
+                return
+
+            # counted before the body goes out, a client that got its answer sees it counted
+            with self._lock:
+                self.bytes_sent += len(data)
+                self.requests_served += 1
+
+            request.send_response(200)
+            request.send_header("Content-Length", str(len(data)))
+            request.end_headers()
+            request.wfile.write(data)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @contextlib.contextmanager
+    def redirect_requests(self):
+        # sends every requests call to the stand-in as /<host>/<path>, third party code included
+        original_send = requests.adapters.HTTPAdapter.send
+        standin = self
+
+        def send(adapter, request, **kwargs):
+            parts = urllib.parse.urlsplit(request.url)
+            if f"{parts.scheme}://{parts.netloc}" != standin.url:
+                request = request.copy()
+                request.url = f"{standin.url}/{parts.netloc}{parts.path}"
+            return original_send(adapter, request, **kwargs)
+
+        requests.adapters.HTTPAdapter.send = send
+        try:
+            yield
+        finally:
+            requests.adapters.HTTPAdapter.send = original_send
+
+def encode(data:bytes|str|dict|list)->bytes:
+    if isinstance(data, (dict, list)):
+        data = json.dumps(data)
+    if isinstance(data, str):
+        data = data.encode()
+
+    return data
+
+def upstream_route(url:str)->str:
+    # the stand-in route redirect_requests uses for an upstream url
+    parts = urllib.parse.urlsplit(url)
+    return f"/{parts.netloc}{parts.path}"
+
+def synthetic_bytes(name:str, size:int)->bytes:
+    # deterministic filler so runs are comparable
+    seed = hashlib.sha256(name.encode()).digest()
+    return (seed * (size // len(seed) + 1))[:size]
+
+def add_catalogs(standin:StandInServer, version_count:int=600, loader_count:int=200):
+    versions = [f"1.{minor}.{patch}" for minor in range(version_count // 10 + 1) for patch in range(10)][:version_count]
+
+    standin.add(upstream_route("https://launchermeta.mojang.com/mc/game/version_manifest_v2.json"), {
+        "latest": {"release": versions[-1], "snapshot": versions[-1]},
+        "versions": [{"id": v, "type": "release", "url": "", "time": "2020-01-01T00:00:00+00:00", "releaseTime": "2020-01-01T00:00:00+00:00", "sha1": "", "complianceLevel": 1} for v in versions]
+    })
+
+    promos = {}
+    for v in versions:
+        promos[f"{v}-latest"] = f"{v}.0.1"
+        promos[f"{v}-recommended"] = f"{v}.0.0"
+    forge_url = standin.add("/forge/promotions_slim.json", {"homepage": "", "promos": promos})
+
+    for loader, host in [("fabric", "meta.fabricmc.net"), ("quilt", "meta.quiltmc.org")]:
+        api = "v2" if loader == "fabric" else "v3"
+        standin.add(f"/{host}/{api}/versions/game", [{"version": v, "stable": i % 3 != 0} for i, v in enumerate(versions)])
+        standin.add(f"/{host}/{api}/versions/loader", [{"separator": ".", "build": i, "maven": "", "version": f"0.{i}.0", "stable": True} for i in range(loader_count)])
+
+    return forge_url
+
+def create_version(minecraft_directory:str, version_id:str, library_count:int=80)->dict:
+    # installed vanilla style version with existing library files
+    libraries = []
+    for i in range(library_count):
+        maven_path = f"org/synthetic/lib{i}/1.0/lib{i}-1.0.jar"
+        library_path = path.join(minecraft_directory, "libraries", maven_path)
+        os.makedirs(path.dirname(library_path), exist_ok=True)
+        with open(library_path, "wb") as f:
+            f.write(synthetic_bytes(maven_path, 1024))
+
+        libraries.append({
+            "name": f"org.synthetic:lib{i}:1.0",
+            "downloads": {"artifact": {"path": maven_path, "url": f"https://libraries.minecraft.net/{maven_path}", "sha1": "", "size": 1024}}
+        })
+
+    data = {
+        "id": version_id,
+        "type": "release",
+        "mainClass": "net.minecraft.client.main.Main",
+        "assets": "1",
+        "assetIndex": {"id": "1", "url": "", "sha1": "", "size": 0, "totalSize": 0},
+        "downloads": {"client": {"url": "", "sha1": "", "size": 0}},
+        "libraries": libraries,
+        "arguments": {
+            "game": ["--username", "${auth_player_name}", "--version", "${version_name}", "--gameDir", "${game_directory}",
+                     "--assetsDir", "${assets_root}", "--assetIndex", "${assets_index_name}", "--uuid", "${auth_uuid}",
+                     "--accessToken", "${auth_access_token}", "--userType", "${user_type}", "--versionType", "${version_type}"],
+            "jvm": ["-Djava.library.path=${natives_directory}", "-Dminecraft.launcher.brand=${launcher_name}",
+                    "-Dminecraft.launcher.version=${launcher_version}", "-cp", "${classpath}"]
+        }
+    }
+
+    version_directory = path.join(minecraft_directory, "versions", version_id)
+    os.makedirs(version_directory, exist_ok=True)
+    with open(path.join(version_directory, f"{version_id}.json"), "w") as f:
+        f.write(json.dumps(data))
+    with open(path.join(version_directory, f"{version_id}.jar"), "wb") as f:
+        f.write(synthetic_bytes(version_id, 4096))
+
+    return data
+
+def create_mrpack(standin:StandInServer, file:str, minecraft_version:str, mod_count:int=150, override_count:int=400, mod_size:int=64 * 1024):
+    files = []
+    for i in range(mod_count):
+        name = f"mod{i}.jar"
+        data = synthetic_bytes(name, mod_size)
+        url = standin.add(f"/cdn/data/{i}/{name}", data)
+        files.append({
+            "path": f"mods/{name}",
+            "hashes": {"sha1": hashlib.sha1(data).hexdigest(), "sha512": hashlib.sha512(data).hexdigest()},
+            "env": {"client": "required", "server": "required"},
+            "downloads": [url],
+            "fileSize": len(data)
+        })
+
+    index = {
+        "formatVersion": 1,
+        "game": "minecraft",
+        "versionId": "1.0.0",
+        "name": "Synthetic pack",
+        "files": files,
+        "dependencies": {"minecraft": minecraft_version, "fabric-loader": "0.1.0"}
+    }
+
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as pack:
+        pack.writestr("modrinth.index.json", json.dumps(index))
+        for i in range(override_count):
+            name = f"overrides/config/mod{i % 50}/option{i}.json"
+            pack.writestr(name, synthetic_bytes(name, 2048))
+
+def create_profiles(profiles_directory:str, version_id:str, profile_count:int=40, mod_count:int=150, save_files:int=300):
+    # profile trees of a realistic shape: mods, configs and a world with region files
+    for p in range(profile_count):
+        profile_path = path.join(profiles_directory, f"profile{p}")
+        game_directory = path.join(profile_path, "game")
+
+        for directory, count, size, extension in [("mods", mod_count, 4096, ".jar"), ("config", mod_count, 512, ".toml"), (path.join("saves", "world", "region"), save_files, 8192, ".mca")]:
+            os.makedirs(path.join(game_directory, directory), exist_ok=True)
+            for i in range(count):
+                with open(path.join(game_directory, directory, f"file{i}{extension}"), "wb") as f:
+                    f.write(synthetic_bytes(f"{directory}{i}", size))
+
+        with open(path.join(profile_path, "profile.json"), "w") as f:
+            f.write(json.dumps({"profile_name": f"profile{p}", "profile_version": version_id}))
+
+def add_modrinth_api(standin:StandInServer, versions:dict[str, dict])->str:
+    # hash lookups of a modrinth compatible api, versions maps sha1 -> latest version, returns the api url
+    def lookup(body:bytes)->dict:
+        hashes = json.loads(body).get("hashes", [])
+        return {h: versions[h] for h in hashes if h in versions}
+
+    standin.add("/modrinth/v2/version_files/update", lookup)
+    standin.add("/modrinth/v2/version_files", lookup)
+    return standin.url + "/modrinth"
+
+def create_mod_versions(standin:StandInServer, mods_directory:str, mod_count:int=150, outdated:int=50)->dict[str, dict]:
+    # synthetic mod jars and their modrinth versions, the first outdated mods have a newer version
+    versions = {}
+    os.makedirs(mods_directory, exist_ok=True)
+
+    for i in range(mod_count):
+        name = f"mod{i}.jar"
+        data = synthetic_bytes(name, 4096)
+        with zipfile.ZipFile(path.join(mods_directory, name), "w") as jar:
+            jar.writestr("fabric.mod.json", json.dumps({"id": f"mod{i}", "name": f"Mod {i}", "version": "1.0.0"}))
+            jar.writestr(f"mod{i}/Data.class", data)
+
+        with open(path.join(mods_directory, name), "rb") as f:
+            sha1 = hashlib.sha1(f.read()).hexdigest()
+
+        new_data = synthetic_bytes(f"{name}-new", 4096) if i < outdated else data
+        new_name = f"mod{i}-2.0.0.jar" if i < outdated else name
+        url = standin.add(f"/cdn/data/{i}/{new_name}", new_data)
+        new_sha1 = hashlib.sha1(new_data).hexdigest() if i < outdated else sha1
+
+        versions[sha1] = versions[new_sha1] = {
+            "id": f"v{i}",
+            "project_id": f"p{i}",
+            "version_number": "2.0.0" if i < outdated else "1.0.0",
+            "files": [{"hashes": {"sha1": new_sha1}, "url": url, "filename": new_name, "primary": True, "size": len(new_data)}]
+        }
+
+    return versions
@@ -0,0 +1,190 @@
+from os import path
+import os
+import shutil
+
+import version_info
+import prefetch
+import natives
+
+class Reachable:
+    versions:set[str]
+    libraries:set[str]
+    library_prefixes:set[str]
+    asset_indexes:set[str]
+    assets:set[str]
+    runtimes:set[str]
+    natives:set[str]
+    # versions whose json or inherited json is missing or unreadable, what they need is unknown
+    unresolved:set[str]
+
+    def __init__(self) -> None:
+        self.versions = set()
+        self.libraries = set()
+        self.library_prefixes = set()
+        self.asset_indexes = set()
+        self.assets = set()
+        self.runtimes = set()
+        self.natives = set()
+        self.unresolved = set()
+
+def get_forge_library_prefixes(minecraft_version:str, forge_version:str)->list[str]:
+    # forge processors write jars which aren't listed in the version json
+    return [
+        f"net/minecraftforge/forge/{minecraft_version}-{forge_version}/",
+        f"net/minecraft/client/{minecraft_version}-",
+        f"de/oceanlabs/mcp/mcp_config/{minecraft_version}-",
+    ]
+
+def get_complete_chain(minecraft_directory:str, version_id:str)->list[dict]|None:
+    # the inheritance chain, None if a version json of it is missing or can't be read
+    try:
+        chain = version_info.get_version_chain(minecraft_directory, version_id)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if not chain or (chain[-1].get("inheritsFrom") and chain[-1]["inheritsFrom"] not in [data["id"] for data in chain]):
+        return None
+
+    return chain
+
+def get_reachable(minecraft_directory:str, version_ids:list[str])->Reachable:
+    reachable = Reachable()
+    libraries_directory = path.join(minecraft_directory, "libraries")
+
+    for version_id in set(version_ids):
+        chain = get_complete_chain(minecraft_directory, version_id)
+        if chain == None:
+            reachable.unresolved.add(version_id)
+            continue
+
+        for data in chain:
+            reachable.versions.add(data["id"])
+            if data.get("jar"):
+                reachable.versions.add(data["jar"])
+
+            runtime = data.get("javaVersion", {}).get("component")
+            if runtime:
+                reachable.runtimes.add(runtime)
+
+            minecraft_version, mod_loader, mod_loader_version = prefetch.parse_version_id(data["id"])
+            if mod_loader == "forge":
+                reachable.library_prefixes.update(get_forge_library_prefixes(minecraft_version, mod_loader_version))
+
+        for file in version_info.get_library_files(minecraft_directory, chain):
+            reachable.libraries.add(path.relpath(file["path"], libraries_directory).replace(os.sep, "/"))
+
+        native_files = natives.get_native_files(minecraft_directory, version_id)
+        if native_files and all(path.exists(f["path"]) for f in native_files):
+            reachable.natives.add(natives.get_natives_key(native_files))
+
+        asset_index = version_info.get_asset_index(minecraft_directory, chain)
+        if asset_index and asset_index["id"] not in reachable.asset_indexes:
+            reachable.asset_indexes.add(asset_index["id"])
+            # a set of hashes, so thousands of shared objects are read once per index and not once per profile
+            reachable.assets.update(file["sha1"] for file in version_info.get_asset_files(minecraft_directory, asset_index))
+
+    return reachable
+
+def get_size(entry:os.DirEntry)->int:
+    if not entry.is_dir(follow_symlinks=False):
+        return entry.stat(follow_symlinks=False).st_size
+
+    size = 0
+    for root, dirs, files in os.walk(entry.path):
+        for file in files:
+            size += os.lstat(path.join(root, file)).st_size
+
+    return size
+
+def _scan_files(directory:str, relative:str=""):
+    # yields (relative path, DirEntry) of every file, the file type comes from the directory listing
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+
+    for entry in entries:
+        entry_path = f"{relative}{entry.name}"
+        if entry.is_dir(follow_symlinks=False):
+            yield from _scan_files(entry.path, entry_path + "/")
+        else:
+            yield entry_path, entry
+
+def find_unreachable(minecraft_directory:str, reachable:Reachable)->list[dict]:
+    # returns {"kind", "path", "size"} for every artifact no profile needs, only those are stat'ed
+    items = []
+
+    versions_directory = path.join(minecraft_directory, "versions")
+    if path.isdir(versions_directory):
+        for entry in os.scandir(versions_directory):
+            if entry.is_dir() and entry.name not in reachable.versions:
+                items.append({"kind": "version", "path": entry.path, "size": get_size(entry)})
+
+    runtime_directory = path.join(minecraft_directory, "runtime")
+    if path.isdir(runtime_directory):
+        for entry in os.scandir(runtime_directory):
+            if entry.is_dir() and entry.name not in reachable.runtimes:
+                items.append({"kind": "runtime", "path": entry.path, "size": get_size(entry)})
+
+    natives_directory = path.join(minecraft_directory, "natives")
+    if path.isdir(natives_directory):
+        for entry in os.scandir(natives_directory):
+            if entry.is_dir() and entry.name not in reachable.natives:
+                items.append({"kind": "natives", "path": entry.path, "size": get_size(entry)})
+
+    prefixes = tuple(reachable.library_prefixes)
+    for relative, entry in _scan_files(path.join(minecraft_directory, "libraries")):
+        if relative in reachable.libraries or relative.startswith(prefixes):
+            continue
+        items.append({"kind": "library", "path": entry.path, "size": get_size(entry)})
+
+    for relative, entry in _scan_files(path.join(minecraft_directory, "assets", "indexes")):
+        if relative.removesuffix(".json") not in reachable.asset_indexes:
+            items.append({"kind": "asset_index", "path": entry.path, "size": get_size(entry)})
+
+    for relative, entry in _scan_files(path.join(minecraft_directory, "assets", "objects")):
+        if entry.name not in reachable.assets:
+            items.append({"kind": "asset", "path": entry.path, "size": get_size(entry)})
+
+    return items
+
+def remove_empty_directories(directory:str):
+    for root, dirs, files in os.walk(directory, topdown=False):
+        if root != directory and not os.listdir(root):
+            os.rmdir(root)
+
+def collect_garbage(minecraft_directory:str, version_ids:list[str], dry_run:bool=False)->list[dict]|None:
+    reachable = get_reachable(minecraft_directory, version_ids)
+
+    # the unresolved versions could inherit anything, deleting would break their profiles
+    if reachable.unresolved:
+        print(f"Not collecting garbage, the version json of {', '.join(sorted(reachable.unresolved))} is missing or unreadable.")
+        print("Reinstall or delete the profiles using them first.")
+        return None
+
+    items = find_unreachable(minecraft_directory, reachable)
+
+    if dry_run:
+        return items
+
+    for item in items:
+        if item["kind"] == "natives":
+            natives.remove_directory(item["path"])
+        elif path.isdir(item["path"]) and not path.islink(item["path"]):
+            shutil.rmtree(item["path"])
+        else:
+            os.remove(item["path"])
+
+    for directory in ["libraries", path.join("assets", "objects")]:
+        if path.isdir(path.join(minecraft_directory, directory)):
+            remove_empty_directories(path.join(minecraft_directory, directory))
+
+    return items
+
+def format_size(size:int)->str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} {unit}"
+        size /= 1024
+
+    return f"{size:.1f} TiB"
@@ -0,0 +1,119 @@
+from os import path
+import os
+import time
+import socket
+import hashlib
+import tempfile
+import threading
+import unittest
+
+import requests
+
+import mrpack
+import networkutils
+import cache_server
+from scheduler import get_scheduler
+from standin import StandInServer
+
+def write_file(file:str, data:bytes):
+    os.makedirs(path.dirname(file), exist_ok=True)
+    with open(file, "wb") as f:
+        f.write(data)
+
+def read_file(file:str)->bytes:
+    with open(file, "rb") as f:
+        return f.read()
+
+class CacheServerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.minecraft_directory = path.join(self.temp.name, "minecraft")
+
+        self.cached = b"cached mod"
+        self.sha1 = hashlib.sha1(self.cached).hexdigest()
+        self.cached_file = path.join(self.minecraft_directory, "profiles", "test", "game", "mods", "mod.jar")
+        write_file(self.cached_file, self.cached)
+        write_file(path.join(self.minecraft_directory, "libraries", "com", "example", "lib.jar"), b"cached library")
+
+        self.cache = cache_server.create_cache_server(self.minecraft_directory, "127.0.0.1", 0)
+        threading.Thread(target=self.cache.serve_forever, daemon=True).start()
+        self.cache_url = f"http://127.0.0.1:{self.cache.server_port}"
+
+        self.standin = StandInServer()
+        self.standin.start()
+        self.upstream = b"upstream mod"
+        self.url = self.standin.add("/cdn/mod.jar", self.upstream)
+
+        networkutils.set_cache_url(self.cache_url)
+
+    def tearDown(self):
+        networkutils.set_cache_url(None)
+        self.standin.stop()
+        self.cache.shutdown()
+        self.cache.server_close()
+        self.temp.cleanup()
+
+    def download(self, sha1:str|None)->bytes:
+        destination = path.join(self.temp.name, "download", "mod.jar")
+        networkutils.download_file(self.url, destination, overwrite=True, sha1=sha1)
+        return read_file(destination)
+
+    def test_hit_is_served_from_cache(self):
+        self.assertEqual(self.download(self.sha1), self.cached)
+        self.assertEqual(self.standin.requests_served, 0)
+
+    def test_mrpack_hit_is_served_from_cache(self):
+        destination = path.join(self.temp.name, "pack", "mods", "mod.jar")
+        mrpack.download_file(self.url, destination, sha1=self.sha1)
+        self.assertEqual(read_file(destination), self.cached)
+        self.assertEqual(self.standin.requests_served, 0)
+
+    def test_miss_falls_back_upstream(self):
+        self.assertEqual(self.download(hashlib.sha1(self.upstream).hexdigest()), self.upstream)
+        self.assertEqual(self.standin.requests_served, 1)
+
+    def test_unreachable_cache_falls_back_upstream(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        networkutils.set_cache_url(f"http://127.0.0.1:{port}")
+
+        start = time.monotonic()
+        self.assertEqual(self.download(hashlib.sha1(self.upstream).hexdigest()), self.upstream)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_changed_object_is_not_served(self):
+        # the index still maps the old hash to the file, the server has to notice the content changed
+        write_file(self.cached_file, b"changed after indexing")
+
+        response = requests.get(f"{self.cache_url}/sha1/{self.sha1}")
+        self.assertEqual(response.status_code, 404)
+
+        self.standin.add("/cdn/mod.jar", self.cached)
+        self.assertEqual(self.download(self.sha1), self.cached)
+        self.assertEqual(self.standin.requests_served, 1)
+
+    def test_changed_object_is_served_under_its_new_hash(self):
+        changed = b"changed after indexing"
+        write_file(self.cached_file, changed)
+        requests.get(f"{self.cache_url}/sha1/{self.sha1}")
+
+        response = requests.get(f"{self.cache_url}/sha1/{hashlib.sha1(changed).hexdigest()}")
+        self.assertEqual(response.content, changed)
+
+    def test_path_outside_served_directories_is_not_served(self):
+        self.assertEqual(requests.get(f"{self.cache_url}/profiles/test/game/mods/mod.jar").status_code, 404)
+        self.assertEqual(requests.get(f"{self.cache_url}/libraries/../hash_index.json").status_code, 404)
+
+    def test_routed_requests_try_the_mirror_first(self):
+        upstream_library = self.standin.add("/maven/com/example/lib.jar", b"upstream library")
+        rewrite = lambda url: url.replace(f"{self.standin.url}/maven/", f"{self.cache_url}/libraries/")
+
+        with get_scheduler().routed(rewrite=rewrite):
+            self.assertEqual(requests.get(upstream_library).content, b"cached library")
+            self.assertEqual(requests.get(self.url).content, self.upstream)
+
+        self.assertEqual(self.standin.requests_served, 1)
+
+if __name__ == "__main__":
+    unittest.main()
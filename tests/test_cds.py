@@ -0,0 +1,56 @@
+from os import path
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import cds
+
+class CdsArgumentsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.minecraft = path.join(self.temp.name, "minecraft")
+        self.game = path.join(self.temp.name, "game")
+        os.makedirs(self.game)
+
+        # the version asks for java 17, what actually runs is decided by the fake java
+        patcher = mock.patch.object(cds, "get_java_major", lambda minecraft_directory, version: 17)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def create_java(self, version:str)->str:
+        # prints the version like java does, to stderr
+        java = path.join(self.temp.name, f"java-{version}.py")
+        with open(java, "w") as f:
+            f.write(f"#!{sys.executable}\nimport sys\nsys.stderr.write('openjdk version \"{version}\" 2023-01-17\\n')\n")
+        os.chmod(java, 0o755)
+        return java
+
+    def get_cds_arguments(self, java:str)->tuple[str, list[str]]:
+        return cds.get_cds_arguments(self.minecraft, "1.20.1", self.game, [java, "-cp", "client.jar", "net.minecraft.client.main.Main"])
+
+    @unittest.skipUnless(os.name == "posix", "the fake java is a script")
+    def test_old_java_gets_no_archive_flags(self):
+        for version, mode in [("1.8.0_392", cds.CDS_OFF), ("11.0.21", cds.CDS_OFF), ("17.0.9", cds.CDS_DUMP)]:
+            with self.subTest(version=version):
+                self.assertEqual(self.get_cds_arguments(self.create_java(version))[0], mode)
+
+    @unittest.skipUnless(os.name == "posix", "the fake java is a script")
+    def test_java_is_probed_once(self):
+        java = self.create_java("17.0.9")
+
+        with mock.patch.object(cds, "probe_java_major", wraps=cds.probe_java_major) as probe:
+            self.get_cds_arguments(java)
+            self.get_cds_arguments(java)
+
+        self.assertEqual(probe.call_count, 1)
+
+    def test_missing_java_gets_no_archive_flags(self):
+        self.assertEqual(self.get_cds_arguments(path.join(self.temp.name, "missing-java")), (cds.CDS_OFF, []))
+
+if __name__ == "__main__":
+    unittest.main()
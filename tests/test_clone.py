@@ -0,0 +1,69 @@
+from os import path
+import os
+import json
+import tempfile
+import unittest
+
+import clone
+
+def write_file(file:str, data:bytes):
+    os.makedirs(path.dirname(file), exist_ok=True)
+    with open(file, "wb") as f:
+        f.write(data)
+
+def read_file(file:str)->bytes:
+    with open(file, "rb") as f:
+        return f.read()
+
+class CloneProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.source = path.join(self.temp.name, "source")
+        self.destination = path.join(self.temp.name, "destination")
+
+        write_file(path.join(self.source, "profile.json"), json.dumps({"profile_name": "source", "profile_version": "1.20.1"}).encode())
+        write_file(path.join(self.source, "game", "mods", "mod.jar"), b"mod")
+        write_file(path.join(self.source, "game", "config", "mod.toml"), b"setting = 1")
+        write_file(path.join(self.source, "game", "saves", "world", "level.dat"), b"level")
+        os.utime(path.join(self.source, "game", "config", "mod.toml"), (1000000000, 1000000000))
+
+        clone.clone_profile(self.source, self.destination, "destination")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_writing_a_mutable_file_leaves_the_source_alone(self):
+        for relative in ["config/mod.toml", "saves/world/level.dat"]:
+            with open(path.join(self.destination, "game", *relative.split("/")), "wb") as f:
+                f.write(b"changed")
+
+        self.assertEqual(read_file(path.join(self.source, "game", "config", "mod.toml")), b"setting = 1")
+        self.assertEqual(read_file(path.join(self.source, "game", "saves", "world", "level.dat")), b"level")
+
+    def test_mutable_files_keep_their_mtime(self):
+        self.assertEqual(os.stat(path.join(self.destination, "game", "config", "mod.toml")).st_mtime, 1000000000)
+
+    def test_only_immutable_files_are_shared(self):
+        source_mod = os.stat(path.join(self.source, "game", "mods", "mod.jar"))
+        destination_config = os.stat(path.join(self.destination, "game", "config", "mod.toml"))
+
+        # hardlinked unless the filesystem supports reflinks
+        if source_mod.st_nlink > 1:
+            self.assertEqual(source_mod.st_ino, os.stat(path.join(self.destination, "game", "mods", "mod.jar")).st_ino)
+        self.assertEqual(destination_config.st_nlink, 1)
+
+    def test_replace_file_leaves_a_shared_file_alone(self):
+        override = path.join(self.temp.name, "override.jar")
+        write_file(override, b"override")
+
+        clone.replace_file(override, path.join(self.destination, "game", "mods", "mod.jar"))
+
+        self.assertEqual(read_file(path.join(self.destination, "game", "mods", "mod.jar")), b"override")
+        self.assertEqual(read_file(path.join(self.source, "game", "mods", "mod.jar")), b"mod")
+
+    def test_profile_name_is_replaced(self):
+        with open(path.join(self.destination, "profile.json"), "r") as f:
+            self.assertEqual(json.load(f)["profile_name"], "destination")
+
+if __name__ == "__main__":
+    unittest.main()
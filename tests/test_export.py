@@ -0,0 +1,32 @@
+from os import path
+import os
+import tempfile
+import unittest
+
+import export
+import mrpack
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.game = path.join(self.temp.name, "game")
+        os.makedirs(path.join(self.game, "config"))
+        with open(path.join(self.game, "config", "mod.toml"), "w") as f:
+            f.write("setting = 1")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_version_id(self):
+        output = path.join(self.temp.name, "pack.mrpack")
+
+        export.export_mrpack(self.game, output, "pack", "1.20.1", "fabric", "0.15.0", lookup=False)
+        self.assertEqual(mrpack.read_index(output)["versionId"], export.DEFAULT_VERSION_ID)
+
+        export.export_mrpack(self.game, output, "pack", "1.20.1", "fabric", "0.15.0", lookup=False, version_id="2.1.0")
+        index = mrpack.read_index(output)
+        self.assertEqual(index["versionId"], "2.1.0")
+        self.assertEqual(index["dependencies"], {"minecraft": "1.20.1", "fabric-loader": "0.15.0"})
+
+if __name__ == "__main__":
+    unittest.main()
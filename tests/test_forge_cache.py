@@ -0,0 +1,132 @@
+from os import path
+import os
+import io
+import json
+import zipfile
+import tempfile
+import contextlib
+import unittest
+from unittest import mock
+
+import minecraft_launcher_lib
+
+import forge_cache
+
+MINECRAFT_VERSION = "1.20.1"
+FORGE_VERSION = "47.2.0"
+VERSION_ID = "1.20.1-forge-47.2.0"
+INSTALLER_URL = f"https://maven.minecraftforge.net/net/minecraftforge/forge/1.20.1-47.2.0/{forge_cache.get_installer_name(MINECRAFT_VERSION, FORGE_VERSION)}"
+
+def write_file(file:str, data:bytes):
+    os.makedirs(path.dirname(file), exist_ok=True)
+    with open(file, "wb") as f:
+        f.write(data)
+
+def read_file(file:str)->bytes:
+    with open(file, "rb") as f:
+        return f.read()
+
+class CachedInstallerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.cache = path.join(self.temp.name, "forge_cache")
+        self.downloads = []
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def download_file(self, url:str, file:str, *args, **kwargs)->bool:
+        self.downloads.append(url)
+        write_file(file, f"content of {url}".encode())
+        return True
+
+    def test_installer_is_downloaded_once(self):
+        original = mock.patch.object(minecraft_launcher_lib.forge, "download_file", self.download_file)
+        original.start()
+        self.addCleanup(original.stop)
+
+        with forge_cache.cached_installer(self.cache):
+            for i in range(2):
+                file = path.join(self.temp.name, f"install{i}", "installer.jar")
+                self.assertTrue(minecraft_launcher_lib.forge.download_file(INSTALLER_URL, file))
+                self.assertEqual(read_file(file), f"content of {INSTALLER_URL}".encode())
+
+            # everything else goes straight to the original
+            minecraft_launcher_lib.forge.download_file("https://example.com/library.jar", path.join(self.temp.name, "library.jar"))
+            minecraft_launcher_lib.forge.download_file("https://example.com/library.jar", path.join(self.temp.name, "library.jar"))
+
+        self.assertEqual(self.downloads, [INSTALLER_URL, "https://example.com/library.jar", "https://example.com/library.jar"])
+        self.assertEqual(os.listdir(path.join(self.cache, "installers")), [path.basename(INSTALLER_URL)])
+        self.assertEqual(minecraft_launcher_lib.forge.download_file, self.download_file)
+
+    def test_failed_download_isnt_cached(self):
+        with mock.patch.object(minecraft_launcher_lib.forge, "download_file", lambda url, file, *args, **kwargs: False):
+            with forge_cache.cached_installer(self.cache):
+                self.assertFalse(minecraft_launcher_lib.forge.download_file(INSTALLER_URL, path.join(self.temp.name, "installer.jar")))
+
+        self.assertFalse(path.exists(path.join(self.cache, "installers")))
+
+class BuildTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.minecraft = path.join(self.temp.name, "minecraft")
+
+        patcher = mock.patch.object(forge_cache, "FORGE_CACHE", "")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # an installer with a library in maven/ and a processor output, and what installing it wrote
+        install_profile = {"version": VERSION_ID, "data": {"PATCHED": {"client": f"[net.minecraftforge:forge:{MINECRAFT_VERSION}-{FORGE_VERSION}:client]", "server": ""}}}
+        installer = path.join(forge_cache.get_cache_directory(self.minecraft), "installers", forge_cache.get_installer_name(MINECRAFT_VERSION, FORGE_VERSION))
+        os.makedirs(path.dirname(installer))
+        with zipfile.ZipFile(installer, "w") as zf:
+            zf.writestr("install_profile.json", json.dumps(install_profile))
+            zf.writestr("maven/net/minecraftforge/fmlcore/1.0/fmlcore-1.0.jar", b"fmlcore")
+
+        self.files = {
+            f"versions/{VERSION_ID}/{VERSION_ID}.json": json.dumps({"id": VERSION_ID}).encode(),
+            "libraries/net/minecraftforge/fmlcore/1.0/fmlcore-1.0.jar": b"fmlcore",
+            f"libraries/net/minecraftforge/forge/{MINECRAFT_VERSION}-{FORGE_VERSION}/forge-{MINECRAFT_VERSION}-{FORGE_VERSION}-client.jar": b"patched client",
+            f"libraries/net/minecraftforge/forge/{MINECRAFT_VERSION}-{FORGE_VERSION}/forge-{MINECRAFT_VERSION}-{FORGE_VERSION}-universal.jar": b"universal",
+        }
+        for file, data in self.files.items():
+            write_file(path.join(self.minecraft, *file.split("/")), data)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def remove_files(self):
+        for file in self.files:
+            os.remove(path.join(self.minecraft, *file.split("/")))
+
+    def test_round_trip(self):
+        self.assertTrue(forge_cache.store_build(self.minecraft, MINECRAFT_VERSION, FORGE_VERSION))
+        self.remove_files()
+
+        self.assertEqual(forge_cache.restore_build(self.minecraft, MINECRAFT_VERSION, FORGE_VERSION), VERSION_ID)
+        for file, data in self.files.items():
+            self.assertEqual(read_file(path.join(self.minecraft, *file.split("/"))), data)
+
+    def test_incomplete_install_isnt_stored(self):
+        os.remove(path.join(self.minecraft, "libraries", "net", "minecraftforge", "fmlcore", "1.0", "fmlcore-1.0.jar"))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(forge_cache.store_build(self.minecraft, MINECRAFT_VERSION, FORGE_VERSION))
+        self.assertEqual(forge_cache.restore_build(self.minecraft, MINECRAFT_VERSION, FORGE_VERSION), None)
+
+    def test_corrupted_object_isnt_restored(self):
+        forge_cache.store_build(self.minecraft, MINECRAFT_VERSION, FORGE_VERSION)
+        self.remove_files()
+
+        cache_directory = forge_cache.get_cache_directory(self.minecraft)
+        with open(forge_cache.get_build_file(cache_directory, MINECRAFT_VERSION, FORGE_VERSION), "r") as f:
+            entry = json.load(f)["files"]["libraries/net/minecraftforge/fmlcore/1.0/fmlcore-1.0.jar"]
+        write_file(forge_cache.get_object_path(cache_directory, entry["sha1"]), b"corrupted")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(forge_cache.restore_build(self.minecraft, MINECRAFT_VERSION, FORGE_VERSION), None)
+        # the version doesn't count as installed
+        self.assertFalse(path.exists(path.join(self.minecraft, "versions", VERSION_ID, f"{VERSION_ID}.json")))
+
+if __name__ == "__main__":
+    unittest.main()
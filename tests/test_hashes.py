@@ -0,0 +1,56 @@
+from os import path
+import os
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+import hashes
+
+class HashIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.file = path.join(self.temp.name, "file.jar")
+        with open(self.file, "wb") as f:
+            f.write(b"contents")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_hash_file(self):
+        self.assertEqual(hashes.hash_file(self.file, ["sha1", "sha512"]), {"sha1": hashlib.sha1(b"contents").hexdigest(), "sha512": hashlib.sha512(b"contents").hexdigest()})
+
+    def test_unchanged_file_is_read_once(self):
+        hash_index = hashes.HashIndex()
+
+        with mock.patch.object(hashes, "sha1_file", wraps=hashes.sha1_file) as sha1_file:
+            self.assertEqual(hash_index.sha1(self.file), hashlib.sha1(b"contents").hexdigest())
+            self.assertEqual(hash_index.sha1(self.file), hashlib.sha1(b"contents").hexdigest())
+            self.assertEqual(sha1_file.call_count, 1)
+
+            with open(self.file, "wb") as f:
+                f.write(b"changed contents")
+            self.assertEqual(hash_index.sha1(self.file), hashlib.sha1(b"changed contents").hexdigest())
+            self.assertEqual(sha1_file.call_count, 2)
+
+    def test_saved_index_drops_deleted_files(self):
+        hash_index = hashes.get_index(self.temp.name)
+        self.assertIs(hashes.get_index(self.temp.name), hash_index)
+
+        other = path.join(self.temp.name, "other.jar")
+        with open(other, "wb") as f:
+            f.write(b"other")
+        hash_index.sha1(self.file)
+        hash_index.sha1(other)
+        os.remove(other)
+        hash_index.save()
+
+        reloaded = hashes.HashIndex(path.join(self.temp.name, hashes.INDEX_FILE))
+        self.assertEqual(list(reloaded._entries), [path.abspath(self.file)])
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(OSError):
+            hashes.HashIndex().sha1(path.join(self.temp.name, "missing.jar"))
+
+if __name__ == "__main__":
+    unittest.main()
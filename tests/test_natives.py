@@ -0,0 +1,72 @@
+from os import path
+import os
+import stat
+import zipfile
+import tempfile
+import unittest
+from unittest import mock
+
+import natives
+
+def native_jar(name:str)->dict:
+    return {"path": f"/libraries/org/lwjgl/lwjgl/3.3.1/{name}.jar", "natives": True, "flatten": True}
+
+class FilterMachineTest(unittest.TestCase):
+    def setUp(self):
+        self.files = [
+            native_jar("lwjgl-3.3.1-natives-linux"),
+            native_jar("lwjgl-3.3.1-natives-linux-arm64"),
+            # only shipped without a suffix
+            native_jar("lwjgl-openal-3.3.1-natives-linux"),
+        ]
+
+    def names(self, machine:str)->list[str]:
+        with mock.patch.object(natives, "get_machine", return_value=machine):
+            return [path.basename(f["path"]) for f in natives.filter_machine(self.files)]
+
+    def test_x64_uses_the_unsuffixed_jars(self):
+        self.assertEqual(self.names("x64"), ["lwjgl-3.3.1-natives-linux.jar", "lwjgl-openal-3.3.1-natives-linux.jar"])
+
+    def test_arm64_prefers_its_own_jars_and_keeps_the_only_ones(self):
+        self.assertEqual(self.names("arm64"), ["lwjgl-3.3.1-natives-linux-arm64.jar", "lwjgl-openal-3.3.1-natives-linux.jar"])
+
+class ExtractDirectoryTest(unittest.TestCase):
+    def test_extract_properties_are_redirected(self):
+        command = ["java", "-Djava.library.path=/natives/key", "-Djna.tmpdir=/natives/key", "-Dorg.lwjgl.system.SharedLibraryExtractPath=/natives/key", "-Dio.netty.native.workdir=/natives/key", "net.minecraft.client.main.Main"]
+
+        natives.set_extract_directory(command, "/tmp/launch")
+
+        self.assertEqual(command, ["java", "-Djava.library.path=/natives/key", "-Djna.tmpdir=/tmp/launch", "-Dorg.lwjgl.system.SharedLibraryExtractPath=/tmp/launch", "-Dio.netty.native.workdir=/tmp/launch", "net.minecraft.client.main.Main"])
+
+class ReadOnlyTest(unittest.TestCase):
+    def test_directory_and_files_are_read_only_and_removable(self):
+        with tempfile.TemporaryDirectory() as temp:
+            directory = path.join(temp, "natives")
+            os.makedirs(path.join(directory, "sub"))
+            with open(path.join(directory, "sub", "liblwjgl.so"), "wb") as f:
+                f.write(b"so")
+
+            natives.make_read_only(directory)
+            self.assertFalse(os.stat(directory).st_mode & stat.S_IWUSR)
+            self.assertFalse(os.stat(path.join(directory, "sub")).st_mode & stat.S_IWUSR)
+            self.assertFalse(os.stat(path.join(directory, "sub", "liblwjgl.so")).st_mode & stat.S_IWUSR)
+
+            natives.remove_directory(directory)
+            self.assertFalse(path.exists(directory))
+
+class ExtractNativesTest(unittest.TestCase):
+    def test_flattened_natives_are_extracted(self):
+        with tempfile.TemporaryDirectory() as temp:
+            jar = path.join(temp, "lwjgl-natives-linux.jar")
+            with zipfile.ZipFile(jar, "w") as zf:
+                zf.writestr("linux/x64/org/lwjgl/liblwjgl.so", b"native")
+                zf.writestr("META-INF/MANIFEST.MF", b"manifest")
+
+            output = path.join(temp, "output")
+            manifest = natives.extract_natives([{"path": jar, "flatten": True}], output)
+
+            self.assertEqual(list(manifest), ["liblwjgl.so"])
+            self.assertTrue(path.exists(path.join(output, "liblwjgl.so")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+from os import path
+import os
+import io
+import json
+import contextlib
+import hashlib
+import tempfile
+import unittest
+
+import hashes
+import prefetch
+import wrapper
+from standin import StandInServer, synthetic_bytes
+
+class IsOutdatedTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.data = b"library contents"
+        self.file = {"path": path.join(self.temp.name, "lib.jar"), "sha1": hashlib.sha1(self.data).hexdigest(), "size": len(self.data)}
+        with open(self.file["path"], "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_matching_file_is_current(self):
+        self.assertFalse(prefetch.is_outdated(self.file, hashes.HashIndex()))
+
+    def test_missing_file_is_outdated(self):
+        os.remove(self.file["path"])
+        self.assertTrue(prefetch.is_outdated(self.file, hashes.HashIndex()))
+
+    def test_corrupted_file_of_the_same_size_is_outdated(self):
+        with open(self.file["path"], "wb") as f:
+            f.write(b"x" * len(self.data))
+        self.assertTrue(prefetch.is_outdated(self.file, hashes.HashIndex()))
+
+    def test_unchanged_file_is_not_hashed_again(self):
+        hash_index = hashes.HashIndex(path.join(self.temp.name, hashes.INDEX_FILE))
+        prefetch.is_outdated(self.file, hash_index)
+        hash_index.save()
+        stat = os.stat(self.file["path"])
+        reloaded = hashes.HashIndex(hash_index.index_file)
+        self.assertEqual(reloaded._entries[path.abspath(self.file["path"])], [stat.st_size, stat.st_mtime_ns, self.file["sha1"]])
+
+        # a stale hash for the same size and mtime is trusted, the file isn't read again
+        reloaded._entries[path.abspath(self.file["path"])][2] = "0" * 40
+        self.assertTrue(prefetch.is_outdated(self.file, reloaded))
+
+class FakeWrapper:
+    def __init__(self, installed:list[str]) -> None:
+        self.installed = installed
+
+    def is_installed(self, version:str|None)->bool:
+        return version in self.installed
+
+class FakeLauncher:
+    # a profile per version, prefetch only needs these
+    def __init__(self, directory:str, versions:list[str], installed:list[str]) -> None:
+        self.MINECRAFT_DIRECTORY = directory
+        self.versions = versions
+        self._wrapper = FakeWrapper(installed)
+        self.install_callbacks = []
+
+    def get_profiles(self)->list[str]:
+        return self.versions
+
+    def get_profile(self, profile:str)->dict:
+        return {"profile_name": profile, "profile_version": profile}
+
+    def install_version(self, version_id:str, priority:int, callback:dict|None=None)->str:
+        self.install_callbacks.append(callback)
+        return version_id
+
+class PrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.minecraft_directory = self.temp.name
+
+        self.standin = StandInServer()
+        self.standin.start()
+
+        # the corrupt library is served with other contents of the same size
+        self.good = synthetic_bytes("good", 2048)
+        libraries = [
+            self.add_library("good", self.good, self.good),
+            self.add_library("corrupt", synthetic_bytes("corrupt", 2048), synthetic_bytes("wrong", 2048)),
+        ]
+
+        version_directory = path.join(self.minecraft_directory, "versions", "1.20.1")
+        os.makedirs(version_directory)
+        with open(path.join(version_directory, "1.20.1.json"), "w") as f:
+            f.write(json.dumps({"id": "1.20.1", "libraries": libraries}))
+
+        self.launcher = FakeLauncher(self.minecraft_directory, ["1.20.1"], ["1.20.1"])
+
+    def tearDown(self):
+        self.standin.stop()
+        self.temp.cleanup()
+
+    def add_library(self, name:str, expected:bytes, served:bytes)->dict:
+        maven_path = f"org/example/{name}/1.0/{name}-1.0.jar"
+        url = self.standin.add(f"/libraries/{maven_path}", served)
+        return {"name": f"org.example:{name}:1.0", "downloads": {"artifact": {"path": maven_path, "url": url, "sha1": hashlib.sha1(expected).hexdigest(), "size": len(expected)}}}
+
+    def library(self, name:str)->str:
+        return path.join(self.minecraft_directory, "libraries", "org", "example", name, "1.0", f"{name}-1.0.jar")
+
+    def test_corrupt_download_is_reported_and_not_installed(self):
+        failed = prefetch.prefetch(self.launcher)
+
+        self.assertEqual([path.basename(file["path"]) for file in failed], ["corrupt-1.0.jar"])
+        with open(self.library("good"), "rb") as f:
+            self.assertEqual(f.read(), self.good)
+        self.assertEqual(os.listdir(path.dirname(self.library("corrupt"))), [])
+
+        # the good library is current now, only the corrupt one is tried again
+        self.assertEqual([path.basename(file["path"]) for file in prefetch.prefetch(self.launcher)], ["corrupt-1.0.jar"])
+        self.assertEqual(self.standin.route_requests["/libraries/org/example/good/1.0/good-1.0.jar"], 1)
+
+    def test_quiet_prefetch_only_prints_the_summary(self):
+        self.launcher.versions.append("1.19.4")
+        output = io.StringIO()
+
+        with contextlib.redirect_stdout(output):
+            prefetch.prefetch(self.launcher, quiet=True)
+
+        self.assertEqual(output.getvalue(), "1 of 2 files couldn't be prefetched, they are tried again next time.\n")
+        self.assertEqual(self.launcher.install_callbacks, [wrapper.SILENT_CALLBACK])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+from os import path
+import os
+import json
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import mrpack
+import provision
+from standin import StandInServer, create_mrpack
+
+class FakeWrapper:
+    def __init__(self) -> None:
+        self.installed = set()
+
+    def is_installed(self, version:str|None)->bool:
+        return version in self.installed
+
+class FakeLauncher:
+    # installs versions instantly, provisioning only needs these
+    def __init__(self, directory:str) -> None:
+        self.MINECRAFT_DIRECTORY = directory
+        self.PROFILES_DIRECTORY = path.join(directory, "profiles")
+        self._wrapper = FakeWrapper()
+
+    def install_version(self, version:str)->str:
+        self._wrapper.installed.add(version)
+        return version
+
+    def download_version(self, version:str)->str:
+        return self.install_version(version)
+
+class ApplyManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.launcher = FakeLauncher(self.temp.name)
+
+        self.standin = StandInServer()
+        self.standin.start()
+
+        self.pack = path.join(self.temp.name, "pack.mrpack")
+        create_mrpack(self.standin, self.pack, "1.20.1", mod_count=5, override_count=3, mod_size=1024)
+
+        self.manifest = path.join(self.temp.name, "manifest.json")
+        with open(self.manifest, "w") as f:
+            f.write(json.dumps({"profiles": [{"name": "one", "mrpack": "pack.mrpack"}, {"name": "two", "mrpack": "pack.mrpack"}, {"name": "vanilla", "version": "1.20.1"}]}))
+
+    def tearDown(self):
+        self.standin.stop()
+        self.temp.cleanup()
+
+    def read_profile(self, name:str)->dict:
+        return provision.read_profile(path.join(self.launcher.PROFILES_DIRECTORY, name))
+
+    def test_files_are_downloaded_once_and_unchanged_profiles_skipped(self):
+        result = provision.apply_manifest(self.launcher, self.manifest)
+
+        self.assertEqual(sorted(result["created"]), ["one", "two", "vanilla"])
+        self.assertEqual(self.standin.requests_served, 5)
+        self.assertEqual(len(os.listdir(path.join(self.launcher.PROFILES_DIRECTORY, "two", "game", "mods"))), 5)
+        # exported again as the version of the pack
+        self.assertEqual(self.read_profile("one")["pack_version"], "1.0.0")
+        self.assertNotIn("pack_version", self.read_profile("vanilla"))
+
+        result = provision.apply_manifest(self.launcher, self.manifest)
+        self.assertEqual(sorted(result["skipped"]), ["one", "two", "vanilla"])
+        self.assertEqual(self.standin.requests_served, 5)
+
+    def test_failed_download_fails_its_profiles(self):
+        route = "/cdn/data/2/mod2.jar"
+        original = self.standin.routes[route]
+        self.standin.routes[route] = b"corrupted"
+
+        result = provision.apply_manifest(self.launcher, self.manifest)
+
+        self.assertEqual(sorted(result["failed"]), ["one", "two"])
+        self.assertEqual(result["created"], ["vanilla"])
+        self.assertNotIn("source", self.read_profile("one"))
+
+        # the next apply retries the failed profiles instead of skipping them
+        self.standin.routes[route] = original
+        result = provision.apply_manifest(self.launcher, self.manifest)
+
+        self.assertEqual(sorted(result["created"]), ["one", "two"])
+        self.assertEqual(result["skipped"], ["vanilla"])
+
+    def test_unreachable_file_fails_its_profiles(self):
+        del self.standin.routes["/cdn/data/0/mod0.jar"]
+
+        result = provision.apply_manifest(self.launcher, self.manifest)
+
+        self.assertEqual(sorted(result["failed"]), ["one", "two"])
+
+class ExtractOverridesTest(unittest.TestCase):
+    def test_hardlinked_file_of_another_profile_is_left_alone(self):
+        with tempfile.TemporaryDirectory() as temp, StandInServer() as standin:
+            pack = path.join(temp, "pack.mrpack")
+            create_mrpack(standin, pack, "1.20.1", mod_count=0, override_count=1)
+
+            other = path.join(temp, "other", "config", "mod0", "option0.json")
+            os.makedirs(path.dirname(other))
+            with open(other, "wb") as f:
+                f.write(b"other profile")
+            game_directory = path.join(temp, "game")
+            os.makedirs(path.join(game_directory, "config", "mod0"))
+            os.link(other, path.join(game_directory, "config", "mod0", "option0.json"))
+
+            mrpack.extract_overrides(pack, game_directory)
+
+            with open(other, "rb") as f:
+                self.assertEqual(f.read(), b"other profile")
+
+    def test_install_mrpack_streams_the_overrides(self):
+        with tempfile.TemporaryDirectory() as temp, StandInServer() as standin:
+            pack = path.join(temp, "pack.mrpack")
+            create_mrpack(standin, pack, "1.20.1", mod_count=2, override_count=3, mod_size=1024)
+            game_directory = path.join(temp, "game")
+
+            # the pack is never unzipped as a whole
+            with mock.patch.object(zipfile.ZipFile, "extractall", side_effect=AssertionError("extractall")):
+                version = mrpack.install_mrpack(pack, game_directory)
+
+            self.assertEqual(version, ("1.20.1", ("fabric", "0.1.0")))
+            self.assertEqual(sorted(os.listdir(path.join(game_directory, "mods"))), ["mod0.jar", "mod1.jar"])
+            self.assertEqual(sorted(os.listdir(path.join(game_directory, "config"))), ["mod0", "mod1", "mod2"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+from os import path
+import os
+import asyncio
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+import aiohttp
+import requests
+
+import retry
+import scheduler
+import networkutils
+from standin import StandInServer, synthetic_bytes
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.standin = StandInServer()
+        self.standin.start()
+        self.data = synthetic_bytes("file", 256 * 1024)
+        self.url = self.standin.add("file", self.data)
+
+        # short waits, a stalled transfer times out after a second
+        timeouts = (retry.CONNECT_TIMEOUT, retry.READ_TIMEOUT, retry.TIMEOUT, retry.CACHE_TIMEOUT)
+        self.addCleanup(self.restore_timeouts, timeouts)
+        retry.set_timeouts(1, 1)
+        patcher = mock.patch.object(retry, "BASE_DELAY", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.standin.stop()
+        self.temp.cleanup()
+
+    def restore_timeouts(self, timeouts:tuple):
+        retry.CONNECT_TIMEOUT, retry.READ_TIMEOUT, retry.TIMEOUT, retry.CACHE_TIMEOUT = timeouts
+
+    def test_recovers_from_faults(self):
+        for kind in ["status", "reset", "stall"]:
+            with self.subTest(kind=kind):
+                self.standin.add_fault(kind, "/file", count=1, delay=3)
+                self.assertEqual(networkutils.get_file_bytes(self.url), self.data)
+
+        self.assertEqual(self.standin.faults_injected, 3)
+        self.assertEqual(self.standin.route_requests["/file"], 6)
+
+    def test_retry_after(self):
+        self.standin.add_fault("status", "/file", count=1, status=503, retry_after=2)
+
+        with mock.patch.object(retry, "time") as time:
+            self.assertEqual(networkutils.get_file_bytes(self.url), self.data)
+
+        time.sleep.assert_called_once_with(2.0)
+
+    def test_persistent_server_error_exhausts_retries(self):
+        self.standin.add_fault("status", "/file", status=500)
+
+        with self.assertRaises(retry.RetryableStatus):
+            networkutils.get_file_bytes(self.url)
+
+        self.assertEqual(self.standin.route_requests["/file"], retry.MAX_ATTEMPTS)
+        # the first server error halves the host, the others are inside the cooldown
+        self.assertEqual(scheduler.get_scheduler().get_host_limit(self.url), scheduler.HOST_INITIAL_CONCURRENCY // 2)
+
+    def test_no_part_files(self):
+        file = path.join(self.temp.name, "stalled", "file")
+        self.standin.add_fault("stall", "/file", count=1, delay=3)
+        networkutils.download_file(self.url, file)
+
+        with open(file, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+        failed = path.join(self.temp.name, "failed", "file")
+        self.standin.add_fault("status", "/file")
+        with self.assertRaises(retry.RetryableStatus):
+            networkutils.download_file(self.url, failed)
+
+        self.assertEqual(sorted(os.listdir(path.join(self.temp.name, "stalled"))), ["file"])
+        self.assertEqual(os.listdir(path.join(self.temp.name, "failed")), [])
+
+    def test_error_status_is_never_content(self):
+        missing = self.standin.url + "/missing.jar"
+        file = path.join(self.temp.name, "missing", "missing.jar")
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            networkutils.download_file(missing, file, sha1="0" * 40)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            networkutils.get_file_bytes(missing)
+        with self.assertRaises(aiohttp.ClientResponseError):
+            asyncio.run(networkutils.get_file_bytes_async(missing))
+
+        self.assertEqual(os.listdir(path.dirname(file)), [])
+        # a 404 isn't worth retrying
+        self.assertEqual(self.standin.route_requests["/missing.jar"], 3)
+
+    def test_hash_mismatch_isnt_installed(self):
+        file = path.join(self.temp.name, "mismatch", "file")
+
+        with self.assertRaises(networkutils.HashMismatch):
+            networkutils.download_file(self.url, file, sha1="0" * 40)
+
+        self.assertEqual(os.listdir(path.dirname(file)), [])
+        networkutils.download_file(self.url, file, sha1=hashlib.sha1(self.data).hexdigest())
+        self.assertTrue(path.exists(file))
+
+    def test_empty_body_fails(self):
+        empty = self.standin.add("empty", b"")
+
+        with self.assertRaises(networkutils.EmptyResponse):
+            networkutils.get_file_bytes(empty)
+        with self.assertRaises(networkutils.EmptyResponse):
+            asyncio.run(networkutils.get_file_bytes_async(empty))
+        with self.assertRaises(networkutils.EmptyResponse):
+            networkutils.download_file(empty, path.join(self.temp.name, "empty"))
+        self.assertFalse(path.exists(path.join(self.temp.name, "empty.part")))
+
+    def test_empty_download_fails(self):
+        files = [
+            {"url": self.url, "path": path.join(self.temp.name, "file")},
+            {"url": self.standin.add("empty", b""), "path": path.join(self.temp.name, "empty")},
+        ]
+
+        failed = asyncio.run(networkutils.download_files_async(files))
+
+        self.assertEqual(failed, files[1:])
+        self.assertTrue(path.exists(files[0]["path"]))
+        self.assertFalse(path.exists(files[1]["path"]))
+        with self.assertRaises(networkutils.EmptyResponse):
+            asyncio.run(networkutils.download_file_async(files[1]["url"], files[1]["path"]))
+
+    def test_routed_requests_take_a_host_slot(self):
+        download_scheduler = scheduler.DownloadScheduler()
+        self.standin.add_fault("status", "/file", count=1, status=429)
+
+        with download_scheduler.routed():
+            self.assertEqual(requests.get(self.url).content, self.data)
+            with requests.get(self.url, stream=True) as response:
+                self.assertEqual(response.raw.read(), self.data)
+            self.assertEqual(requests.get(self.standin.url + "/missing").status_code, 404)
+
+        limiter = download_scheduler._hosts[scheduler.get_host(self.url)]
+        self.assertEqual(limiter.active, 0)
+        self.assertEqual(limiter.limit, scheduler.HOST_INITIAL_CONCURRENCY // 2)
+
+class HostLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = 100.0
+        patcher = mock.patch.object(scheduler, "time")
+        patcher.start().monotonic.side_effect = lambda: self.clock
+        self.addCleanup(patcher.stop)
+
+    def run_window(self, limiter:scheduler.HostLimiter, nbytes:int, transfers:int|None=None):
+        # one second with transfers running at once, limit of them finishing
+        for i in range(transfers or limiter.limit):
+            limiter.acquire()
+        limiter.add_bytes(nbytes)
+        self.clock += 1
+        for i in range(limiter.limit):
+            limiter.active -= 1
+            limiter.success()
+
+    def test_grows_while_throughput_improves(self):
+        limiter = scheduler.HostLimiter(limit=2, maximum=4)
+
+        self.run_window(limiter, 100)
+        self.assertEqual(limiter.limit, 3)
+        self.run_window(limiter, 200)
+        self.assertEqual(limiter.limit, 4)
+        self.run_window(limiter, 300)
+        self.assertEqual(limiter.limit, 4)
+        self.run_window(limiter, 100)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_unsaturated_limit_doesnt_grow(self):
+        limiter = scheduler.HostLimiter(limit=4)
+
+        self.run_window(limiter, 100, transfers=1)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_halves_on_overload(self):
+        download_scheduler = scheduler.DownloadScheduler()
+        host = "example.com"
+        for i in range(4):
+            download_scheduler._enter(scheduler.PRIORITY_NORMAL, host)
+
+        download_scheduler._leave(scheduler.PRIORITY_NORMAL, host, retry.RetryableStatus("https://example.com/", 429))
+        self.assertEqual(download_scheduler._hosts[host].limit, scheduler.HOST_INITIAL_CONCURRENCY // 2)
+
+        # inside the cooldown
+        download_scheduler._leave(scheduler.PRIORITY_NORMAL, host, retry.RetryableStatus("https://example.com/", 503))
+        self.assertEqual(download_scheduler._hosts[host].limit, scheduler.HOST_INITIAL_CONCURRENCY // 2)
+
+        self.clock += scheduler.OVERLOAD_COOLDOWN
+        download_scheduler._leave(scheduler.PRIORITY_NORMAL, host, retry.RetryableStatus("https://example.com/", 502))
+        self.assertEqual(download_scheduler._hosts[host].limit, scheduler.HOST_INITIAL_CONCURRENCY // 4)
+
+        download_scheduler._leave(scheduler.PRIORITY_NORMAL, host, requests.exceptions.ConnectionError())
+        self.assertEqual(download_scheduler._hosts[host].limit, scheduler.HOST_INITIAL_CONCURRENCY // 4)
+
+    def test_server_errors_are_overload(self):
+        for status in [429, 500, 502, 503, 504]:
+            self.assertTrue(retry.is_overload(retry.RetryableStatus("https://example.com/", status)))
+        self.assertFalse(retry.is_overload(retry.RetryableStatus("https://example.com/", 408)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import io
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import scheduler
+import wrapper
+
+class PausedBackgroundTest(unittest.TestCase):
+    def test_paused_background_job_lends_its_slot(self):
+        download_scheduler = scheduler.DownloadScheduler(max_concurrent=1)
+        url = "https://example.com/file"
+
+        with download_scheduler.job(url, scheduler.PRIORITY_BACKGROUND):
+            download_scheduler.pause_background()
+            background = threading.Thread(target=download_scheduler.throttle, args=(url, 1, scheduler.PRIORITY_BACKGROUND))
+            background.start()
+
+            # the only slot belongs to the paused background job, normal work still gets to run
+            entered = threading.Event()
+
+            def normal():
+                with download_scheduler.job(url, scheduler.PRIORITY_NORMAL):
+                    entered.set()
+
+            threading.Thread(target=normal, daemon=True).start()
+            self.assertTrue(entered.wait(2))
+
+            download_scheduler.resume_background()
+            background.join(2)
+            self.assertFalse(background.is_alive())
+
+        self.assertEqual(download_scheduler._yielding, 0)
+        self.assertEqual(download_scheduler._hosts["example.com"].yielding, 0)
+        self.assertEqual(download_scheduler._hosts["example.com"].active, 0)
+
+class RunGameTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.wrapper = wrapper.Wrapper("test", "1.0", self.temp.name)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_background_is_paused_until_the_main_menu(self):
+        download_scheduler = scheduler.DownloadScheduler()
+        paused = []
+
+        class Output(io.StringIO):
+            def write(self, line:str)->int:
+                paused.append((line.strip(), download_scheduler.is_paused()))
+                return len(line)
+
+        script = f"print('loading'); print('{wrapper.MAIN_MENU_MARKERS[0]}'); print('playing')"
+        with mock.patch.object(wrapper, "get_scheduler", lambda: download_scheduler), mock.patch.object(wrapper.sys, "stdout", Output()):
+            startup = self.wrapper.run_game([sys.executable, "-c", script], self.temp.name, "1.20.1")
+
+        self.assertEqual([p for p in paused if p[0] in ["loading", "playing"]], [("loading", True), ("playing", False)])
+        self.assertNotEqual(startup, None)
+        self.assertFalse(download_scheduler.is_paused())
+
+if __name__ == "__main__":
+    unittest.main()
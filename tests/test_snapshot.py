@@ -0,0 +1,104 @@
+from os import path
+import os
+import io
+import random
+import contextlib
+import tempfile
+import unittest
+from unittest import mock
+
+import snapshot
+
+def write_file(file:str, data:bytes):
+    os.makedirs(path.dirname(file), exist_ok=True)
+    with open(file, "wb") as f:
+        f.write(data)
+
+def read_tree(directory:str)->dict[str, bytes]:
+    tree = {}
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            with open(path.join(root, file), "rb") as f:
+                tree[path.relpath(path.join(root, file), directory).replace(os.sep, "/")] = f.read()
+
+    return tree
+
+def count_chunks(snapshots_directory:str)->int:
+    return sum(len(files) for root, dirs, files in os.walk(path.join(snapshots_directory, "chunks")))
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.snapshots = path.join(self.temp.name, "snapshots")
+        self.game = path.join(self.temp.name, "game")
+
+        # a region file of three chunks, only the last one compresses
+        self.region = random.Random(0).randbytes(2 * snapshot.CHUNK_SIZE) + b"\0" * snapshot.CHUNK_SIZE
+        write_file(path.join(self.game, "saves", "world", "region", "r.0.0.mca"), self.region)
+        write_file(path.join(self.game, "config", "mod.toml"), b"setting = 1")
+        write_file(path.join(self.game, "logs", "latest.log"), b"log")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_round_trip(self):
+        expected = read_tree(self.game)
+        del expected["logs/latest.log"]
+
+        snapshot_id, result = snapshot.create_snapshot(self.snapshots, "profile", self.game)
+        self.assertEqual(result, {"files": 2, "stored": 2})
+        self.assertEqual(snapshot.get_snapshots(self.snapshots, "profile"), [snapshot_id])
+
+        write_file(path.join(self.game, "config", "mod.toml"), b"setting = 2")
+        os.remove(path.join(self.game, "saves", "world", "region", "r.0.0.mca"))
+
+        self.assertEqual(snapshot.restore_snapshot(self.snapshots, "profile", self.game), {"restored": 2, "removed": 0})
+        restored = read_tree(self.game)
+        del restored["logs/latest.log"]
+        self.assertEqual(restored, expected)
+
+    def test_unchanged_files_reuse_their_chunks(self):
+        snapshot.create_snapshot(self.snapshots, "profile", self.game)
+        chunks = count_chunks(self.snapshots)
+
+        with mock.patch.object(snapshot, "store_file", wraps=snapshot.store_file) as store_file:
+            snapshot_id, result = snapshot.create_snapshot(self.snapshots, "profile", self.game)
+        self.assertEqual(result["stored"], 0)
+        store_file.assert_not_called()
+
+        # one changed megabyte of the region file is one new chunk
+        region = bytearray(self.region)
+        region[:4] = b"edit"
+        write_file(path.join(self.game, "saves", "world", "region", "r.0.0.mca"), bytes(region))
+        snapshot_id, result = snapshot.create_snapshot(self.snapshots, "profile", self.game)
+        self.assertEqual(result["stored"], 1)
+        self.assertEqual(count_chunks(self.snapshots), chunks + 1)
+
+    def test_restore_removes_extra_files(self):
+        snapshot_id, result = snapshot.create_snapshot(self.snapshots, "profile", self.game)
+        write_file(path.join(self.game, "saves", "world", "region", "r.0.1.mca"), b"new region")
+
+        self.assertEqual(snapshot.restore_snapshot(self.snapshots, "profile", self.game, snapshot_id), {"restored": 0, "removed": 1})
+        self.assertFalse(path.exists(path.join(self.game, "saves", "world", "region", "r.0.1.mca")))
+        # excluded directories aren't part of the snapshot and stay
+        self.assertTrue(path.exists(path.join(self.game, "logs", "latest.log")))
+
+    def test_deleting_a_snapshot_prunes_its_chunks(self):
+        first, result = snapshot.create_snapshot(self.snapshots, "profile", self.game)
+        write_file(path.join(self.game, "config", "mod.toml"), b"setting = 2")
+        second, result = snapshot.create_snapshot(self.snapshots, "profile", self.game)
+        self.assertEqual(count_chunks(self.snapshots), 5)
+
+        # recent chunks could belong to a snapshot being created
+        self.assertEqual(snapshot.delete_snapshot(self.snapshots, "profile", first), {"pruned": 0})
+
+        with mock.patch.object(snapshot, "PRUNE_MIN_AGE", -1):
+            self.assertEqual(snapshot.prune_chunks(self.snapshots), 1)
+        self.assertEqual(snapshot.get_snapshots(self.snapshots, "profile"), [second])
+        self.assertEqual(snapshot.restore_snapshot(self.snapshots, "profile", self.game), {"restored": 0, "removed": 0})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(snapshot.delete_snapshot(self.snapshots, "profile", first), None)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+from os import path
+import os
+import json
+import tempfile
+import unittest
+
+import storage
+
+def write_version(minecraft_directory:str, data:dict):
+    version_directory = path.join(minecraft_directory, "versions", data["id"])
+    os.makedirs(version_directory, exist_ok=True)
+    with open(path.join(version_directory, f"{data['id']}.json"), "w") as f:
+        f.write(json.dumps(data))
+
+def write_library(minecraft_directory:str, relative:str)->str:
+    file = path.join(minecraft_directory, "libraries", *relative.split("/"))
+    os.makedirs(path.dirname(file), exist_ok=True)
+    with open(file, "wb") as f:
+        f.write(b"jar")
+    return file
+
+class CollectGarbageTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.minecraft_directory = self.temp.name
+
+        library = {"name": "com.example:lib:1.0", "downloads": {"artifact": {"path": "com/example/lib/1.0/lib-1.0.jar", "url": "https://libraries.minecraft.net/com/example/lib/1.0/lib-1.0.jar"}}}
+        write_version(self.minecraft_directory, {"id": "1.20.1", "libraries": [library]})
+        write_version(self.minecraft_directory, {"id": "fabric-loader-0.15.0-1.20.1", "inheritsFrom": "1.20.1", "libraries": []})
+        write_version(self.minecraft_directory, {"id": "1.19.4", "libraries": []})
+
+        self.used_library = write_library(self.minecraft_directory, "com/example/lib/1.0/lib-1.0.jar")
+        self.unused_library = write_library(self.minecraft_directory, "com/example/old/1.0/old-1.0.jar")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_unreachable_files_are_collected(self):
+        items = storage.collect_garbage(self.minecraft_directory, ["fabric-loader-0.15.0-1.20.1"])
+
+        self.assertEqual(sorted(item["kind"] for item in items), ["library", "version"])
+        self.assertTrue(path.exists(self.used_library))
+        self.assertFalse(path.exists(self.unused_library))
+        self.assertTrue(path.isdir(path.join(self.minecraft_directory, "versions", "1.20.1")))
+        self.assertFalse(path.isdir(path.join(self.minecraft_directory, "versions", "1.19.4")))
+
+    def test_missing_inherited_version_keeps_everything(self):
+        os.remove(path.join(self.minecraft_directory, "versions", "1.20.1", "1.20.1.json"))
+
+        self.assertEqual(storage.collect_garbage(self.minecraft_directory, ["fabric-loader-0.15.0-1.20.1"]), None)
+        self.assertTrue(path.exists(self.used_library))
+        self.assertTrue(path.exists(self.unused_library))
+        self.assertTrue(path.isdir(path.join(self.minecraft_directory, "versions", "1.19.4")))
+
+    def test_unreadable_version_keeps_everything(self):
+        with open(path.join(self.minecraft_directory, "versions", "1.20.1", "1.20.1.json"), "w") as f:
+            f.write("{")
+
+        self.assertEqual(storage.collect_garbage(self.minecraft_directory, ["1.20.1"], dry_run=True), None)
+
+if __name__ == "__main__":
+    unittest.main()
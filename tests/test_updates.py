@@ -0,0 +1,66 @@
+from os import path
+import os
+import json
+import hashlib
+import zipfile
+import tempfile
+import unittest
+
+import hashes
+import updates
+from standin import StandInServer, add_modrinth_api, create_mod_versions
+
+class UpdatePlanTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.profile_path = path.join(self.temp.name, "profiles", "profile")
+        self.mods_directory = path.join(self.profile_path, "game", "mods")
+
+        self.standin = StandInServer()
+        self.standin.start()
+
+        # mod0 has a newer version, mod1 and mod2 are current
+        self.versions = create_mod_versions(self.standin, self.mods_directory, mod_count=3, outdated=1)
+        with zipfile.ZipFile(path.join(self.mods_directory, "unknown.jar"), "w") as jar:
+            jar.writestr("fabric.mod.json", json.dumps({"id": "unknown", "name": "Unknown", "version": "1.0.0"}))
+
+        updates.set_modrinth_api(add_modrinth_api(self.standin, self.versions))
+
+    def tearDown(self):
+        updates.set_modrinth_api(None)
+        self.standin.stop()
+        self.temp.cleanup()
+
+    def test_plan(self):
+        plan = updates.get_update_plan(self.profile_path, "1.20.1", "fabric")
+
+        self.assertEqual([(u["file"], u["version"], u["new_version"], u["filename"]) for u in plan["updates"]], [("mod0.jar", "1.0.0", "2.0.0", "mod0-2.0.0.jar")])
+        self.assertEqual(plan["up_to_date"], ["mod1.jar", "mod2.jar"])
+        self.assertEqual(plan["unknown"], ["unknown.jar"])
+
+    def test_one_batched_lookup(self):
+        updates.get_update_plan(self.profile_path, "1.20.1", "fabric")
+
+        self.assertEqual(self.standin.route_requests, {"/modrinth/v2/version_files/update": 1})
+
+    def test_apply_replaces_the_outdated_jar(self):
+        plan = updates.get_update_plan(self.profile_path, "1.20.1", "fabric")
+        updates.apply_update_plan(self.profile_path, plan)
+
+        self.assertEqual(sorted(os.listdir(self.mods_directory)), ["mod0-2.0.0.jar", "mod1.jar", "mod2.jar", "unknown.jar"])
+        self.assertEqual(hashes.sha1_file(path.join(self.mods_directory, "mod0-2.0.0.jar")), plan["updates"][0]["sha1"])
+
+        # the next check finds nothing left to update
+        self.assertEqual(updates.get_update_plan(self.profile_path, "1.20.1", "fabric")["updates"], [])
+
+    def test_hash_mismatch_keeps_the_old_jar(self):
+        plan = updates.get_update_plan(self.profile_path, "1.20.1", "fabric")
+        plan["updates"][0]["sha1"] = hashlib.sha1(b"something else").hexdigest()
+
+        updates.apply_update_plan(self.profile_path, plan)
+
+        self.assertTrue(path.exists(path.join(self.mods_directory, "mod0.jar")))
+        self.assertFalse(path.exists(path.join(self.mods_directory, "mod0-2.0.0.jar")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import contextlib
+import io
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+import retry
+import wrapper
+from standin import StandInServer, add_catalogs
+
+class CatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.wrapper = wrapper.Wrapper("test", "1.0", self.temp.name)
+        self.fetches = 0
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def fail_fetch(self):
+        self.fetches += 1
+        raise requests.exceptions.ConnectionError("unreachable")
+
+    def test_failed_fetch_is_cached(self):
+        self.wrapper.fetch_quilt_versions = self.fail_fetch
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.wrapper.QUILT_VERSIONS, [])
+            self.assertEqual(self.wrapper.QUILT_LOADER_VERSIONS, [])
+
+        self.assertEqual(self.fetches, 1)
+
+    def test_empty_catalog_is_not_shared(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.wrapper.OFFLINE_MODE = True
+            self.wrapper.QUILT_VERSIONS.append("1.20.1")
+
+            other = wrapper.Wrapper("test", "1.0", self.temp.name)
+            other.OFFLINE_MODE = True
+            self.assertEqual(other.QUILT_VERSIONS, [])
+
+        self.assertEqual(wrapper.EMPTY_CATALOGS["quilt"]["versions"], [])
+
+    def test_async_api(self):
+        self.wrapper.fetch_fabric_versions = lambda: {"versions": ["1.20.1"], "loader_versions": ["0.15.0"], "latest_loader": "0.15.0"}
+
+        self.assertEqual(asyncio.run(self.wrapper.get_fabric_versions())["versions"], ["1.20.1"])
+
+class RoutedCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.standin = StandInServer()
+        self.standin.start()
+        add_catalogs(self.standin, version_count=30, loader_count=5)
+
+        patcher = mock.patch.object(retry, "BASE_DELAY", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.standin.stop()
+        self.temp.cleanup()
+
+    def test_catalog_requests_are_retried(self):
+        # only a routed request recovers from the error status
+        self.standin.add_fault("status", "/meta.quiltmc.org", count=1)
+
+        with self.standin.redirect_requests(), contextlib.redirect_stdout(io.StringIO()):
+            catalog = wrapper.Wrapper("test", "1.0", self.temp.name).fetch_quilt_versions()
+
+        self.assertEqual(len(catalog["loader_versions"]), 5)
+        self.assertEqual(len(catalog["versions"]), 30)
+        self.assertEqual(self.standin.faults_injected, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+
+# Nested timing spans and counters, disabled by default
+# When disabled span() returns a shared no-op object so instrumented code costs one global lookup
+
+ENABLED = False
+
+_spans:list[dict] = []
+_counters:dict[str, int] = {}
+_lock = threading.Lock()
+_current:contextvars.ContextVar[tuple[str, ...]] = contextvars.ContextVar("span", default=())
+_start = time.perf_counter_ns()
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def add(self, key:str, value:int=1):
+        pass
+
+    def set(self, key:str, value):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    def __init__(self, name:str, args:dict) -> None:
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self._token = _current.set(_current.get() + (self.name,))
+        self._begin = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        stack = _current.get()
+        _current.reset(self._token)
+
+        if exc_type != None:
+            self.args["error"] = exc_type.__name__
+
+        with _lock:
+            _spans.append({
+                "name": self.name,
+                "path": stack,
+                "start": self._begin - _start,
+                "duration": end - self._begin,
+                "thread": threading.get_ident(),
+                "args": self.args
+            })
+
+    def add(self, key:str, value:int=1):
+        self.args[key] = self.args.get(key, 0) + value
+
+    def set(self, key:str, value):
+        self.args[key] = value
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+def span(name:str, **args)->Span|_NullSpan:
+    if not ENABLED:
+        return NULL_SPAN
+
+    return Span(name, args)
+
+def count(name:str, value:int=1):
+    if not ENABLED:
+        return
+
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def traced(name:str):
+    # decorator version of span() for whole functions
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if not ENABLED:
+                    return await function(*args, **kwargs)
+                with Span(name, {}):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with Span(name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+def get_spans()->list[dict]:
+    with _lock:
+        return list(_spans)
+
+def get_counters()->dict[str, int]:
+    with _lock:
+        return dict(_counters)
+
+def to_chrome_trace()->dict:
+    # https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU
+    pid = os.getpid()
+    events = []
+
+    for s in get_spans():
+        events.append({
+            "name": s["name"],
+            "ph": "X",
+            "ts": s["start"] / 1000,
+            "dur": s["duration"] / 1000,
+            "pid": pid,
+            "tid": s["thread"],
+            "args": s["args"]
+        })
+
+    now = (time.perf_counter_ns() - _start) / 1000
+    for name, value in get_counters().items():
+        events.append({"name": name, "ph": "C", "ts": now, "pid": pid, "args": {name: value}})
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def summary()->str:
+    # spans aggregated by their nesting path
+    totals:dict[tuple[str, ...], dict] = {}
+    for s in get_spans():
+        total = totals.setdefault(s["path"], {"calls": 0, "duration": 0, "args": {}})
+        total["calls"] += 1
+        total["duration"] += s["duration"]
+        for key, value in s["args"].items():
+            if isinstance(value, int):
+                total["args"][key] = total["args"].get(key, 0) + value
+
+    lines = []
+    for span_path in sorted(totals):
+        total = totals[span_path]
+        name = "  " * (len(span_path) - 1) + span_path[-1]
+        args = " ".join(f"{key}={value}" for key, value in total["args"].items())
+        lines.append(f"{name:<48}{total['duration'] / 1e6:>10.1f}ms {total['calls']:>6}x  {args}")
+
+    counters = get_counters()
+    if counters:
+        lines.append("")
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name:<48}{value:>10}")
+
+    return "\n".join(lines)
+
+def dump(target:str|None=None):
+    # chrome trace json when target is a .json file, otherwise a text summary
+    if target and target.endswith(".json"):
+        with open(target, "w") as f:
+            f.write(json.dumps(to_chrome_trace()))
+        print(f"Trace written to {target}")
+        return
+
+    text = summary()
+    if target:
+        with open(target, "w") as f:
+            f.write(text)
+        print(f"Trace written to {target}")
+    else:
+        print(text)
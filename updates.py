@@ -0,0 +1,106 @@
+from os import path
+import os
+
+import mods
+import mrpack
+import networkutils
+import tracing
+from scheduler import PRIORITY_NORMAL
+
+# Update checks for the mods of a profile: every jar is looked up by its sha1 in one request
+# to a modrinth compatible api (https://docs.modrinth.com/api/operations/getlatestversionsfromhashes)
+
+MODRINTH_API = os.environ.get("PML_MODRINTH_API", "https://api.modrinth.com")
+
+def set_modrinth_api(url:str|None):
+    global MODRINTH_API
+    MODRINTH_API = url.rstrip("/") if url else "https://api.modrinth.com"
+
+def get_loaders(loader:str|None)->list[str]:
+    # quilt loads fabric mods too
+    if loader == "quilt":
+        return ["quilt", "fabric"]
+
+    return [loader] if loader else []
+
+def get_primary_file(version:dict)->dict|None:
+    files = version.get("files", [])
+    for file in files:
+        if file.get("primary"):
+            return file
+
+    return files[0] if files else None
+
+def get_latest_versions(hashes:list[str], loaders:list[str], game_versions:list[str])->dict[str, dict]|None:
+    # {sha1: latest compatible version} for the hashes modrinth knows
+    data = {"hashes": hashes, "algorithm": "sha1"}
+    if loaders:
+        data["loaders"] = loaders
+    if game_versions:
+        data["game_versions"] = game_versions
+
+    return networkutils.post_json(f"{MODRINTH_API}/v2/version_files/update", data, mrpack.MODERINTH_REQUEST_HEADER, PRIORITY_NORMAL)
+
+def get_current_versions(hashes:list[str])->dict[str, dict]|None:
+    # {sha1: version} of the exact files
+    return networkutils.post_json(f"{MODRINTH_API}/v2/version_files", {"hashes": hashes, "algorithm": "sha1"}, mrpack.MODERINTH_REQUEST_HEADER, PRIORITY_NORMAL)
+
+@tracing.traced("updates.plan")
+def get_update_plan(profile_path:str, minecraft_version:str, loader:str|None)->dict[str, list]|None:
+    # {"updates": [...], "up_to_date": [file names], "unknown": [file names]}
+    with tracing.span("updates.hash"):
+        index = mods.add_hashes(profile_path, mods.update_index(profile_path))
+
+    if not index:
+        return {"updates": [], "up_to_date": [], "unknown": []}
+
+    latest = get_latest_versions(sorted({mod["sha1"] for mod in index.values()}), get_loaders(loader), [minecraft_version])
+    if latest == None:
+        return None
+
+    plan = {"updates": [], "up_to_date": [], "unknown": []}
+    for name, mod in sorted(index.items()):
+        version = latest.get(mod["sha1"])
+        if not version:
+            plan["unknown"].append(name)
+            continue
+
+        new_file = get_primary_file(version)
+        hashes = [f.get("hashes", {}).get("sha1") for f in version.get("files", [])]
+        if not new_file or mod["sha1"] in hashes:
+            plan["up_to_date"].append(name)
+            continue
+
+        plan["updates"].append({
+            "file": name,
+            "name": mod.get("name") or name,
+            "version": mod.get("version"),
+            "new_version": version.get("version_number"),
+            "url": new_file["url"],
+            "filename": new_file["filename"],
+            "sha1": new_file.get("hashes", {}).get("sha1"),
+            "size": new_file.get("size")
+        })
+
+    return plan
+
+@tracing.traced("updates.apply")
+def apply_update_plan(profile_path:str, plan:dict[str, list]):
+    mods_directory = path.join(profile_path, "game", "mods")
+
+    for update in plan["updates"]:
+        filename = path.basename(update["filename"])
+        # disabled mods stay disabled
+        if update["file"].endswith(".disabled"):
+            filename += ".disabled"
+
+        new_file = path.join(mods_directory, filename)
+        temp_file = new_file + ".part"
+        try:
+            mrpack.download_file(update["url"], temp_file, overwrite=True, priority=PRIORITY_NORMAL, sha1=update["sha1"])
+        except networkutils.HashMismatch:
+            print(f"Hash mismatch for {update['filename']}, keeping {update['file']}.")
+            continue
+
+        os.remove(path.join(mods_directory, update["file"]))
+        os.replace(temp_file, new_file)
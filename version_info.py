@@ -0,0 +1,180 @@
+from os import path
+import os
+import json
+import platform
+
+DEFAULT_LIBRARY_URL = "https://libraries.minecraft.net/"
+ASSETS_URL = "https://resources.download.minecraft.net/"
+
+def get_os_name()->str:
+    if os.name == "nt":
+        return "windows"
+    elif platform.system() == "Darwin":
+        return "osx"
+
+    return "linux"
+
+def get_arch()->str:
+    return "64" if platform.architecture()[0] == "64bit" else "32"
+
+def load_version_json(minecraft_directory:str, version_id:str)->dict|None:
+    version_json = path.join(minecraft_directory, "versions", version_id, f"{version_id}.json")
+    if not path.exists(version_json):
+        return None
+
+    with open(version_json, "r") as f:
+        return json.load(f)
+
+def get_version_chain(minecraft_directory:str, version_id:str)->list[dict]:
+    # the version json followed by everything it inherits from
+    chain = []
+    while version_id and version_id not in [v["id"] for v in chain]:
+        data = load_version_json(minecraft_directory, version_id)
+        if data == None:
+            break
+
+        chain.append(data)
+        version_id = data.get("inheritsFrom")
+
+    return chain
+
+def rules_allow(rules:list[dict]|None)->bool:
+    if not rules:
+        return True
+
+    allowed = False
+    for rule in rules:
+        if "features" in rule:
+            continue
+
+        os_name = rule.get("os", {}).get("name")
+        if os_name == None or os_name == get_os_name():
+            allowed = rule["action"] == "allow"
+
+    return allowed
+
+def get_maven_path(name:str)->str:
+    # group:artifact:version[:classifier][@extension]
+    name, _, extension = name.partition("@")
+    parts = name.split(":")
+    group, artifact, version = parts[0], parts[1], parts[2]
+    classifier = f"-{parts[3]}" if len(parts) > 3 else ""
+
+    return "/".join(group.split(".") + [artifact, version, f"{artifact}-{version}{classifier}.{extension or 'jar'}"])
+
+def get_library_name(library:dict)->str:
+    # the library name without its version
+    parts = library.get("name", "").split(":")
+    return ":".join(parts[:2] + parts[3:])
+
+def get_library_files(minecraft_directory:str, chain:list[dict])->list[dict]:
+    # returns every library (and natives) jar as {"path", "url", "sha1", "size"}
+    libraries_directory = path.join(minecraft_directory, "libraries")
+    files = []
+    names = set()
+
+    for data in chain:
+        version_names = set()
+        for library in data.get("libraries", []):
+            if not rules_allow(library.get("rules")):
+                continue
+
+            # libraries of a version replace the inherited ones with the same name
+            name = get_library_name(library)
+            if name in names:
+                continue
+            version_names.add(name)
+
+            downloads = library.get("downloads", {})
+
+            if "artifact" in downloads:
+                artifact = downloads["artifact"]
+                if artifact.get("url"):
+                    file = {
+                        "path": path.join(libraries_directory, artifact["path"]),
+                        "url": artifact["url"],
+                        "sha1": artifact.get("sha1"),
+                        "size": artifact.get("size")
+                    }
+                    # newer versions ship natives as libraries named like org.lwjgl:lwjgl:3.3.1:natives-linux
+                    if ":natives-" in library.get("name", ""):
+                        file["natives"] = True
+                        file["flatten"] = True
+                    files.append(file)
+            elif not downloads and "name" in library:
+                maven_path = get_maven_path(library["name"])
+                files.append({
+                    "path": path.join(libraries_directory, maven_path),
+                    "url": library.get("url", DEFAULT_LIBRARY_URL).rstrip("/") + "/" + maven_path,
+                    "sha1": library.get("sha1"),
+                    "size": library.get("size")
+                })
+
+            natives = library.get("natives", {}).get(get_os_name())
+            if natives:
+                classifier = downloads.get("classifiers", {}).get(natives.replace("${arch}", get_arch()))
+                if classifier:
+                    files.append({
+                        "path": path.join(libraries_directory, classifier["path"]),
+                        "url": classifier["url"],
+                        "sha1": classifier.get("sha1"),
+                        "size": classifier.get("size"),
+                        "natives": True,
+                        "exclude": library.get("extract", {}).get("exclude", [])
+                    })
+
+        names |= version_names
+
+    return files
+
+def get_client_file(minecraft_directory:str, chain:list[dict])->dict|None:
+    if not chain:
+        return None
+
+    jar_id = chain[0].get("jar", chain[0]["id"])
+    for data in chain:
+        client = data.get("downloads", {}).get("client")
+        if client:
+            return {
+                "path": path.join(minecraft_directory, "versions", jar_id, f"{jar_id}.jar"),
+                "url": client["url"],
+                "sha1": client.get("sha1"),
+                "size": client.get("size")
+            }
+
+    return None
+
+def get_asset_index(minecraft_directory:str, chain:list[dict])->dict|None:
+    for data in chain:
+        asset_index = data.get("assetIndex")
+        if asset_index:
+            return {
+                "id": asset_index["id"],
+                "path": path.join(minecraft_directory, "assets", "indexes", f"{asset_index['id']}.json"),
+                "url": asset_index["url"],
+                "sha1": asset_index.get("sha1"),
+                "size": asset_index.get("size")
+            }
+
+    return None
+
+def get_asset_files(minecraft_directory:str, asset_index:dict)->list[dict]:
+    if not asset_index or not path.exists(asset_index["path"]):
+        return []
+
+    with open(asset_index["path"], "r") as f:
+        objects = json.load(f).get("objects", {})
+
+    objects_directory = path.join(minecraft_directory, "assets", "objects")
+    files = []
+
+    for asset in objects.values():
+        sha1 = asset["hash"]
+        files.append({
+            "path": path.join(objects_directory, sha1[:2], sha1),
+            "url": f"{ASSETS_URL}{sha1[:2]}/{sha1}",
+            "sha1": sha1,
+            "size": asset.get("size")
+        })
+
+    return files
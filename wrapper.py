@@ -1,5 +1,7 @@
 import minecraft_launcher_lib
 import subprocess
+import asyncio
+import copy
 import os
 import json
 import requests
@@ -8,14 +10,29 @@ import mrpack
 import shutil
 import pathlib
 import networkutils
-import asyncio
-
-def internet_on(host="8.8.8.8", port=53, timeout=2):
+import threading
+from scheduler import get_scheduler, PRIORITY_CRITICAL
+import tracing
+import retry
+import cds
+import jvm
+import natives
+import forge_cache
+import sys
+import time
+
+INTERNET_CHECK_HOST = "8.8.8.8"
+INTERNET_CHECK_PORT = 53
+
+@tracing.traced("internet_on")
+def internet_on(host=None, port=None, timeout=2):
     """
     Host: 8.8.8.8 (google-public-dns-a.google.com)
     OpenPort: 53/tcp
     Service: domain (DNS/TCP)
     """
+    host = host or INTERNET_CHECK_HOST
+    port = port or INTERNET_CHECK_PORT
     try:
         socket.setdefaulttimeout(timeout)
         socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
@@ -23,25 +40,33 @@ def internet_on(host="8.8.8.8", port=53, timeout=2):
     except socket.error as ex:
         return False
 
+# log lines printed once the game reached the main menu, used to measure the startup time
+MAIN_MENU_MARKERS = ["Sound engine started", "Created: 1024x"]
+# background downloads wait while the game starts, at most this long if no marker shows up
+STARTUP_PAUSE_LIMIT = 120
+
 FORGE_VERSIONS_URL = "https://files.minecraftforge.net/net/minecraftforge/forge/promotions_slim.json"
 
+# what a catalog looks like when it was never downloaded
+EMPTY_CATALOGS = {
+    "vanilla": {"versions": [], "latest": None},
+    "forge": {"versions": {}, "latest": {}, "recommended": {}},
+    "fabric": {"versions": [], "loader_versions": [], "latest_loader": None},
+    "quilt": {"versions": [], "loader_versions": [], "latest_loader": None},
+}
+
+# for installs nobody watches, like the background prefetch while a game is running
+SILENT_CALLBACK = {
+    "setStatus": lambda status: None,
+    "setProgress": lambda progress: None,
+    "setMax": lambda max: None
+}
+
 class Wrapper:
     LAUNCHER_NAME:str
     LAUNCHER_VERSION:str
 
     MINECRAFT_DIRECTORY:str = ""
-    VERSIONS:list[str] = []
-    FORGE_VERSIONS:dict[str,str] = {}
-    FORGE_LATEST_VERSIONS:dict[str,str] = {}
-    FORGE_RECOMMENDED_VERSIONS:dict[str,str] = {}
-    FABRIC_VERSIONS:list[str] = []
-    FABRIC_LOADER_VERSIONS:list[str] = []
-    FABRIC_LATEST_LOADER:str
-    QUILT_VERSIONS:list[str] = []
-    QUILT_LOADER_VERSIONS:list[str] = []
-    QUILT_LATEST_LOADER:str
-
-    LATEST_VERSION:str
 
     versions_file:str
     forge_versions_file:str
@@ -84,91 +109,124 @@ class Wrapper:
         self.fabric_versions_file = os.path.join(self.MINECRAFT_DIRECTORY, "fabric_versions.json")
         self.quilt_versions_file = os.path.join(self.MINECRAFT_DIRECTORY, "quilt_versions.json")
 
+        self._catalogs = {}
+        self._catalog_lock = threading.RLock()
+
+    @tracing.traced("wrapper.load")
     async def load(self):
-        # if there is internet download version jsons otherwise load in the versions
+        # only checks for internet, the catalogs are loaded the first time they are used
         if not internet_on():
             print("There is no internet.\nLaunching offline mode...")
-            
-            with open(self.versions_file, "r") as f:
-                versions = json.loads(f.read())
-                self.VERSIONS = versions["versions"]
-                self.LATEST_VERSION = versions["latest"]
-            
-            with open(self.forge_versions_file, "r") as f:
-                forge_versions = json.loads(f.read())
-                self.FORGE_VERSIONS = forge_versions["versions"]
-                self.FORGE_LATEST_VERSIONS = forge_versions["latest"]
-                self.FORGE_RECOMMENDED_VERSIONS = forge_versions["recommended"]
-            
-            with open(self.fabric_versions_file, "r") as f:
-                fabric_versions = json.loads(f.read())
-                self.FABRIC_VERSIONS = fabric_versions["versions"]
-                self.FABRIC_LOADER_VERSIONS = fabric_versions["loader_versions"]
-                self.FABRIC_LATEST_LOADER = fabric_versions["latest_loader"]
-
-            with open(self.quilt_versions_file, "r") as f:
-                quilt_versions = json.loads(f.read())
-                self.QUILT_VERSIONS = quilt_versions["versions"]
-                self.QUILT_LOADER_VERSIONS = quilt_versions["loader_versions"]
-                self.QUILT_LATEST_LOADER = quilt_versions["latest_loader"]
-
             self.OFFLINE_MODE = True
 
-            return
-
-        # Get versions, forge_versions, fabric_versions and quilt_versions
-        versions_task = asyncio.create_task(self.get_versions())
-        forge_versions_task = asyncio.create_task(self.get_forge_versions())
-        fabric_versions_task = asyncio.create_task(self.get_fabric_versions())
-        quilt_versions_task = asyncio.create_task(self.get_quilt_versions())
+    def _get_catalog(self, name:str)->dict:
+        # downloads the catalog (or reads it in offline mode) once, the result is cached per catalog
+        with self._catalog_lock:
+            if name in self._catalogs:
+                return self._catalogs[name]
+
+            catalog_file, fetch = {
+                "vanilla": (self.versions_file, self.fetch_versions),
+                "forge": (self.forge_versions_file, self.fetch_forge_versions),
+                "fabric": (self.fabric_versions_file, self.fetch_fabric_versions),
+                "quilt": (self.quilt_versions_file, self.fetch_quilt_versions),
+            }[name]
+
+            catalog = None
+            if not self.OFFLINE_MODE:
+                try:
+                    catalog = fetch()
+                    with open(catalog_file, "w") as f:
+                        f.write(json.dumps(catalog, indent=4))
+                except (requests.exceptions.RequestException, retry.RetryableStatus, networkutils.EmptyResponse, ValueError) as e:
+                    print(f"Couldn't download the {name} versions ({e}), using the saved ones.")
+
+            if catalog == None:
+                if not os.path.exists(catalog_file):
+                    print(f"The {name} versions were never downloaded, connect to the internet once.")
+                    # cached like a real catalog, callers get their own copy to modify
+                    catalog = copy.deepcopy(EMPTY_CATALOGS[name])
+                else:
+                    with open(catalog_file, "r") as f:
+                        catalog = json.loads(f.read())
+
+            self._catalogs[name] = catalog
+            return catalog
+
+    @property
+    def VERSIONS(self)->list[str]:
+        return self._get_catalog("vanilla")["versions"]
+
+    @property
+    def LATEST_VERSION(self)->str:
+        return self._get_catalog("vanilla")["latest"]
+
+    @property
+    def FORGE_VERSIONS(self)->dict[str,str]:
+        return self._get_catalog("forge")["versions"]
+
+    @property
+    def FORGE_LATEST_VERSIONS(self)->dict[str,str]:
+        return self._get_catalog("forge")["latest"]
+
+    @property
+    def FORGE_RECOMMENDED_VERSIONS(self)->dict[str,str]:
+        return self._get_catalog("forge")["recommended"]
+
+    @property
+    def FABRIC_VERSIONS(self)->list[str]:
+        return self._get_catalog("fabric")["versions"]
+
+    @property
+    def FABRIC_LOADER_VERSIONS(self)->list[str]:
+        return self._get_catalog("fabric")["loader_versions"]
+
+    @property
+    def FABRIC_LATEST_LOADER(self)->str:
+        return self._get_catalog("fabric")["latest_loader"]
+
+    @property
+    def QUILT_VERSIONS(self)->list[str]:
+        return self._get_catalog("quilt")["versions"]
+
+    @property
+    def QUILT_LOADER_VERSIONS(self)->list[str]:
+        return self._get_catalog("quilt")["loader_versions"]
+
+    @property
+    def QUILT_LATEST_LOADER(self)->str:
+        return self._get_catalog("quilt")["latest_loader"]
+
+    # the async catalog api, the fetch runs in a thread like before the catalogs were loaded lazily
+    async def get_versions(self)->dict[str, list[str]|str]:
+        return await asyncio.to_thread(self.fetch_versions)
 
-        results = await asyncio.gather(versions_task, forge_versions_task, fabric_versions_task, quilt_versions_task)
+    async def get_forge_versions(self)->dict[str,dict[str, str]]:
+        return await asyncio.to_thread(self.fetch_forge_versions)
 
-        versions = results[0]
-        forge_versions = results[1]
-        fabric_versions = results[2]
-        quilt_versions = results[3]
+    async def get_fabric_versions(self)->dict[str, list[str]|str]:
+        return await asyncio.to_thread(self.fetch_fabric_versions)
 
-        # Write the versions
-        self.VERSIONS = versions["versions"]
-        self.LATEST_VERSION = versions["latest"]
-        with open(self.versions_file, "w") as f:
-            f.write(json.dumps(versions, indent=4))
-        
-        # Write forge versions
-        self.FORGE_VERSIONS = forge_versions["versions"]
-        self.FORGE_LATEST_VERSIONS = forge_versions["latest"]
-        self.FORGE_RECOMMENDED_VERSIONS = forge_versions["recommended"]
-        with open(self.forge_versions_file, "w") as f:
-            f.write(json.dumps(forge_versions, indent=4))
-        
-        
-        # Write fabric versions
-        self.FABRIC_VERSIONS = fabric_versions["versions"]
-        self.FABRIC_LOADER_VERSIONS = fabric_versions["loader_versions"]
-        self.FABRIC_LATEST_LOADER = fabric_versions["latest_loader"]
-        with open(self.fabric_versions_file, "w") as f:
-            f.write(json.dumps(fabric_versions, indent=4))
-        
-        
-        # Write quilt versions
-        self.QUILT_VERSIONS = quilt_versions["versions"]
-        self.QUILT_LOADER_VERSIONS = quilt_versions["loader_versions"]
-        self.QUILT_LATEST_LOADER = quilt_versions["latest_loader"]
-        with open(self.quilt_versions_file, "w") as f:
-            f.write(json.dumps(quilt_versions, indent=4))
+    async def get_quilt_versions(self)->dict[str, list[str]|str]:
+        return await asyncio.to_thread(self.fetch_quilt_versions)
 
-    async def get_versions(self)->dict[str, list[str]|str]:
+    @tracing.traced("catalog.vanilla")
+    def fetch_versions(self)->dict[str, list[str]|str]:
         versions = []
 
-        for version in minecraft_launcher_lib.utils.get_version_list():
-            version_id = version["id"]
-            versions.append(version_id)
+        # the catalog requests get the limits, timeouts and retries of the installs
+        with get_scheduler().routed(PRIORITY_CRITICAL):
+            for version in minecraft_launcher_lib.utils.get_version_list():
+                version_id = version["id"]
+                versions.append(version_id)
 
-        return {"versions":versions, "latest":minecraft_launcher_lib.utils.get_latest_version()["snapshot"]}
+            latest = minecraft_launcher_lib.utils.get_latest_version()["snapshot"]
 
-    async def get_forge_versions(self)->dict[str,dict[str, str]]:
-        forge_versions_json = json.loads(await networkutils.get_file_contents_async(FORGE_VERSIONS_URL))
+        return {"versions":versions, "latest":latest}
+
+    @tracing.traced("catalog.forge")
+    def fetch_forge_versions(self)->dict[str,dict[str, str]]:
+        forge_versions_json = json.loads(networkutils.get_file_contents(FORGE_VERSIONS_URL, priority=PRIORITY_CRITICAL))
 
         latest = {}
         recommended = {}
@@ -191,34 +249,39 @@ class Wrapper:
 
         return {"versions":versions, "latest":latest, "recommended":recommended}
 
-    async def get_fabric_versions(self)->dict[str, list[str]|str]:
-        stable = minecraft_launcher_lib.fabric.get_stable_minecraft_versions()
-        versions = []
+    @tracing.traced("catalog.fabric")
+    def fetch_fabric_versions(self)->dict[str, list[str]|str]:
+        with get_scheduler().routed(PRIORITY_CRITICAL):
+            stable = minecraft_launcher_lib.fabric.get_stable_minecraft_versions()
+            loader_versions = [v["version"] for v in minecraft_launcher_lib.fabric.get_all_loader_versions()]
+            latest_loader = minecraft_launcher_lib.fabric.get_latest_loader_version()
+            all_versions = minecraft_launcher_lib.fabric.get_all_minecraft_versions()
 
-        loader_versions = [v["version"] for v in minecraft_launcher_lib.fabric.get_all_loader_versions()]
-        latest_loader = minecraft_launcher_lib.fabric.get_latest_loader_version()
-
-        for version in minecraft_launcher_lib.fabric.get_all_minecraft_versions():
+        versions = []
+        for version in all_versions:
             if not version["version"] in stable:
                 versions.append(version["version"])
         
         stable.extend(versions)
         return {"versions":stable, "loader_versions":loader_versions, "latest_loader":latest_loader}
     
-    async def get_quilt_versions(self)->dict[str, list[str]|str]:
-        stable = minecraft_launcher_lib.quilt.get_stable_minecraft_versions()
-        versions = []
-
-        loader_versions = [v["version"] for v in minecraft_launcher_lib.quilt.get_all_loader_versions()]
-        latest_loader = minecraft_launcher_lib.quilt.get_latest_loader_version()
+    @tracing.traced("catalog.quilt")
+    def fetch_quilt_versions(self)->dict[str, list[str]|str]:
+        with get_scheduler().routed(PRIORITY_CRITICAL):
+            stable = minecraft_launcher_lib.quilt.get_stable_minecraft_versions()
+            loader_versions = [v["version"] for v in minecraft_launcher_lib.quilt.get_all_loader_versions()]
+            latest_loader = minecraft_launcher_lib.quilt.get_latest_loader_version()
+            all_versions = minecraft_launcher_lib.quilt.get_all_minecraft_versions()
 
-        for version in minecraft_launcher_lib.quilt.get_all_minecraft_versions():
+        versions = []
+        for version in all_versions:
             if not version["version"] in stable:
                 versions.append(version["version"])
         
         stable.extend(versions)
         return {"versions":stable, "loader_versions":loader_versions, "latest_loader":latest_loader}
 
+    @tracing.traced("wrapper.is_installed")
     def is_installed(self, version_id:str) -> bool:
         for version in minecraft_launcher_lib.utils.get_installed_versions(self.MINECRAFT_DIRECTORY):
             if version["id"] == version_id:
@@ -226,12 +289,14 @@ class Wrapper:
         
         return False
 
-    def download_version(self, vannila_version:str)->str:
-        callback = {
-            "setStatus": self._set_status,
-            "setProgress": self._set_progress,
-            "setMax": self._set_max
-        }
+    @tracing.traced("install.vanilla")
+    def download_version(self, vannila_version:str, priority:int=PRIORITY_CRITICAL, callback:minecraft_launcher_lib.types.CallbackDict|None=None)->str:
+        if callback == None:
+            callback = {
+                "setStatus": self._set_status,
+                "setProgress": self._set_progress,
+                "setMax": self._set_max
+            }
 
         if not vannila_version in self.VERSIONS:
             print(f"Version {vannila_version} doesn't exist.")
@@ -245,15 +310,18 @@ class Wrapper:
             print("Cannot download version without internet.")
             return
 
-        minecraft_launcher_lib.install.install_minecraft_version(vannila_version, self.MINECRAFT_DIRECTORY, callback=callback)
+        with get_scheduler().routed(priority, networkutils.get_cache_url):
+            minecraft_launcher_lib.install.install_minecraft_version(vannila_version, self.MINECRAFT_DIRECTORY, callback=callback)
         return vannila_version
 
-    def download_forge_version(self, vannila_version:str, forge_version:str|None=None)->str:
-        callback = {
-            "setStatus": self._set_status,
-            "setProgress": self._set_progress,
-            "setMax": self._set_max
-        }
+    @tracing.traced("install.forge")
+    def download_forge_version(self, vannila_version:str, forge_version:str|None=None, priority:int=PRIORITY_CRITICAL, callback:minecraft_launcher_lib.types.CallbackDict|None=None)->str:
+        if callback == None:
+            callback = {
+                "setStatus": self._set_status,
+                "setProgress": self._set_progress,
+                "setMax": self._set_max
+            }
         
         if not vannila_version in self.FORGE_VERSIONS.keys():
             print(f"Minecraft version {vannila_version} is not supported by Forge.")
@@ -271,10 +339,23 @@ class Wrapper:
             print("Cannot download version without internet.")
             return
 
-        minecraft_launcher_lib.forge.install_forge_version(f"{vannila_version}-{forge_version}", self.MINECRAFT_DIRECTORY, callback)
+        # a cached build only needs the vanilla version and the downloadable libraries, not the processors
+        version_id = forge_cache.restore_build(self.MINECRAFT_DIRECTORY, vannila_version, forge_version)
+        if version_id:
+            callback["setStatus"](f"Restored forge {vannila_version}-{forge_version} from the forge cache")
+            with get_scheduler().routed(priority, networkutils.get_cache_url):
+                minecraft_launcher_lib.install.install_minecraft_version(version_id, self.MINECRAFT_DIRECTORY, callback)
+            return f"{vannila_version}-forge-{forge_version}"
+
+        with get_scheduler().routed(priority, networkutils.get_cache_url), forge_cache.cached_installer(forge_cache.get_cache_directory(self.MINECRAFT_DIRECTORY)):
+            minecraft_launcher_lib.forge.install_forge_version(f"{vannila_version}-{forge_version}", self.MINECRAFT_DIRECTORY, callback)
+
+        with tracing.span("install.forge_cache"):
+            forge_cache.store_build(self.MINECRAFT_DIRECTORY, vannila_version, forge_version)
         return f"{vannila_version}-forge-{forge_version}"
 
-    def download_fabric_version(self, vannila_version:str, fabric_loader:str=None)->str:
+    @tracing.traced("install.fabric")
+    def download_fabric_version(self, vannila_version:str, fabric_loader:str=None, priority:int=PRIORITY_CRITICAL, callback:minecraft_launcher_lib.types.CallbackDict|None=None)->str:
         if not vannila_version in self.FABRIC_VERSIONS:
             print(f"Minecraft version {vannila_version} is not supported by Fabric.")
             return
@@ -283,11 +364,12 @@ class Wrapper:
             print(f"Fabric loader version {fabric_loader} doesn't exist.")
             return
 
-        callback = {
-            "setStatus": self._set_status,
-            "setProgress": self._set_progress,
-            "setMax": self._set_max
-        }
+        if callback == None:
+            callback = {
+                "setStatus": self._set_status,
+                "setProgress": self._set_progress,
+                "setMax": self._set_max
+            }
 
         fabric_installer_version = self.FABRIC_LATEST_LOADER
 
@@ -302,10 +384,12 @@ class Wrapper:
             print("Cannot download version without internet.")
             return
 
-        minecraft_launcher_lib.fabric.install_fabric(vannila_version, self.MINECRAFT_DIRECTORY, fabric_installer_version, callback=callback)
+        with get_scheduler().routed(priority, networkutils.get_cache_url):
+            minecraft_launcher_lib.fabric.install_fabric(vannila_version, self.MINECRAFT_DIRECTORY, fabric_installer_version, callback=callback)
         return f"fabric-loader-{fabric_installer_version}-{vannila_version}"
 
-    def download_quilt_version(self, vannila_version:str, quilt_loader:str=None)->str:
+    @tracing.traced("install.quilt")
+    def download_quilt_version(self, vannila_version:str, quilt_loader:str=None, priority:int=PRIORITY_CRITICAL, callback:minecraft_launcher_lib.types.CallbackDict|None=None)->str:
         if not vannila_version in self.QUILT_VERSIONS:
             print(f"Minecraft version {vannila_version} is not supported by Quilt.")
             return
@@ -314,11 +398,12 @@ class Wrapper:
             print(f"Quilt loader version {quilt_loader} doesn't exist.")
             return
         
-        callback = {
-            "setStatus": self._set_status,
-            "setProgress": self._set_progress,
-            "setMax": self._set_max
-        }
+        if callback == None:
+            callback = {
+                "setStatus": self._set_status,
+                "setProgress": self._set_progress,
+                "setMax": self._set_max
+            }
 
         quilt_installer_version = self.QUILT_LATEST_LOADER
 
@@ -333,9 +418,11 @@ class Wrapper:
             print("Cannot download version without internet.")
             return
 
-        minecraft_launcher_lib.quilt.install_quilt(vannila_version, self.MINECRAFT_DIRECTORY, quilt_installer_version, callback=callback)
+        with get_scheduler().routed(priority, networkutils.get_cache_url):
+            minecraft_launcher_lib.quilt.install_quilt(vannila_version, self.MINECRAFT_DIRECTORY, quilt_installer_version, callback=callback)
         return f"quilt-loader-{quilt_installer_version}-{vannila_version}"
 
+    @tracing.traced("install.mrpack")
     def download_mrpack(self, file, install_path)->str:
         
         if not os.path.exists(file):
@@ -405,8 +492,9 @@ class Wrapper:
         
         return version
 
-    def launch_version(self, version:str, username:str, memory_alloc:int=4096, gameDir:str|None = None):
-
+    @tracing.traced("launch.command")
+    def get_launch_command(self, version:str, username:str, memory_alloc:int=4096, gameDir:str|None = None, jvm_arguments:list[str]|None = None, extract_directory:str|None = None)->list[str]:
+        # extract_directory receives what the jvm extracts at runtime, one is created when the shared natives are used without it
         options = minecraft_launcher_lib.utils.generate_test_options()
         options["username"] = username
         if gameDir:
@@ -414,7 +502,11 @@ class Wrapper:
 
         options["launcherName"] = self.LAUNCHER_NAME
         options["launcherVersion"] = self.LAUNCHER_VERSION
-        options["jvmArguments"] = [f"-Xmx{memory_alloc}m"]
+        options["jvmArguments"] = jvm_arguments if jvm_arguments else [f"-Xmx{memory_alloc}m"]
+
+        natives_directory = natives.get_natives_directory(self.MINECRAFT_DIRECTORY, version)
+        if natives_directory:
+            options["nativesDirectory"] = natives_directory
         command = minecraft_launcher_lib.command.get_minecraft_command(version, self.MINECRAFT_DIRECTORY, options)
         
         # translate all paths into absolute paths
@@ -436,6 +528,60 @@ class Wrapper:
             # join all paths, if there is more than one
             command[c] = os.path.pathsep.join(all_paths)
 
-        print(command)
-
-        subprocess.run(command, cwd=os.path.abspath(gameDir))
\ No newline at end of file
+        if natives_directory:
+            natives.set_extract_directory(command, extract_directory or natives.create_extract_directory())
+
+        return command
+
+    def run_game(self, command:list[str], gameDir:str, version:str)->float|None:
+        # runs the game and returns how long it took to reach the main menu
+        start = time.monotonic()
+        startup = None
+
+        # background downloads (the prefetch) don't compete with the game start for disk and network
+        scheduler = get_scheduler()
+        scheduler.pause_background()
+        resume = threading.Timer(STARTUP_PAUSE_LIMIT, scheduler.resume_background)
+        resume.daemon = True
+        resume.start()
+
+        try:
+            process = subprocess.Popen(command, cwd=os.path.abspath(gameDir), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+            # other launches size their heap around the running instances
+            jvm.register_instance(self.MINECRAFT_DIRECTORY, process.pid, jvm.get_heap(command), version)
+
+            try:
+                for line in process.stdout:
+                    sys.stdout.write(line)
+                    if startup == None and any(marker in line for marker in MAIN_MENU_MARKERS):
+                        startup = time.monotonic() - start
+                        print(f"Reached the main menu in {startup:.1f}s")
+                        resume.cancel()
+                        scheduler.resume_background()
+
+                process.wait()
+            finally:
+                jvm.unregister_instance(self.MINECRAFT_DIRECTORY, process.pid)
+        finally:
+            resume.cancel()
+            scheduler.resume_background()
+
+        return startup
+
+    def launch_version(self, version:str, username:str, memory_alloc:int=4096, gameDir:str|None = None, use_cds:bool=True, jvm_arguments:list[str]|None = None):
+        extract_directory = natives.create_extract_directory()
+        try:
+            command = self.get_launch_command(version, username, memory_alloc, gameDir, jvm_arguments, extract_directory)
+
+            cds_mode = cds.CDS_OFF
+            if use_cds:
+                cds_mode, cds_arguments = cds.get_cds_arguments(self.MINECRAFT_DIRECTORY, version, gameDir, command)
+                command[1:1] = cds_arguments
+
+            print(command)
+
+            startup = self.run_game(command, gameDir, version)
+        finally:
+            shutil.rmtree(extract_directory, ignore_errors=True)
+
+        cds.record_launch(self.MINECRAFT_DIRECTORY, version, gameDir, cds_mode, startup)
\ No newline at end of file